@@ -1,19 +1,22 @@
 import datetime
 import logging
 import requests
+import sqlite3
+import time
 import streamlit as st
 from dotenv import load_dotenv
 from utils.mascot_reactions import show_mascot_reaction
 from utils.auth import register, login, logout, load_all_users, update_profile, TEXT_COLOR, get_user_premium_status_and_quiz_limits
 from utils.event_manager import create_event, edit_event, delete_event, load_events, load_shared_events, load_tasks, send_upgrade_request_email, share_event
 from utils.task_manager import save_task, edit_task, delete_task, load_shared_tasks
-from utils.event_question_generator import chat_with_deepseek, quiz_mode, DAILY_QUIZ_LIMIT_FREE
-from utils.event_stats_manager import calculate_progress_status, load_stats, display_event_statistics
+from utils.event_question_generator import quiz_mode, DAILY_QUIZ_LIMIT_FREE
+from utils.event_stats_manager import calculate_progress_status, load_stats_summary, display_event_statistics
 import os
 import pandas as pd
-import io
 import base64
-from utils.database import create_connection, create_tables
+from utils.cache import invalidate_all
+from utils import chat_repository
+from utils.database import create_connection, create_tables, count_dashboard_events, load_dashboard_events, load_latest_scores, load_shared_dashboard_events, load_task_previews
 from streamlit_cookies_manager import EncryptedCookieManager
 
 
@@ -465,17 +468,12 @@ PAGE_IMAGES = {
 }
 
 API_URL = "http://localhost:8000"
-
-def get_chat_history(user_id, event_id=None, task_id=None):
-    params = {"user_id": user_id}
-    if event_id: params["event_id"] = event_id
-    if task_id: params["task_id"] = task_id
-    resp = requests.get(f"{API_URL}/chat/history", params=params)
-    try:
-        return resp.json()
-    except Exception:
-        st.error(f"Fehler beim Laden des Chatverlaufs: {resp.status_code} - {resp.text}")
-        return []
+# Import-Dienst (utils/import_data.py) läuft als eigener Prozess auf Port 8001
+IMPORT_API_URL = os.getenv("IMPORT_API_URL", "http://localhost:8001")
+IMPORT_POLL_INTERVAL = 1  # Sekunden zwischen zwei Statusabfragen eines Import-Jobs
+IMPORT_PREVIEW_ROWS = 5
+# Anzeigename -> file_type des Export-Endpunkts
+EXPORT_FORMATS = {"CSV": "csv", "Excel": "xlsx", "Parquet": "parquet"}
 
 def display_page_header(title):
     st.markdown("""
@@ -563,42 +561,65 @@ def create_download_link(df, filename, text):
 
 # Helper function to clear chat history
 def clear_chat_history(user_id, event_id, task_id=None):
-        params = {"user_id": user_id, "event_id": event_id}
-        if task_id:
-            params["task_id"] = task_id
-        
-        try:
-            resp = requests.delete(f"{API_URL}/chat/history", params=params)
-            return resp.status_code == 200
-        except:
-            return False
+    try:
+        chat_repository.clear_history(user_id, event_id, task_id)
+        st.session_state.get("chat_cache", {}).pop((user_id, event_id, task_id), None)
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Fehler beim Löschen der Chat-Historie: {str(e)}")
+        return False
 
 
 # Hilfsfunktion für bessere Chat-Historie Anzeige
-def get_chat_history(user_id, event_id=None, task_id=None):
+def get_cached_chat_history(user_id, event_id=None, task_id=None, load_older=False):
     """
-    Optimierte Funktion zum Laden der Chat-Historie mit besserer Fehlerbehandlung.
+    Chatverlauf aus dem Session-Cache je (Benutzer, Event, Aufgabe).
+    Beim ersten Aufruf wird nur die letzte Seite geladen, danach pro Rerun nur Nachrichten
+    mit einer ID größer als der zuletzt gesehenen. load_older lädt die vorherige Seite nach.
+    Der Cache hält nur das angezeigte Fenster (eine Seite plus nachgeladene Seiten); neue
+    Nachrichten verdrängen die ältesten, die über "Ältere Nachrichten laden" erreichbar bleiben.
+    :return: Cache-Eintrag {"messages": [...], "has_older": bool, "window": int}
     """
+    cache = st.session_state.setdefault("chat_cache", {})
+    key = (user_id, event_id, task_id)
+    page_size = chat_repository.CHAT_HISTORY_PAGE_SIZE
+    entry = cache.get(key)
     try:
-        response = requests.get(f"{API_URL}/chat/history", params={
-            "user_id": user_id,
-            "event_id": event_id,
-            "task_id": task_id
-        }, timeout=10)  # Timeout hinzufügen
-        
-        if response.status_code == 200:
-            history = response.json()
-            return history if isinstance(history, list) else []
+        if entry is None:
+            messages = chat_repository.get_history(user_id, event_id, task_id, limit=page_size)
+            entry = cache[key] = {"messages": messages, "has_older": len(messages) == page_size, "window": page_size}
         else:
-            logging.error(f"Chat-Historie API Fehler: {response.status_code}")
-            return []
-            
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Netzwerk-Fehler beim Laden der Chat-Historie: {str(e)}")
-        return []
-    except Exception as e:
-        logging.error(f"Unerwarteter Fehler beim Laden der Chat-Historie: {str(e)}")
-        return [] 
+            last_id = entry["messages"][-1]["id"] if entry["messages"] else 0
+            entry["messages"].extend(chat_repository.get_history(user_id, event_id, task_id, after_id=last_id))
+            if load_older and entry["messages"]:
+                older = chat_repository.get_history(
+                    user_id, event_id, task_id, limit=page_size, before_id=entry["messages"][0]["id"]
+                )
+                entry["messages"][:0] = older
+                entry["has_older"] = len(older) == page_size
+                entry["window"] += page_size
+            overflow = len(entry["messages"]) - entry["window"]
+            if overflow > 0:
+                del entry["messages"][:overflow]
+                entry["has_older"] = True
+    except sqlite3.Error as e:
+        logging.error(f"Datenbankfehler beim Laden der Chat-Historie: {str(e)}")
+        if entry is None:
+            return {"messages": [], "has_older": False, "window": page_size}
+    return entry
+
+
+def export_chat_csv(user_id, event_id=None, task_id=None):
+    """
+    Gesamter Chatverlauf als CSV für den Download, erst auf Anforderung aus der Datenbank geladen.
+    :return: CSV-Text oder None bei einem Datenbankfehler
+    """
+    try:
+        messages = chat_repository.get_history(user_id, event_id, task_id)
+    except sqlite3.Error as e:
+        logging.error(f"Datenbankfehler beim Export der Chat-Historie: {str(e)}")
+        return None
+    return pd.DataFrame(messages, columns=chat_repository.HISTORY_COLUMNS).to_csv(index=False)
 
 # Umgebungsvariablen laden
 load_dotenv()
@@ -1289,17 +1310,15 @@ else:
             st.markdown('<div class="stats-card">', unsafe_allow_html=True)
             st.markdown('<div class="section-title">📊 Deine Aktivitäten</div>', unsafe_allow_html=True)
             
-            stats = load_stats(st.session_state["user_id"])
-            events = load_events(st.session_state["user_id"])
+            stats_summary = load_stats_summary(st.session_state["user_id"])
+            num_events, num_own_events = count_dashboard_events(st.session_state["user_id"])
             
             cols = st.columns(3)
-            num_events = len(events) if events else 0
-            num_quizzes = len(stats) if stats else 0
-            avg_score = sum(stat[1] for stat in stats)/num_quizzes if num_quizzes > 0 else 0
+            num_quizzes = stats_summary["attempts"]
             metrics = [
                 ("Meine Events", num_events, "Anzahl der von dir erstellten Events"),
                 ("Durchgeführte Quizze", num_quizzes, "Anzahl der durchgeführten Quizze"),
-                ("Durchschnittsnote", f"{sum(stat[1] for stat in stats)/num_quizzes:.1f}%" if stats else "0%", "Deine durchschnittliche Quiz-Punktzahl")
+                ("Durchschnittsnote", f"{stats_summary['avg_score']:.1f}%" if num_quizzes else "0%", "Deine durchschnittliche Quiz-Punktzahl")
             ]
             
             for col, (label, value, help_text) in zip(cols, metrics):
@@ -1313,24 +1332,33 @@ else:
             st.markdown('<div class="stats-card">', unsafe_allow_html=True)
             st.markdown('<div class="section-title">📌 Meine Events</div>', unsafe_allow_html=True)
             
-            if events:
+            if num_events:
                 # Filter für importierte/nicht importierte Events
                 show_imported = st.checkbox("Importierte Events anzeigen", value=True, key="show_imported_checkbox")
-                filtered_events = [e for e in events if show_imported or (len(e) > 3 and not e[3])]
+                num_filtered = num_events if show_imported else num_own_events
                 
-                if filtered_events: 
+                if num_filtered: 
                     # Pagination
                     items_per_page = 2
-                    total_pages = max(1, (len(filtered_events) + items_per_page - 1) // items_per_page)
+                    total_pages = max(1, (num_filtered + items_per_page - 1) // items_per_page)
                     page_number = st.number_input('Seite', min_value=1, max_value=total_pages, value=1, key='events_page')
                     start_idx = (page_number - 1) * items_per_page
-                    end_idx = start_idx + items_per_page
                     
+                    # Nur die Events der aktuellen Seite laden,
+                    # danach deren Aufgaben und letzte Bewertungen in je einer Abfrage
+                    page_events = load_dashboard_events(
+                        st.session_state["user_id"], include_imported=show_imported,
+                        limit=items_per_page, offset=start_idx
+                    )
+                    page_event_ids = [e["id"] for e in page_events]
+                    task_previews = load_task_previews(page_event_ids)
+                    latest_scores = load_latest_scores(st.session_state["user_id"], page_event_ids)
+
                     # Events Grid
                     st.markdown('<div class="event-grid">', unsafe_allow_html=True)
-                    for event in filtered_events[start_idx:end_idx]:
-                        event_id, title, description = event[0], event[1], event[2]
-                        is_imported = len(event) > 3 and event[3]  # Index 3 = is_imported
+                    for event in page_events:
+                        event_id, title, description = event["id"], event["title"], event["description"]
+                        is_imported = event["is_imported"]
                         
                         st.markdown(f'<div class="event-card {"imported-event-card" if is_imported else ""}">', unsafe_allow_html=True)
                         
@@ -1343,7 +1371,7 @@ else:
                         st.markdown(f'<div class="event-description">{description or "Keine Beschreibung"}</div>', unsafe_allow_html=True)
                         
                         # Aufgaben
-                        tasks = load_tasks(event_id)
+                        tasks = task_previews[event_id]
                         if tasks:
                             st.markdown('<div class="section-label">Aufgaben</div>', unsafe_allow_html=True)
                             st.markdown('<div class="task-list">', unsafe_allow_html=True)
@@ -1356,9 +1384,8 @@ else:
                             st.markdown('</div>', unsafe_allow_html=True)
                         
                         # Fortschritt
-                        event_stats = load_stats(st.session_state["user_id"], event_id)
-                        if event_stats:
-                            last_score = event_stats[0][1]
+                        last_score = latest_scores.get(event_id)
+                        if last_score is not None:
                             status, _ = calculate_progress_status(last_score)
                             
                             st.markdown('<div class="progress-container">', unsafe_allow_html=True)
@@ -1401,7 +1428,7 @@ else:
             st.markdown('</div>', unsafe_allow_html=True)  # Ende stats-card
 
         # Geteilte Events
-        shared_events = load_shared_events(st.session_state["user_id"])
+        shared_events = load_shared_dashboard_events(st.session_state["user_id"])
         if shared_events:
             with st.container():
                 st.markdown('<div class="stats-card">', unsafe_allow_html=True)
@@ -1414,10 +1441,18 @@ else:
                 start_idx = (page_number - 1) * items_per_page
                 end_idx = start_idx + items_per_page
                 
+                # Geteilte Aufgaben und letzte Bewertungen aller Events der aktuellen Seite in je einer Abfrage laden
+                page_events = shared_events[start_idx:end_idx]
+                page_event_ids = [e["id"] for e in page_events]
+                shared_task_previews = load_task_previews(
+                    page_event_ids, shared_with_user_id=st.session_state["user_id"]
+                )
+                latest_scores = load_latest_scores(st.session_state["user_id"], page_event_ids)
+
                 # Events Grid
                 st.markdown('<div class="event-grid">', unsafe_allow_html=True)
-                for event in shared_events[start_idx:end_idx]:
-                    event_id, title, shared_by, description = event[0], event[1], event[2], event[3]
+                for event in page_events:
+                    event_id, title, shared_by, description = event["id"], event["title"], event["shared_by"], event["description"]
                     
                     st.markdown('<div class="event-card shared-event-card">', unsafe_allow_html=True)
                     
@@ -1435,9 +1470,7 @@ else:
                             st.write(description)
                     
                     # Aufgaben 
-                    tasks = load_tasks(event_id)
-                    shared_tasks = load_shared_tasks(st.session_state["user_id"])
-                    all_tasks = [t for t in tasks if t[0] in [st[0] for st in shared_tasks]]
+                    all_tasks = shared_task_previews[event_id]
                     
                     if all_tasks:
                         st.markdown('<div class="section-label">Aufgaben</div>', unsafe_allow_html=True)
@@ -1456,9 +1489,8 @@ else:
                         st.markdown('</div>', unsafe_allow_html=True)
                     
                     # Fortschritt
-                    event_stats = load_stats(st.session_state["user_id"], event_id)
-                    if event_stats:
-                        last_score = event_stats[0][1]
+                    last_score = latest_scores.get(event_id)
+                    if last_score is not None:
                         status, color = calculate_progress_status(last_score)
                         
                         st.markdown('<div class="progress-container">', unsafe_allow_html=True)
@@ -1620,7 +1652,7 @@ else:
 
     elif page == "Chat":
         from datetime import datetime
-        from utils.event_question_generator import chat_with_deepseek
+        from utils.event_question_generator import chat_with_deepseek_stream
 
 
         events = load_events(st.session_state["user_id"])
@@ -1763,19 +1795,31 @@ else:
                     with col_title:
                         st.markdown(f"<h4 style='margin-bottom:0;'>{task[1]}</h4>", unsafe_allow_html=True)
                     with col_actions:
-                        chat_history = get_chat_history(
-                            user_id=st.session_state["user_id"],
-                            event_id=st.session_state.selected_event_id,
-                            task_id=st.session_state.selected_task_id
+                        chat_cache_key = (
+                            st.session_state["user_id"],
+                            st.session_state.selected_event_id,
+                            st.session_state.selected_task_id
+                        )
+                        chat_entry = get_cached_chat_history(
+                            *chat_cache_key,
+                            load_older=st.session_state.pop("chat_load_older", None) == chat_cache_key
                         )
-                        if chat_history:
-                            import pandas as pd
-                            import base64
-                            df = pd.DataFrame(chat_history)
-                            csv = df.to_csv(index=False)
-                            b64 = base64.b64encode(csv.encode()).decode()
-                            href = f'<a href="data:file/csv;base64,{b64}" download="chat_export.csv" class="chat-action-btn">💾</a>'
-                            st.markdown(href, unsafe_allow_html=True)
+                        chat_history = chat_entry["messages"]
+                        # CSV erst nach Klick erzeugen und nur für diesen Rerun zum Download anbieten
+                        export_csv = None
+                        if st.session_state.pop("chat_export", None) == chat_cache_key:
+                            export_csv = export_chat_csv(*chat_cache_key)
+                        if export_csv is not None:
+                            st.download_button(
+                                "⬇️", data=export_csv, file_name="chat_export.csv", mime="text/csv",
+                                key=f"chat_download_{event_id}_{st.session_state.selected_task_id}",
+                                help="CSV herunterladen"
+                            )
+                        elif chat_history and st.button(
+                                "💾", key=f"chat_export_btn_{event_id}_{st.session_state.selected_task_id}",
+                                help="Chatverlauf als CSV exportieren"):
+                            st.session_state["chat_export"] = chat_cache_key
+                            st.rerun()
 
                         if st.button("🗑️", key=f"clear_chat_btn_{event_id}_{st.session_state.selected_task_id}", 
                                    help="Chatverlauf löschen"):
@@ -1792,6 +1836,11 @@ else:
 
                     st.markdown(f"*{task[2]}*" if task[2] else "*Keine Beschreibung.*")
 
+                    if chat_entry["has_older"]:
+                        if st.button("Ältere Nachrichten laden", key=f"chat_older_{event_id}_{st.session_state.selected_task_id}"):
+                            st.session_state["chat_load_older"] = chat_cache_key
+                            st.rerun()
+
                     for msg in chat_history:
                         role = msg.get("role")
                         content = msg.get("content", "")
@@ -1803,12 +1852,15 @@ else:
                     user_input = st.chat_input("Nachricht eingeben...")
                     if user_input:
                         try:
-                            chat_with_deepseek(
-                                user_message=user_input,
-                                user_id=st.session_state["user_id"],
-                                event_id=st.session_state.selected_event_id,
-                                task_id=st.session_state.selected_task_id
-                            )
+                            # Antwort direkt beim Eintreffen der ersten Tokens anzeigen
+                            st.chat_message("user").write(user_input)
+                            with st.chat_message("assistant"):
+                                st.write_stream(chat_with_deepseek_stream(
+                                    user_message=user_input,
+                                    user_id=st.session_state["user_id"],
+                                    event_id=st.session_state.selected_event_id,
+                                    task_id=st.session_state.selected_task_id
+                                ))
                             st.rerun()
                         except Exception as e:
                             st.error(f"Fehler beim Senden der Nachricht: {e}")
@@ -1848,9 +1900,8 @@ else:
 
     elif page == "Export":
         import pandas as pd
-        import io, base64, requests
+        import base64, requests
         from utils.event_manager import load_events, load_shared_events
-        from utils.import_data import create_download_link
 
         display_page_header("Export")
 
@@ -1924,7 +1975,7 @@ else:
 
                 selected_event_ids = [all_events[event_options.index(e)][0] for e in selected_events]
 
-                export_format = st.radio("Exportformat auswählen", ["CSV", "Excel"], horizontal=True)
+                export_format = st.radio("Exportformat auswählen", list(EXPORT_FORMATS), horizontal=True)
                 include_stats = st.checkbox("Statistiken einbeziehen", value=True)
                 include_tasks = st.checkbox("Aufgaben einbeziehen", value=True)
 
@@ -1932,61 +1983,31 @@ else:
                     if not selected_event_ids:
                         st.warning("Bitte wähle mindestens ein Event aus.")
                     else:
-                        export_data = []
-
-                        for event_id in selected_event_ids:
-                            event = next((e for e in all_events if e[0] == event_id), None)
-                            if not event:
-                                continue
-
-                            event_id, event_title, event_type, event_desc = event
-                            tasks = load_tasks(event_id) if include_tasks else []
-                            stats = load_stats(st.session_state["user_id"], event_id) if include_stats else []
-
-                            event_data = {
-                                "Event ID": event_id,
-                                "Titel": event_title,
-                                "Typ": event_type,
-                                "Beschreibung": event_desc
-                            }
-
-                            if not tasks:
-                                export_data.append(event_data)
-                            else:
-                                for task in tasks:
-                                    task_id, task_title, task_content = task[0], task[1], task[2]
-                                    task_data = event_data.copy()
-                                    task_data.update({
-                                        "Aufgabe ID": task_id,
-                                        "Aufgabe Titel": task_title,
-                                        "Aufgabe Inhalt": task_content
-                                    })
-
-                                    if include_stats:
-                                        task_stats = [s for s in stats if s[2] == task_id]
-                                        if task_stats:
-                                            latest = task_stats[-1]
-                                            task_data.update({
-                                                "Letzte Bewertung": latest[1],
-                                                "Datum": latest[3] if len(latest) > 3 else "Unbekannt"
-                                            })
-
-                                    export_data.append(task_data)
-
-                        df = pd.DataFrame(export_data)
-                        filename = "events_export"
-
-                        if export_format == "CSV":
-                            st.markdown(create_download_link(df, f"{filename}.csv", "📥 CSV-Datei herunterladen"), unsafe_allow_html=True)
-                        else:
-                            output = io.BytesIO()
-                            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                                df.to_excel(writer, sheet_name="Events", index=False)
-                            b64 = base64.b64encode(output.getvalue()).decode()
-                            st.markdown(
-                                f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}.xlsx" class="download-button">📥 Excel-Datei herunterladen</a>',
-                                unsafe_allow_html=True
+                        # Der Export-Endpunkt liest die Zeilen direkt aus der Datenbank und streamt die Datei
+                        file_type = EXPORT_FORMATS[export_format]
+                        try:
+                            response = requests.get(
+                                f"{IMPORT_API_URL}/export/events",
+                                params={
+                                    "user_id": st.session_state["user_id"],
+                                    "event_ids": selected_event_ids,
+                                    "file_type": file_type,
+                                    "include_tasks": include_tasks,
+                                    "include_stats": include_stats
+                                },
+                                timeout=120
                             )
+                            if response.status_code == 200:
+                                st.download_button(
+                                    f"📥 {export_format}-Datei herunterladen",
+                                    data=response.content,
+                                    file_name=f"events_export.{file_type}",
+                                    mime=response.headers.get("content-type")
+                                )
+                            else:
+                                st.error(f"❌ Fehler beim Export: {response.json().get('error')}")
+                        except requests.exceptions.RequestException as e:
+                            st.error(f"❌ Export-Dienst nicht erreichbar: {e}")
             else:
                 st.info("Keine Events verfügbar.")
 
@@ -1994,17 +2015,24 @@ else:
 
         with col2:
             st.markdown("### 📥 Events und Aufgaben importieren")
-            st.write("Importiere Events, Aufgaben und ggf. Bewertungen aus einer CSV- oder Excel-Datei.")
+            st.write("Importiere Events, Aufgaben und ggf. Bewertungen aus einer CSV-, Excel- oder Parquet-Datei.")
 
-            uploaded_file = st.file_uploader("Datei auswählen (CSV oder Excel)", type=["csv", "xlsx"])
+            uploaded_file = st.file_uploader("Datei auswählen (CSV, Excel oder Parquet)", type=["csv", "xlsx", "parquet"])
 
             if uploaded_file:
                 try:
+                    # Für Vorschau und Spaltenprüfung genügen die ersten Zeilen
                     if uploaded_file.name.endswith(".csv"):
-                        df = pd.read_csv(uploaded_file)
+                        df = pd.read_csv(uploaded_file, nrows=IMPORT_PREVIEW_ROWS)
                         file_type = "csv"
+                    elif uploaded_file.name.endswith(".parquet"):
+                        import pyarrow.parquet as pq
+                        parquet_file = pq.ParquetFile(uploaded_file)
+                        preview = next(parquet_file.iter_batches(batch_size=IMPORT_PREVIEW_ROWS), None)
+                        df = (preview if preview is not None else parquet_file.schema_arrow.empty_table()).to_pandas()
+                        file_type = "parquet"
                     else:
-                        df = pd.read_excel(uploaded_file)
+                        df = pd.read_excel(uploaded_file, nrows=IMPORT_PREVIEW_ROWS)
                         file_type = "xlsx"
 
                     st.success("✅ Datei erfolgreich geladen.")
@@ -2017,27 +2045,63 @@ else:
                     }
 
                     if required_columns.issubset(df.columns):
-                        if st.button("📤 Import starten"):
-                            response = requests.post(
-                                f"{API_URL}/import/events",
-                                params={
-                                    "user_id": st.session_state["user_id"],
-                                    "file_type": file_type
-                                },
-                                files={"file": uploaded_file.getvalue()}
-                            )
-                            if response.status_code == 200:
-                                st.success("🎉 Import abgeschlossen!")
-                                show_mascot_reaction("success", "Import erfolgreich abgeschlossen!")
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Fehler: {response.json().get('error')}")
+                        if st.button("📤 Import starten", disabled=bool(st.session_state.get("import_job_id"))):
+                            try:
+                                # Der Import läuft als Hintergrund-Job, die Seite fragt nur den Status ab
+                                response = requests.post(
+                                    f"{IMPORT_API_URL}/import/jobs",
+                                    params={
+                                        "user_id": st.session_state["user_id"],
+                                        "file_type": file_type
+                                    },
+                                    files={"file": (uploaded_file.name, uploaded_file.getvalue())},
+                                    timeout=60
+                                )
+                                if response.status_code == 202:
+                                    st.session_state["import_job_id"] = response.json()["job_id"]
+                                    st.rerun()
+                                else:
+                                    st.error(f"❌ Fehler: {response.json().get('error')}")
+                            except requests.exceptions.RequestException as e:
+                                st.error(f"❌ Import-Dienst nicht erreichbar: {e}")
                     else:
                         st.error("❌ Datei muss folgende Spalten enthalten: " + ", ".join(required_columns))
 
                 except Exception as e:
                     st.error(f"❌ Fehler beim Verarbeiten der Datei: {e}")
 
+            import_job_id = st.session_state.get("import_job_id")
+            if import_job_id:
+                try:
+                    job = requests.get(
+                        f"{IMPORT_API_URL}/import/jobs/{import_job_id}",
+                        params={"user_id": st.session_state["user_id"]},
+                        timeout=10
+                    ).json()
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    job = {"status": "failed", "error": f"Status nicht abrufbar: {e}"}
+
+                if job.get("status") in ("queued", "running"):
+                    st.info(
+                        f"⏳ Import läuft … {job['total_rows_processed']} Zeilen verarbeitet, "
+                        f"{job['imported_events']} Events und {job['imported_tasks']} Aufgaben angelegt."
+                    )
+                    time.sleep(IMPORT_POLL_INTERVAL)
+                    st.rerun()
+                else:
+                    del st.session_state["import_job_id"]
+                    if job.get("status") == "completed":
+                        # Der Import-Service schreibt in einem eigenen Prozess; neben neuen Events
+                        # bekommen auch vorhandene Events Aufgaben (Bereich "event"), daher alles verwerfen
+                        invalidate_all()
+                        st.success(
+                            f"🎉 Import abgeschlossen: {job['imported_events']} Events und "
+                            f"{job['imported_tasks']} Aufgaben aus {job['total_rows_processed']} Zeilen."
+                        )
+                        show_mascot_reaction("success", "Import erfolgreich abgeschlossen!")
+                    else:
+                        st.error(f"❌ Import fehlgeschlagen: {job.get('error')}")
+
             st.markdown('</div>', unsafe_allow_html=True)  # END IMPORT-CARD
 
 
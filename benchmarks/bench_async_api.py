@@ -0,0 +1,108 @@
+"""
+Benchmark: Latenz von GET /chat/history, während parallel ein großer Import läuft.
+
+Vorher: import_events führte die sqlite-Aufrufe direkt in der Event-Loop aus – alle
+Chat-Anfragen warteten, bis der Import fertig war.
+Nachher: Import und Chat-Abfragen laufen über run_db() im DB-Executor.
+
+Beide FastAPI-Apps werden in-process über httpx.ASGITransport angesprochen, also in
+derselben Event-Loop wie unter uvicorn.
+
+Aufruf:  python -m benchmarks.bench_async_api [import_zeilen] [chat_anfragen]
+"""
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+import pandas as pd
+from fastapi import FastAPI, Query, UploadFile, File
+
+import utils.chat_api
+import utils.database
+from utils import chat_repository
+from utils.connection_pool import pool
+from utils.database import create_tables
+from utils.import_data import import_dataframe, import_events
+
+CHAT_INTERVAL = 0.005  # Sekunden zwischen zwei Chat-Anfragen (200 Anfragen/s)
+
+
+async def legacy_import_events(user_id: int, file_type: str = Query("csv"), file: UploadFile = File(...)):
+    # Verhalten vor der Umstellung: blockierende DB-Arbeit direkt im async-Handler
+    df = pd.read_csv(io.BytesIO(await file.read()))
+    imported_events, imported_tasks = import_dataframe(df, user_id)
+    return {"imported_events": imported_events, "imported_tasks": imported_tasks}
+
+
+def build_app(import_handler):
+    app = FastAPI()
+    app.include_router(utils.chat_api.chat_router)
+    app.add_api_route("/import/events", import_handler, methods=["POST"])
+    return app
+
+
+def build_csv(rows, offset):
+    df = pd.DataFrame({
+        "Titel": [f"Import {offset} Event {i // 10}" for i in range(rows)],
+        "Beschreibung": ["" for _ in range(rows)],
+        "Aufgabe Titel": [f"Aufgabe {i}" for i in range(rows)],
+        "Aufgabe Inhalt": ["" for _ in range(rows)],
+    })
+    return df.to_csv(index=False).encode()
+
+
+async def run(label, app, csv_bytes, user_id, num_requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        latencies = []
+
+        async def chat_request(arrival):
+            # Offene Last: Anfrage i kommt zum Zeitpunkt arrival an, gemessen wird ab dort
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+            response = await client.get("/chat/history", params={"user_id": user_id, "task_id": 1, "limit": 20})
+            latencies.append((time.perf_counter() - arrival) * 1000)
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        import_task = asyncio.create_task(client.post(
+            "/import/events", params={"user_id": user_id},
+            files={"file": ("bench.csv", csv_bytes, "text/csv")},
+        ))
+        # Erste Chat-Anfrage kurz nach dem Start des Imports
+        await asyncio.gather(*(
+            chat_request(start + 0.05 + i * CHAT_INTERVAL) for i in range(num_requests)
+        ))
+        chat_done = time.perf_counter() - start
+        (await import_task).raise_for_status()
+        import_done = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {label:<8} Chat p50 {statistics.median(latencies):8.1f} ms  p95 {p95:8.1f} ms  "
+          f"max {latencies[-1]:8.1f} ms  | Chat fertig nach {chat_done:5.2f} s, Import nach {import_done:5.2f} s")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        utils.database.DB_PATH = db_path
+        create_tables()
+        user_id = 1
+        for i in range(100):
+            chat_repository.save_message(user_id, None, 1, "user", f"Nachricht {i}", f"2024-01-01T10:{i // 60:02d}:{i % 60:02d}")
+
+        print(f"Import von {rows} Zeilen, {num_requests} Chat-Anfragen während des Imports")
+        asyncio.run(run("vorher", build_app(legacy_import_events), build_csv(rows, 0), user_id, num_requests))
+        asyncio.run(run("nachher", build_app(import_events), build_csv(rows, 1), user_id, num_requests))
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
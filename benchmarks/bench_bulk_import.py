@@ -0,0 +1,110 @@
+"""
+Benchmark: Import von Events und Aufgaben, zeilenweise vs. mengenbasiert.
+
+Vorher: df.iterrows() mit bis zu fünf Abfragen pro Zeile (Event suchen, anlegen,
+erneut suchen, Aufgabe suchen, anlegen).
+Nachher: import_dataframe – Duplikate in pandas entfernen, vorhandene Events und
+Aufgaben mit je einer Abfrage auflösen, executemany in einer Transaktion.
+
+Aufruf:  python -m benchmarks.bench_bulk_import [zeilen] [aufgaben_pro_event]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_tables
+from utils.import_data import import_dataframe
+
+
+def legacy_import_dataframe(df, user_id):
+    # Zeilenweiser Import wie vor der Umstellung (ohne Fehlerbehandlung pro Zeile)
+    db = pool.acquire(utils.database.DB_PATH, row_factory=sqlite3.Row)
+    imported_events = 0
+    imported_tasks = 0
+    events_processed = set()
+    for _, row in df.iterrows():
+        title = str(row["Titel"]).strip() if pd.notna(row["Titel"]) else ""
+        description = str(row["Beschreibung"]).strip() if pd.notna(row["Beschreibung"]) else ""
+        if not title:
+            continue
+        event_id = None
+        if title not in events_processed:
+            existing_event = db.execute(
+                "SELECT id FROM events WHERE title=? AND user_id=?", (title, user_id)
+            ).fetchone()
+            if existing_event:
+                event_id = existing_event["id"]
+            else:
+                cursor = db.execute(
+                    "INSERT INTO events (user_id, title, description, is_imported) VALUES (?, ?, ?, 1)",
+                    (user_id, title, description)
+                )
+                event_id = cursor.lastrowid
+                imported_events += 1
+            events_processed.add(title)
+        else:
+            event_result = db.execute(
+                "SELECT id FROM events WHERE title=? AND user_id=?", (title, user_id)
+            ).fetchone()
+            if event_result:
+                event_id = event_result["id"]
+        if event_id and "Aufgabe Titel" in row and pd.notna(row["Aufgabe Titel"]):
+            task_title = str(row["Aufgabe Titel"]).strip()
+            task_content = str(row["Aufgabe Inhalt"]).strip() if pd.notna(row["Aufgabe Inhalt"]) else ""
+            if task_title:
+                existing_task = db.execute(
+                    "SELECT id FROM tasks WHERE event_id=? AND title=?", (event_id, task_title)
+                ).fetchone()
+                if not existing_task:
+                    db.execute(
+                        "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, ?)",
+                        (event_id, task_title, task_content)
+                    )
+                    imported_tasks += 1
+    db.commit()
+    db.close()
+    return imported_events, imported_tasks
+
+
+def build_dataframe(rows, tasks_per_event):
+    return pd.DataFrame({
+        "Titel": [f"Event {i // tasks_per_event}" for i in range(rows)],
+        "Beschreibung": [f"Beschreibung {i // tasks_per_event}" for i in range(rows)],
+        "Aufgabe Titel": [f"Aufgabe {i % tasks_per_event}" for i in range(rows)],
+        "Aufgabe Inhalt": ["Inhalt" for _ in range(rows)],
+    })
+
+
+def measure(label, func, df, user_id):
+    start = time.perf_counter()
+    imported = func(df, user_id)
+    first = time.perf_counter() - start
+    # Zweiter Lauf: alle Events und Aufgaben existieren bereits
+    start = time.perf_counter()
+    func(df, user_id)
+    second = time.perf_counter() - start
+    print(f"  {label:<8} neu {imported}  erster Lauf {first:7.2f} s  Wiederholung {second:7.2f} s")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tasks_per_event = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    df = build_dataframe(rows, tasks_per_event)
+    print(f"{rows} Zeilen, {tasks_per_event} Aufgaben pro Event")
+    for label, func in (("vorher", legacy_import_dataframe), ("nachher", import_dataframe)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            utils.database.DB_PATH = db_path
+            create_tables()
+            measure(label, func, df, user_id=1)
+            pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
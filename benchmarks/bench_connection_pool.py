@@ -0,0 +1,96 @@
+"""
+Benchmark: Verbindungsaufbau im Dashboard-Renderpfad.
+
+Simuliert die Abfragen eines Dashboard-Renderings (Statistiken, Events und pro Event
+Aufgaben + Statistiken) einmal mit sqlite3.connect() pro Abfrage (altes Verhalten)
+und mit dem Verbindungspool aus utils.connection_pool – einmal im selben Thread
+(langlebige Threads wie FastAPI-Threadpool und DB-Executor) und einmal mit einem neuen
+Thread pro Rendering, wie bei Streamlit, das für jeden Rerun einen Script-Thread startet.
+
+Aufruf:  python -m benchmarks.bench_connection_pool [anzahl_events] [durchläufe]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables
+
+
+def seed(num_events):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+    user_id = cursor.lastrowid
+    for i in range(num_events):
+        cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, ?, '')", (user_id, f"Event {i}"))
+        event_id = cursor.lastrowid
+        for j in range(3):
+            cursor.execute("INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')", (event_id, f"Task {j}"))
+            cursor.execute(
+                "INSERT INTO stats (user_id, event_id, task_id, score) VALUES (?, ?, ?, ?)",
+                (user_id, event_id, cursor.lastrowid, 50 + j),
+            )
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def render_dashboard(connect, user_id):
+    """Führt die Abfragen eines Dashboard-Renderings aus; jede Abfrage holt sich eine Verbindung."""
+    def query(sql, params):
+        conn = connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    query("SELECT events.title, stats.score FROM stats JOIN events ON stats.event_id = events.id "
+          "WHERE stats.user_id = ? ORDER BY stats.timestamp DESC", (user_id,))
+    events = query("SELECT id, title, description, is_imported FROM events WHERE user_id = ? "
+                   "ORDER BY created_at DESC", (user_id,))
+    for event in events:
+        query("SELECT id, title, content, status FROM tasks WHERE event_id = ?", (event[0],))
+        query("SELECT events.title, stats.score FROM stats JOIN events ON stats.event_id = events.id "
+              "WHERE stats.user_id = ? AND stats.event_id = ? ORDER BY stats.timestamp DESC", (user_id, event[0]))
+
+
+def measure(label, connect, user_id, rounds, thread_per_render=False):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if thread_per_render:
+            thread = threading.Thread(target=render_dashboard, args=(connect, user_id))
+            thread.start()
+            thread.join()
+        else:
+            render_dashboard(connect, user_id)
+    elapsed = (time.perf_counter() - start) / rounds * 1000
+    print(f"{label:<28} {elapsed:8.2f} ms pro Rendering")
+    return elapsed
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id = seed(num_events)
+        print(f"{num_events} Events, {2 + 2 * num_events} Abfragen pro Rendering")
+
+        before = measure("sqlite3.connect pro Abfrage", lambda: sqlite3.connect(utils.database.DB_PATH), user_id, rounds)
+        opened = pool.opened
+        after = measure("Verbindungspool", create_connection, user_id, rounds)
+        print(f"Beschleunigung: {before / after:.1f}x, neue Verbindungen im Pool: {pool.opened - opened}")
+        opened = pool.opened
+        rerun = measure("Verbindungspool, Thread/Rerun", create_connection, user_id, rounds, thread_per_render=True)
+        print(f"Beschleunigung: {before / rerun:.1f}x, neue Verbindungen im Pool: {pool.opened - opened}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
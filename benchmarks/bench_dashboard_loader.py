@@ -0,0 +1,106 @@
+"""
+Benchmark: Datenladen für das Dashboard mit und ohne Aggregations-API.
+
+Vorher: load_events und pro Event auf der Seite load_tasks + load_stats (N+1).
+Nachher: count_dashboard_events + load_dashboard_events (nur die Seite) + load_task_previews
++ load_latest_scores, also vier Abfragen unabhängig von Seitengröße und Anzahl der Events.
+
+Aufruf:  python -m benchmarks.bench_dashboard_loader [anzahl_events] [durchläufe]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import utils.database
+from utils.connection_pool import pool
+from utils.migrations import migration_012_stats_latest
+from utils.database import (
+    count_dashboard_events,
+    create_connection,
+    create_tables,
+    load_dashboard_events,
+    load_latest_scores,
+    load_task_previews,
+)
+
+EVENTS_QUERY = ("SELECT id, title, description, is_imported FROM events WHERE user_id = ? "
+                "ORDER BY created_at DESC")
+TASKS_QUERY = "SELECT id, title, content, status FROM tasks WHERE event_id = ?"
+STATS_QUERY = ("SELECT events.title, stats.score, stats.task_id, stats.timestamp FROM stats "
+               "JOIN events ON stats.event_id = events.id WHERE stats.user_id = ? AND stats.event_id = ? "
+               "ORDER BY stats.timestamp DESC")
+
+
+def seed(num_events, tasks_per_event=5, stats_per_event=10):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+    user_id = cursor.lastrowid
+    for i in range(num_events):
+        cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, ?, '')", (user_id, f"Event {i}"))
+        event_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')",
+            [(event_id, f"Task {j}") for j in range(tasks_per_event)],
+        )
+        cursor.executemany(
+            "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) VALUES (?, ?, NULL, ?, datetime('now', ?))",
+            [(user_id, event_id, 40 + j, f"-{j} minutes") for j in range(stats_per_event)],
+        )
+    migration_012_stats_latest(cursor)
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def render_before(user_id, page_size):
+    conn = create_connection()
+    events = conn.execute(EVENTS_QUERY, (user_id,)).fetchall()
+    cards = []
+    for event in events[:page_size]:
+        tasks = conn.execute(TASKS_QUERY, (event[0],)).fetchall()
+        stats = conn.execute(STATS_QUERY, (user_id, event[0])).fetchall()
+        cards.append((event, tasks, stats[0][1] if stats else None))
+    conn.close()
+    return cards
+
+
+def render_after(user_id, page_size):
+    count_dashboard_events(user_id)
+    page = load_dashboard_events(user_id, limit=page_size)
+    event_ids = [e["id"] for e in page]
+    previews = load_task_previews(event_ids)
+    latest_scores = load_latest_scores(user_id, event_ids)
+    return [(e, previews[e["id"]], latest_scores.get(e["id"])) for e in page]
+
+
+def measure(label, render, user_id, page_size, rounds):
+    raw = create_connection()._conn
+    queries = []
+    raw.set_trace_callback(queries.append)
+    render(user_id, page_size)
+    raw.set_trace_callback(None)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(user_id, page_size)
+    elapsed = (time.perf_counter() - start) / rounds * 1000
+    print(f"  {label:<8} {len(queries):5d} Abfragen  {elapsed:8.2f} ms")
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id = seed(num_events)
+        for page_size in (2, num_events):
+            print(f"{num_events} Events, {page_size} Events pro Seite")
+            measure("vorher", render_before, user_id, page_size, rounds)
+            measure("nachher", render_after, user_id, page_size, rounds)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
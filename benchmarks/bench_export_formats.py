@@ -0,0 +1,77 @@
+"""
+Benchmark: Dateigröße und Dauer von Export und Einlesen je Format (CSV, Excel, Parquet).
+
+Exportiert dieselben Zeilen aus iter_export_rows mit stream_csv, write_xlsx und
+write_parquet und liest die Dateien so ein, wie es der Import tut (CSV in Chunks mit
+dtype=str, Excel komplett, Parquet batchweise über pyarrow). Gemessen wird nur das
+Lesen/Schreiben der Datei, nicht das Einfügen in die Datenbank.
+
+Aufruf:  python -m benchmarks.bench_export_formats [events] [aufgaben_pro_event]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import utils.database
+from benchmarks.bench_export_query import seed
+from utils.connection_pool import pool
+from utils.database import create_tables
+from utils.export_data import export_columns, iter_export_rows, stream_csv, write_parquet, write_xlsx
+from utils.import_data import IMPORT_CHUNK_SIZE
+
+
+def write_csv(path, rows, columns):
+    with open(path, "wb") as f:
+        for block in stream_csv(rows, columns):
+            f.write(block)
+
+
+def read_csv(path):
+    return sum(len(chunk) for chunk in pd.read_csv(path, chunksize=IMPORT_CHUNK_SIZE, dtype=str))
+
+
+def read_xlsx(path):
+    return len(pd.read_excel(path))
+
+
+def read_parquet(path):
+    return sum(batch.num_rows for batch in pq.ParquetFile(path).iter_batches(batch_size=IMPORT_CHUNK_SIZE))
+
+
+FORMATS = [
+    ("CSV", "csv", write_csv, read_csv),
+    ("Excel", "xlsx", write_xlsx, read_xlsx),
+    ("Parquet", "parquet", write_parquet, read_parquet),
+]
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tasks_per_event = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id, event_ids = seed(num_events, tasks_per_event, 1)
+        # Zeilen vorab laden, damit nur das Schreiben gemessen wird
+        rows = list(iter_export_rows(user_id, event_ids))
+        columns = export_columns()
+        print(f"{len(rows)} Zeilen ({num_events} Events x {tasks_per_event} Aufgaben)")
+        for label, extension, write, read in FORMATS:
+            path = os.path.join(tmp, f"export.{extension}")
+            start = time.perf_counter()
+            write(path, rows, columns)
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            count = read(path)
+            read_time = time.perf_counter() - start
+            print(f"  {label:<8} {os.path.getsize(path) / 1e6:7.2f} MB  schreiben {written:6.2f} s  "
+                  f"lesen {read_time:6.2f} s  ({count} Zeilen)")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
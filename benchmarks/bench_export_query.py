@@ -0,0 +1,111 @@
+"""
+Benchmark: Exportzeilen für alle Events eines Benutzers.
+
+Vorher: pro Event eine Abfrage für das Event, eine für die Aufgaben und pro Aufgabe eine
+für die letzte Bewertung (1 + E + E*T Abfragen).
+Nachher: iter_export_rows – eine Abfrage, die Events, Aufgaben und die letzte Bewertung
+je Aufgabe in SQLite verknüpft.
+
+Aufruf:  python -m benchmarks.bench_export_query [events] [aufgaben_pro_event] [bewertungen_pro_aufgabe]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_dedicated_connection, create_tables
+from utils.export_data import iter_export_rows
+
+
+def legacy_iter_export_rows(user_id, event_ids, include_tasks=True, include_stats=True, trace=None):
+    conn = create_dedicated_connection()
+    if trace is not None:
+        conn.set_trace_callback(trace)
+    try:
+        for event_id in event_ids:
+            event = conn.execute("""
+                SELECT events.id, events.title,
+                       CASE WHEN events.user_id = ? THEN 'Persönlich'
+                            ELSE 'Geteilt von ' || users.username END,
+                       events.description
+                FROM events
+                LEFT JOIN shared_events ON shared_events.event_id = events.id
+                                       AND shared_events.shared_with_user_id = ?
+                LEFT JOIN users ON users.id = shared_events.shared_by_user_id
+                WHERE events.id = ? AND (events.user_id = ? OR shared_events.id IS NOT NULL)
+                LIMIT 1
+            """, (user_id, user_id, event_id, user_id)).fetchone()
+            if event is None:
+                continue
+            tasks = conn.execute(
+                "SELECT id, title, content FROM tasks WHERE event_id = ? ORDER BY id", (event_id,)
+            ).fetchall() if include_tasks else []
+            if not tasks:
+                yield event + (None,) * 5
+                continue
+            for task in tasks:
+                row = event + task
+                if include_stats:
+                    latest = conn.execute("""
+                        SELECT score, timestamp FROM stats
+                        WHERE user_id = ? AND event_id = ? AND task_id = ?
+                        ORDER BY timestamp DESC, id DESC LIMIT 1
+                    """, (user_id, event_id, task[0])).fetchone()
+                    row += latest or (None, None)
+                yield row
+    finally:
+        conn.close()
+
+
+def seed(num_events, tasks_per_event, stats_per_task):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+    user_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO events (user_id, title, description) VALUES (?, ?, 'Beschreibung')",
+        [(user_id, f"Event {i}") for i in range(num_events)],
+    )
+    event_ids = [row[0] for row in cursor.execute("SELECT id FROM events WHERE user_id = ? ORDER BY id", (user_id,))]
+    cursor.executemany(
+        "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, 'Inhalt')",
+        [(event_id, f"Aufgabe {j}") for event_id in event_ids for j in range(tasks_per_event)],
+    )
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) "
+        "SELECT ?, event_id, id, ?, datetime('2024-01-01', ?) FROM tasks",
+        [(user_id, 40 + k, f"+{k} days") for k in range(stats_per_task)],
+    )
+    conn.commit()
+    conn.close()
+    return user_id, event_ids
+
+
+def measure(label, rows_func):
+    start = time.perf_counter()
+    count = sum(1 for _ in rows_func())
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {count:7d} Zeilen  {elapsed:7.2f} s")
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tasks_per_event = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    stats_per_task = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id, event_ids = seed(num_events, tasks_per_event, stats_per_task)
+        queries = []
+        print(f"{num_events} Events x {tasks_per_event} Aufgaben, {stats_per_task} Bewertungen pro Aufgabe")
+        measure("vorher", lambda: legacy_iter_export_rows(user_id, event_ids, trace=queries.append))
+        print(f"           {len(queries)} Abfragen")
+        measure("nachher", lambda: iter_export_rows(user_id, event_ids))
+        print("           1 Abfrage")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
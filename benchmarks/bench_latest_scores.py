@@ -0,0 +1,96 @@
+"""
+Benchmark: letzte Bewertung für die Event-Karten einer Dashboard-Seite.
+
+Vorher: korrelierte Unterabfrage auf stats je Event der Seite (ORDER BY timestamp DESC LIMIT 1
+über idx_stats_user_event_timestamp) – pro Karte ein Indexabstieg in die große Tabelle stats.
+Nachher: load_latest_scores liest die Seite in einer Abfrage aus stats_latest,
+eine Zeile je Benutzer und Event, die save_stats fortschreibt.
+
+Aufruf:  python -m benchmarks.bench_latest_scores [anzahl_events] [bewertungen_pro_event] [durchläufe]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables, load_latest_scores
+from utils.event_stats_manager import save_stats
+from utils.migrations import migration_012_stats_latest
+
+PAGE_SIZE = 10
+# Verhalten vor der Umstellung (LAST_SCORE_SUBQUERY in load_dashboard_events)
+LEGACY_QUERY = """
+    SELECT events.id,
+           (SELECT stats.score FROM stats
+            WHERE stats.user_id = ? AND stats.event_id = events.id
+            ORDER BY stats.timestamp DESC, stats.id DESC LIMIT 1)
+    FROM events WHERE events.id IN ({placeholders})
+"""
+
+
+def seed(num_events, stats_per_event):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+    user_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO events (user_id, title, description) VALUES (?, ?, '')",
+        [(user_id, f"Event {i}") for i in range(num_events)],
+    )
+    event_ids = [row[0] for row in cursor.execute("SELECT id FROM events WHERE user_id = ?", (user_id,))]
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) "
+        "VALUES (?, ?, NULL, ?, datetime('2024-01-01', ?))",
+        ((user_id, event_id, j % 100, f"+{j} minutes") for event_id in event_ids for j in range(stats_per_event)),
+    )
+    migration_012_stats_latest(cursor)
+    conn.commit()
+    conn.close()
+    return user_id, event_ids
+
+
+def latest_before(user_id, event_ids):
+    conn = create_connection()
+    placeholders = ", ".join("?" for _ in event_ids)
+    scores = dict(conn.execute(LEGACY_QUERY.format(placeholders=placeholders), [user_id, *event_ids]).fetchall())
+    conn.close()
+    return scores
+
+
+def measure(label, func, user_id, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            func(user_id, page)
+    elapsed = (time.perf_counter() - start) / (rounds * len(pages)) * 1000
+    print(f"  {label:<8} {elapsed:8.3f} ms pro Seite")
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    stats_per_event = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id, event_ids = seed(num_events, stats_per_event)
+        pages = [event_ids[i:i + PAGE_SIZE] for i in range(0, len(event_ids), PAGE_SIZE)]
+        assert latest_before(user_id, event_ids) == load_latest_scores(user_id, event_ids)
+
+        print(f"{num_events} Events mit je {stats_per_event} Bewertungen, {PAGE_SIZE} Events pro Seite")
+        measure("vorher", latest_before, user_id, pages, rounds)
+        measure("nachher", load_latest_scores, user_id, pages, rounds)
+
+        # Mehraufwand beim Schreiben: save_stats pflegt stats_latest in derselben Transaktion
+        start = time.perf_counter()
+        for i in range(200):
+            save_stats(user_id, event_ids[i % len(event_ids)], None, i % 100)
+        print(f"  save_stats {(time.perf_counter() - start) / 200 * 1000:8.3f} ms pro Aufruf (inkl. stats_latest)")
+        assert latest_before(user_id, event_ids) == load_latest_scores(user_id, event_ids)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
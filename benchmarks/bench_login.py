@@ -0,0 +1,87 @@
+"""
+Benchmark: Login-Latenz und -Durchsatz mit scrypt-Passworthashes.
+
+Vorher: Klartextvergleich in SQL (WHERE username = ? AND password = ?).
+Nachher: authenticate_user mit scrypt je Kostenstufe n (r=8, p=1). Gemessen werden die
+Latenz einzelner Logins und der Durchsatz eines Login-Sturms mit mehreren Threads,
+die wie Streamlit-Sessions parallel Logins prüfen. hashlib.scrypt gibt den GIL frei,
+der Durchsatz skaliert daher mit den CPU-Kernen; der Speicher je Login ist 128 * n * r Bytes.
+
+Aufruf:  python -m benchmarks.bench_login [logins] [threads ...]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import utils.database
+import utils.passwords
+from utils.auth import authenticate_user
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables
+from utils.passwords import hash_password
+
+NUM_USERS = 50
+COSTS = (2 ** 14, 2 ** 15, 2 ** 16)
+LEGACY_QUERY = "SELECT id, is_premium FROM users WHERE username = ? AND password = ?"
+
+
+def seed(store_password):
+    conn = create_connection()
+    conn.execute("DELETE FROM users")
+    conn.executemany(
+        "INSERT INTO users (username, password) VALUES (?, ?)",
+        [(f"user{i}", store_password(f"passwort{i}")) for i in range(NUM_USERS)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def login_before(username, password):
+    conn = create_connection()
+    user = conn.execute(LEGACY_QUERY, (username, password)).fetchone()
+    conn.close()
+    return user
+
+
+def measure(label, login, num_logins, thread_counts):
+    credentials = [(f"user{i % NUM_USERS}", f"passwort{i % NUM_USERS}") for i in range(num_logins)]
+    latencies = []
+    for username, password in credentials:
+        start = time.perf_counter()
+        assert login(username, password)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    throughput = []
+    for threads in thread_counts:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            start = time.perf_counter()
+            assert all(executor.map(lambda c: login(*c), credentials))
+            throughput.append(f"{threads} Threads {num_logins / (time.perf_counter() - start):8.1f}/s")
+    print(f"  {label:<18} p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms  | " + "  ".join(throughput))
+
+
+def main():
+    num_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    thread_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, 4, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        print(f"{num_logins} Logins, {NUM_USERS} Benutzer, {os.cpu_count()} CPU-Kerne")
+
+        seed(lambda password: password)
+        measure("vorher (Klartext)", login_before, num_logins, thread_counts)
+
+        for n in COSTS:
+            utils.passwords.SCRYPT_N = n
+            seed(hash_password)
+            memory = 128 * n * utils.passwords.SCRYPT_R / 2 ** 20
+            measure(f"scrypt n=2^{n.bit_length() - 1} {memory:.0f}MiB", authenticate_user, num_logins, thread_counts)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: Score-Verlauf der Statistikseite – Dauer und Größe der Plotly-Figur.
+
+Vorher: alle Bewertungen laden und jede als Punkt an px.line übergeben.
+Nachher: load_score_history – bis CHART_MAX_POINTS Bewertungen einzeln, darüber
+Tages-, Wochen- oder Monatsdurchschnitte aus SQL.
+Gemessen wird bis einschließlich fig.to_json(), also der Nutzlast für den Browser.
+
+Aufruf:  python -m benchmarks.bench_score_history [jahre]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import plotly.express as px
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables
+from utils.migrations import migration_010_stats_rollup, migration_011_stats_rollup_pages
+from utils.event_stats_manager import load_stats
+from utils.stats_engine import add_moving_average, load_score_history
+
+
+def seed(num_stats, years):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES (?, 'bench')", (f"bench{num_stats}",))
+    user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Bench Event', '')", (user_id,))
+    event_id = cursor.lastrowid
+    step = years * 365 * 86400 / num_stats
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) VALUES (?, ?, NULL, ?, datetime('2020-01-01', ?))",
+        [(user_id, event_id, (i * 37) % 101, f"+{int(i * step)} seconds") for i in range(num_stats)],
+    )
+    # Rollup wie bei der Migration aus den vorhandenen Bewertungen aufbauen
+    migration_010_stats_rollup(cursor)
+    migration_011_stats_rollup_pages(cursor)
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def figure_json(df):
+    df = add_moving_average(df)
+    return px.line(df, x="timestamp", y=["score", "moving_average"], markers=True).to_json()
+
+
+def chart_before(user_id):
+    df = pd.DataFrame(load_stats.uncached(user_id), columns=["event_title", "score", "task_id", "timestamp"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df = df.sort_values("timestamp")
+    return figure_json(df), len(df), None
+
+
+def chart_after(user_id):
+    df, bucket = load_score_history.uncached(user_id)
+    return figure_json(df), len(df), bucket
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    payload, points, bucket = func()
+    elapsed = time.perf_counter() - start
+    mode = f"pro {bucket[0]}" if bucket else "einzeln"
+    print(f"    {label:<8} {elapsed * 1000:8.0f} ms  {len(payload) / 1e6:7.2f} MB  {points:8d} Punkte ({mode})")
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        print(f"Bewertungen gleichmäßig über {years} Jahre")
+        for num_stats in (400, 10000, 100000, 1000000):
+            user_id = seed(num_stats, years)
+            print(f"  {num_stats} Bewertungen")
+            measure("vorher", lambda: chart_before(user_id))
+            measure("nachher", lambda: chart_after(user_id))
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: Auswertung aller Aufgaben für display_event_statistics.
+
+Vorher: load_stats, DataFrame für den Score-Verlauf, Gruppierung in einem defaultdict,
+pro Aufgabe get_task_by_id und Kennzahlen (Durchschnitt, gleitender Durchschnitt, Trend)
+in Python-Schleifen.
+Nachher: load_score_history + add_moving_average für den Score-Verlauf und load_task_page
+über alle Aufgaben – Kennzahlen aus stats_rollup, Titel per JOIN in derselben Abfrage,
+gleitender Durchschnitt und Trend vektorisiert.
+
+Aufruf:  python -m benchmarks.bench_stats_engine [bewertungen] [aufgaben] [durchläufe]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables, get_task_by_id
+from utils.event_stats_manager import load_stats
+from utils.migrations import migration_010_stats_rollup, migration_011_stats_rollup_pages
+from utils.stats_engine import MOVING_AVERAGE_WINDOW, add_moving_average, load_score_history, load_task_page
+
+
+def seed(num_stats, num_tasks):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+    user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Bench Event', '')", (user_id,))
+    event_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')",
+        [(event_id, f"Aufgabe {j}") for j in range(num_tasks)],
+    )
+    task_ids = [row[0] for row in cursor.execute("SELECT id FROM tasks WHERE event_id = ?", (event_id,))]
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) VALUES (?, ?, ?, ?, datetime('2020-01-01', ?))",
+        [(user_id, event_id, task_ids[i % num_tasks], (i * 37) % 101, f"+{i} minutes") for i in range(num_stats)],
+    )
+    # Rollup wie bei der Migration aus den vorhandenen Bewertungen aufbauen
+    migration_010_stats_rollup(cursor)
+    migration_011_stats_rollup_pages(cursor)
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def slope(scores):
+    n = len(scores)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(scores) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(scores))
+    return covariance / sum((x - mean_x) ** 2 for x in range(n))
+
+
+def statistics_before(user_id):
+    all_stats = load_stats.uncached(user_id)
+    df = pd.DataFrame(all_stats, columns=["event_title", "score", "task_id", "timestamp"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df = df.sort_values("timestamp")
+    df["moving_average"] = df["score"].rolling(MOVING_AVERAGE_WINDOW, min_periods=1).mean()
+    task_scores = defaultdict(list)
+    for title, score, task_id, timestamp in all_stats:
+        task_scores[task_id].append((title, score, timestamp))
+    details = []
+    for task_id, results in task_scores.items():
+        task = get_task_by_id(task_id)
+        if task:
+            chronological = [score for _, score, _ in reversed(results)]
+            recent = chronological[-MOVING_AVERAGE_WINDOW:]
+            details.append((
+                task[2], len(results), sum(chronological) / len(chronological),
+                sum(recent) / len(recent), slope(chronological), results[:5],
+            ))
+    return df, details
+
+
+def statistics_after(user_id):
+    history, _ = load_score_history.uncached(user_id)
+    # LIMIT -1: alle Aufgaben auf einer Seite
+    return add_moving_average(history), load_task_page.uncached(user_id, limit=-1)
+
+
+def measure(func, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = func()
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    num_stats = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        user_id = seed(num_stats, num_tasks)
+        before, (_, details) = measure(lambda: statistics_before(user_id), runs)
+        after, (_, tasks) = measure(lambda: statistics_after(user_id), runs)
+        # Gleiche Kennzahlen in beiden Varianten
+        assert len(tasks) == len(details)
+        expected = {row[0]: row[1:5] for row in details}
+        for row in tasks.itertuples():
+            attempts, avg_score, moving_average, trend = expected[row.task_title]
+            assert row.attempts == attempts and abs(row.avg_score - avg_score) < 1e-9
+            assert abs(row.moving_average - moving_average) < 1e-9 and abs(row.trend - trend) < 1e-6
+        print(f"{num_stats} Bewertungen, {num_tasks} Aufgaben, Mittel über {runs} Durchläufe")
+        print(f"  vorher  {before * 1000:8.1f} ms")
+        print(f"  nachher {after * 1000:8.1f} ms")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: Aufgabenliste der Statistikseite (eine Seite mit ITEMS_PER_PAGE Aufgaben).
+
+Vorher: load_stats lädt alle Bewertungen, Gruppierung in einem defaultdict, pro Aufgabe
+get_task_by_id und Kennzahlen (Durchschnitt, gleitender Durchschnitt, Trend) in
+Python-Schleifen – für alle Aufgaben, obwohl nur eine Seite angezeigt wird.
+Nachher: count_stat_tasks + load_task_page – Kennzahlen aus stats_rollup, die letzten
+Bewertungen per ROW_NUMBER() nur für die Aufgaben der Seite.
+
+Aufruf:  python -m benchmarks.bench_stats_pagination [aufgaben] [durchläufe]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables, get_task_by_id
+from utils.event_stats_manager import ITEMS_PER_PAGE, load_stats
+from utils.migrations import migration_010_stats_rollup, migration_011_stats_rollup_pages
+from utils.stats_engine import MOVING_AVERAGE_WINDOW, count_stat_tasks, load_task_page
+
+
+def seed(num_tasks, stats_per_task):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES (?, 'bench')", (f"bench{stats_per_task}",))
+    user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Bench Event', '')", (user_id,))
+    event_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')",
+        [(event_id, f"Aufgabe {j}") for j in range(num_tasks)],
+    )
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) "
+        "SELECT ?, event_id, id, ?, datetime('2020-01-01', ?) FROM tasks WHERE event_id = ?",
+        [(user_id, (k * 37) % 101, f"+{k} hours", event_id) for k in range(stats_per_task)],
+    )
+    # Rollup wie bei der Migration aus den vorhandenen Bewertungen aufbauen
+    migration_010_stats_rollup(cursor)
+    migration_011_stats_rollup_pages(cursor)
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def slope(scores):
+    n = len(scores)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(scores) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(scores))
+    return covariance / sum((x - mean_x) ** 2 for x in range(n))
+
+
+def page_before(user_id, offset):
+    # load_stats liefert die neueste Bewertung zuerst
+    task_scores = defaultdict(list)
+    for title, score, task_id, timestamp in load_stats.uncached(user_id):
+        task_scores[task_id].append((score, timestamp))
+    details = []
+    for task_id, results in task_scores.items():
+        task = get_task_by_id(task_id)
+        if task:
+            chronological = [score for score, _ in reversed(results)]
+            recent = chronological[-MOVING_AVERAGE_WINDOW:]
+            details.append((
+                task_id, len(results), sum(chronological) / len(chronological),
+                sum(recent) / len(recent), slope(chronological), results[:5],
+            ))
+    return len(details), details[offset:offset + ITEMS_PER_PAGE]
+
+
+def page_after(user_id, offset):
+    return count_stat_tasks.uncached(user_id), load_task_page.uncached(user_id, limit=ITEMS_PER_PAGE, offset=offset)
+
+
+def measure(func, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        print(f"{num_tasks} Aufgaben, Seite 2 mit {ITEMS_PER_PAGE} Aufgaben, Mittel über {runs} Durchläufe")
+        for stats_per_task in (2, 20, 200, 2000):
+            user_id = seed(num_tasks, stats_per_task)
+            # Gleiche Kennzahlen in beiden Varianten (alle Aufgaben auf einer Seite)
+            _, details = page_before(user_id, 0)
+            page = load_task_page.uncached(user_id, limit=num_tasks).set_index("task_id")
+            for task_id, attempts, avg_score, moving_average, trend, _ in details[:num_tasks]:
+                row = page.loc[task_id]
+                assert row["attempts"] == attempts and abs(row["avg_score"] - avg_score) < 1e-9
+                assert abs(row["moving_average"] - moving_average) < 1e-9 and abs(row["trend"] - trend) < 1e-6
+            before = measure(lambda: page_before(user_id, ITEMS_PER_PAGE), runs)
+            after = measure(lambda: page_after(user_id, ITEMS_PER_PAGE), runs)
+            print(f"  {num_tasks * stats_per_task:8d} Bewertungen  vorher {before:8.1f} ms  nachher {after:6.1f} ms")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: Dashboard-Metriken (Anzahl Quizze, Durchschnitt) bei wachsender Quiz-Historie.
+
+Vorher: load_stats(user_id) lädt jede Bewertung, Anzahl und Durchschnitt in Python.
+Nachher: load_stats_summary liest die Tabelle stats_rollup (eine Zeile je Event und Aufgabe),
+die Laufzeit hängt nicht mehr von der Anzahl der Bewertungen ab.
+
+Aufruf:  python -m benchmarks.bench_stats_rollup [events] [aufgaben_pro_event] [durchläufe]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_connection, create_tables
+from utils.event_stats_manager import load_stats, load_stats_summary
+from utils.migrations import migration_010_stats_rollup
+
+
+def seed(num_events, tasks_per_event, stats_per_task):
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES (?, 'bench')", (f"bench{stats_per_task}",))
+    user_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO events (user_id, title, description) VALUES (?, ?, '')",
+        [(user_id, f"Event {i}") for i in range(num_events)],
+    )
+    cursor.execute(
+        "INSERT INTO tasks (event_id, title, content) "
+        "SELECT events.id, 'Aufgabe ' || n.value, '' FROM events, json_each(?) AS n WHERE events.user_id = ?",
+        (str(list(range(tasks_per_event))), user_id),
+    )
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) "
+        "SELECT ?, tasks.event_id, tasks.id, ?, datetime('2024-01-01', ?) "
+        "FROM tasks JOIN events ON events.id = tasks.event_id WHERE events.user_id = ?",
+        [(user_id, 40 + k % 60, f"+{k} hours", user_id) for k in range(stats_per_task)],
+    )
+    # Rollup wie bei der Migration aus den vorhandenen Bewertungen aufbauen
+    migration_010_stats_rollup(cursor)
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def measure(func, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def dashboard_before(user_id):
+    stats = load_stats.uncached(user_id)
+    num_quizzes = len(stats)
+    return num_quizzes, sum(stat[1] for stat in stats) / num_quizzes if num_quizzes else 0
+
+
+def dashboard_after(user_id):
+    summary = load_stats_summary.uncached(user_id)
+    return summary["attempts"], summary["avg_score"]
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    tasks_per_event = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.database.DB_PATH = os.path.join(tmp, "bench.db")
+        create_tables()
+        print(f"{num_events} Events x {tasks_per_event} Aufgaben, Mittel über {runs} Durchläufe")
+        for stats_per_task in (1, 10, 100, 1000):
+            user_id = seed(num_events, tasks_per_event, stats_per_task)
+            before, after = dashboard_before(user_id), dashboard_after(user_id)
+            assert before[0] == after[0] and abs(before[1] - after[1]) < 1e-9
+            print(f"  {before[0]:8d} Bewertungen  vorher {measure(lambda: dashboard_before(user_id), runs):9.2f} ms  "
+                  f"nachher {measure(lambda: dashboard_after(user_id), runs):7.2f} ms")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: Speicherspitze beim CSV-Import, komplett eingelesen vs. in Chunks.
+
+Vorher: await file.read() + pd.read_csv über alle Bytes – die Datei liegt zweimal im
+Speicher, dazu der komplette DataFrame.
+Nachher: import_csv_stream liest die (gespoolte) Datei in Chunks von IMPORT_CHUNK_SIZE
+Zeilen und bestätigt jeden Chunk einzeln.
+
+Gemessen wird die Python-Allokationsspitze mit tracemalloc (pandas/numpy-Puffer
+eingeschlossen), getrennt für mehrere Dateigrößen.
+
+Aufruf:  python -m benchmarks.bench_streaming_import [zeilen ...]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import utils.database
+from utils.connection_pool import pool
+from utils.database import create_tables
+from utils.import_data import import_csv_stream, import_dataframe
+
+
+def write_csv(path, rows, tasks_per_event=10):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Titel,Beschreibung,Aufgabe Titel,Aufgabe Inhalt\n")
+        for i in range(rows):
+            f.write(f"Event {i // tasks_per_event},Beschreibung {i // tasks_per_event},"
+                    f"Aufgabe {i % tasks_per_event},{'Inhalt ' * 10}\n")
+
+
+def import_whole(path, user_id):
+    with open(path, "rb") as f:
+        content = f.read()
+    df = pd.read_csv(io.BytesIO(content))
+    return import_dataframe(df, user_id)
+
+
+def import_streaming(path, user_id):
+    with open(path, "rb") as f:
+        return import_csv_stream(f, user_id, progress=lambda _: None)
+
+
+def measure(label, func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, 1)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<8} Spitze {peak / 1024 / 1024:8.1f} MB  {elapsed:6.2f} s")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50000, 200000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"import_{rows}.csv")
+            write_csv(path, rows)
+            print(f"{rows} Zeilen ({os.path.getsize(path) / 1024 / 1024:.1f} MB CSV)")
+            for label, func in (("vorher", import_whole), ("nachher", import_streaming)):
+                db_path = os.path.join(tmp, f"{label}_{rows}.db")
+                utils.database.DB_PATH = db_path
+                create_tables()
+                measure(label, func, path)
+                pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: Schreibkonkurrenz mehrerer Prozesse auf dieselbe SQLite-Datei.
+
+Simuliert Streamlit (Quiz-Statistiken), chat_api (Chatnachrichten) und import_data
+(Events) als getrennte Prozesse, die gleichzeitig schreiben und lesen. Verglichen wird
+das alte Standardverhalten (Rollback-Journal, kein busy_timeout) mit PRAGMA_PROFILE.
+
+Aufruf:  python -m benchmarks.bench_write_contention [prozesse] [schreibvorgänge]
+"""
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import time
+
+import utils.database
+from utils.connection_pool import PRAGMA_PROFILE, apply_pragmas, pool
+from utils.database import create_tables
+
+# SQLite-Standard: Rollback-Journal, synchronous=FULL, kein Warten auf Sperren
+LEGACY_PRAGMAS = {"busy_timeout": 0, "journal_mode": "DELETE", "synchronous": "FULL"}
+
+WRITES = [
+    "INSERT INTO stats (user_id, event_id, task_id, score) VALUES (1, 1, 1, 80)",
+    "INSERT INTO chat_messages (user_id, role, content, timestamp) VALUES (1, 'user', 'hallo', datetime('now'))",
+    "INSERT INTO events (user_id, title, description, is_imported) VALUES (1, 'Import', '', 1)",
+]
+
+
+# Obergrenze in Sekunden, die run() auf das Ergebnis eines Prozesses wartet
+RESULT_TIMEOUT = 120
+
+
+def _connect(db_path, pragmas):
+    conn = sqlite3.connect(db_path, timeout=0)
+    try:
+        apply_pragmas(conn, pragmas)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def worker(db_path, pragmas, index, num_writes, results):
+    # Legt immer genau ein Ergebnis (geschrieben, locked, fehler) ab, damit run() nie endlos wartet
+    conn = None
+    written = 0
+    locked = 0
+    error = None
+    try:
+        for _ in range(num_writes):
+            try:
+                if conn is None:
+                    conn = _connect(db_path, pragmas)
+                conn.execute(WRITES[index % len(WRITES)])
+                conn.commit()
+                written += 1
+                conn.execute("SELECT COUNT(*) FROM stats WHERE user_id = 1").fetchone()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                if conn is not None:
+                    conn.rollback()
+                locked += 1
+    except Exception as e:
+        error = repr(e)
+    finally:
+        if conn is not None:
+            conn.close()
+        results.put((written, locked, error))
+
+
+def run(label, db_path, pragmas, processes, num_writes):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(db_path, pragmas, i, num_writes, results))
+        for i in range(processes)
+    ]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    outcomes = []
+    try:
+        for _ in procs:
+            outcomes.append(results.get(timeout=RESULT_TIMEOUT))
+    except queue.Empty:
+        exitcodes = [p.exitcode for p in procs]
+        for p in procs:
+            p.terminate()
+        print(f"{label:<22} abgebrochen: kein Ergebnis nach {RESULT_TIMEOUT} s, Exitcodes {exitcodes}")
+        return
+    finally:
+        for p in procs:
+            p.join()
+    elapsed = time.perf_counter() - start
+    done = sum(written for written, _, _ in outcomes)
+    locked = sum(count for _, count, _ in outcomes)
+    errors = [error for _, _, error in outcomes if error]
+    print(f"{label:<22} {done / elapsed:8.0f} Schreibvorgänge/s, 'database is locked': {locked}")
+    for error in errors:
+        print(f"{'':<22} Prozess abgebrochen: {error}")
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    num_writes = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, label, pragmas in (
+            ("legacy", "Rollback-Journal", LEGACY_PRAGMAS),
+            ("profile", "PRAGMA_PROFILE (WAL)", PRAGMA_PROFILE),
+        ):
+            utils.database.DB_PATH = os.path.join(tmp, f"{name}.db")
+            pool.pragmas = pragmas
+            create_tables()
+            pool.close_all()
+            # journal_mode ist persistent und wurde von create_tables() gesetzt
+            worker_pragmas = {k: v for k, v in pragmas.items() if k != "journal_mode"}
+            run(label, utils.database.DB_PATH, worker_pragmas, processes, num_writes)
+
+
+if __name__ == "__main__":
+    main()
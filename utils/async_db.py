@@ -0,0 +1,28 @@
+"""
+Asynchroner Zugriff auf die SQLite-Datenbank für die FastAPI-Dienste.
+
+sqlite3 blockiert; in einem async-Handler würde jeder Aufruf die Event-Loop anhalten,
+bei import_events für die Dauer des gesamten Imports. run_db() führt die synchronen
+Repository-Funktionen stattdessen in einem eigenen Thread-Executor aus. Die Threads
+leben so lange wie der Prozess, sodass jeder seine Verbindung aus dem Pool wiederverwendet.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Anzahl gleichzeitiger Datenbank-Threads. Ein laufender Import belegt einen davon,
+# die übrigen bedienen weiterhin /chat/history und /chat/send.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="sqlite")
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Führt eine blockierende Datenbankfunktion im DB-Executor aus.
+    :param func: Synchrone Funktion, z.B. chat_repository.get_history
+    :return: Rückgabewert von func; Exceptions (z.B. sqlite3.Error) werden weitergereicht
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
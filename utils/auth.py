@@ -2,6 +2,8 @@ import datetime
 import streamlit as st
 from sqlite3 import Error
 from utils.database import create_connection
+from utils.cache import cached, invalidate, invalidate_all
+from utils.passwords import hash_password, needs_rehash, verify_dummy, verify_password
 
 
 # More professional color scheme
@@ -162,8 +164,9 @@ def register():
                     try:
                         cursor = conn.cursor()
                         cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
-                                       (username, password))
+                                       (username, hash_password(password)))
                         conn.commit()
+                        invalidate(None)  # load_all_users
                         st.success("Registrierung erfolgreich! Bitte melde dich jetzt an.")
                         st.session_state["show_login"] = True
                         st.session_state["show_register"] = False
@@ -336,34 +339,24 @@ def login(cookies):
         
         if submit:
             if username and password:
-                conn = create_connection()
-                if conn is not None:
-                    try:
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT id, is_premium FROM users WHERE username = ? AND password = ?", 
-                        (username, password))
-                        user = cursor.fetchone()
+                user = authenticate_user(username, password)
 
-                        if user:
-                            user_id, is_premium = user
-                            cookies["logged_in"] = "true"
-                            cookies["user_id"] = str(user_id)
-                            cookies["username"] = username
-                            cookies["is_premium"] = str(is_premium)
-                            cookies.save()
+                if user:
+                    user_id, is_premium = user
+                    cookies["logged_in"] = "true"
+                    cookies["user_id"] = str(user_id)
+                    cookies["username"] = username
+                    cookies["is_premium"] = str(is_premium)
+                    cookies.save()
 
-                            st.session_state.logged_in = True
-                            st.session_state.user_id = str(user_id)
-                            st.session_state.username = username
-                            st.session_state.is_premium = bool(is_premium)
-                            st.rerun()
+                    st.session_state.logged_in = True
+                    st.session_state.user_id = str(user_id)
+                    st.session_state.username = username
+                    st.session_state.is_premium = bool(is_premium)
+                    st.rerun()
 
-                        else:
-                            st.error("Ungültige Anmeldedaten.")
-                    except Error as e:
-                        st.error(f"Fehler beim Login: {e}")
-                    finally:
-                        conn.close()
+                else:
+                    st.error("Ungültige Anmeldedaten.")
             else:
                 st.error("Benutzername und Passwort dürfen nicht leer sein.")
     
@@ -375,6 +368,69 @@ def login(cookies):
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+def authenticate_user(username, password):
+    """
+    Prüft Benutzername und Passwort gegen den gespeicherten scrypt-Hash.
+    Klartext oder veraltete Kostenparameter werden nach erfolgreicher Prüfung neu gehasht.
+    :return: (user_id, is_premium) oder None bei ungültigen Anmeldedaten
+    """
+    conn = create_connection()
+    if conn is not None:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, is_premium, password FROM users WHERE username = ?", (username,))
+            user = cursor.fetchone()
+            if user is None:
+                verify_dummy(password)
+                return None
+            user_id, is_premium, stored = user
+            if not verify_password(password, stored):
+                return None
+            if needs_rehash(stored):
+                cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hash_password(password), user_id))
+                conn.commit()
+            return user_id, is_premium
+        except Error as e:
+            st.error(f"Fehler beim Login: {e}")
+        finally:
+            conn.close()
+    return None
+
+def rehash_plaintext_passwords(batch_size=20):
+    """
+    Ersetzt verbliebene Klartext-Passwörter durch scrypt-Hashes, z.B. für Benutzer, die sich
+    seit der Umstellung nicht angemeldet haben. Die Hashes werden ohne offene Transaktion
+    berechnet und je Batch kurz geschrieben, andere Schreiber warten also höchstens ein UPDATE.
+    :param batch_size: Anzahl Benutzer je Schreibtransaktion
+    :return: Anzahl ersetzter Passwörter
+    """
+    conn = create_connection()
+    if conn is None:
+        return 0
+    updated = 0
+    last_id = 0
+    try:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT id, password FROM users WHERE id > ? AND password NOT LIKE 'scrypt$%' ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            hashed = [(hash_password(password), user_id, password) for user_id, password in rows]
+            # password = ? lässt Einträge aus, die ein Login inzwischen ersetzt hat
+            cursor.executemany("UPDATE users SET password = ? WHERE id = ? AND password = ?", hashed)
+            updated += cursor.rowcount
+            conn.commit()
+    except Error as e:
+        print(f"Fehler beim Hashen der Passwörter: {e}")
+    finally:
+        conn.close()
+    return updated
+
 def logout():
     if "logged_in" in st.session_state:
         cookies = st.session_state.get("cookies")
@@ -402,8 +458,11 @@ def update_profile(user_id, new_username=None, new_password=None):
                              (new_username, user_id))
             if new_password:
                 cursor.execute("UPDATE users SET password = ? WHERE id = ?",
-                             (new_password, user_id))
+                             (hash_password(new_password), user_id))
             conn.commit()
+            if new_username:
+                # Benutzername erscheint in load_all_users und in geteilten Events anderer Benutzer
+                invalidate_all()
             return True
         except Error as e:
             st.error(f"Profilupdate fehlgeschlagen: {e}")
@@ -411,6 +470,7 @@ def update_profile(user_id, new_username=None, new_password=None):
         finally:
             conn.close()        
 
+@cached()
 def load_all_users():
     conn = create_connection()
     if conn is not None:
@@ -0,0 +1,71 @@
+import functools
+import os
+import threading
+from collections import defaultdict
+import streamlit as st
+
+# Lebensdauer der Cache-Einträge in Sekunden. Schreibzugriffe dieser App invalidieren sofort,
+# die TTL begrenzt nur die Verzögerung bei Änderungen aus anderen Prozessen (z.B. import_data).
+CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Generationszähler je Bereich ("user:1", "event:5", "global"). Eine Invalidierung erhöht
+# den Zähler; da er Teil des Cache-Schlüssels ist, werden alte Einträge nicht mehr getroffen
+# und laufen über TTL bzw. max_entries aus.
+_generations = defaultdict(int)
+_global_generation = 0
+_lock = threading.Lock()
+_registry = {}
+
+
+def _scope_key(scope, key):
+    return f"{scope}:{key}" if scope else "global"
+
+
+def _generation(scope_key):
+    with _lock:
+        return _global_generation, _generations[scope_key]
+
+
+def invalidate(scope, key=None):
+    """
+    Verwirft alle Cache-Einträge eines Bereichs.
+    :param scope: "user", "event" oder None für Funktionen ohne Bereich (z.B. load_all_users)
+    :param key: ID des Benutzers bzw. Events
+    """
+    with _lock:
+        _generations[_scope_key(scope, key)] += 1
+
+
+def invalidate_all():
+    """Verwirft alle Cache-Einträge, z.B. wenn eine Änderung mehrere Benutzer betrifft."""
+    global _global_generation
+    with _lock:
+        _global_generation += 1
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_call(func_name, generation, args, kwargs):
+    return _registry[func_name](*args, **dict(kwargs))
+
+
+def cached(scope=None):
+    """
+    Dekorator für Lesefunktionen: Ergebnisse werden über st.cache_data zwischen Reruns
+    wiederverwendet. Bei scope="user"/"event" bestimmt das erste Argument den Bereich.
+    Die ungecachte Funktion bleibt als .uncached erreichbar.
+    """
+    def decorator(func):
+        func_name = f"{func.__module__}.{func.__qualname__}"
+        _registry[func_name] = func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # IDs kommen teils als str (Session/Cookies), teils als int – einheitlich als str
+            args = tuple(str(arg) if i == 0 and scope else arg for i, arg in enumerate(args))
+            scope_key = _scope_key(scope, args[0] if scope else None)
+            return _cached_call(func_name, _generation(scope_key), args, tuple(sorted(kwargs.items())))
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,143 @@
+"""
+In-Process-Zugriff auf die Chatnachrichten.
+
+Wird sowohl von der Streamlit-App als auch vom FastAPI chat_router verwendet, damit
+die App Nachrichten ohne HTTP-Umweg über localhost:8000 lesen und speichern kann.
+Datenbankfehler werden als sqlite3.Error weitergereicht; der Aufrufer entscheidet,
+ob daraus eine HTTPException oder eine Log-Meldung wird.
+"""
+import os
+from sqlite3 import OperationalError
+from utils.database import create_connection
+
+HISTORY_COLUMNS = ("id", "user_id", "event_id", "task_id", "role", "content", "timestamp")
+# Seitengröße für GET /chat/history (Standard und Obergrenze)
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "100"))
+CHAT_HISTORY_MAX_PAGE_SIZE = 1000
+
+
+def _connect():
+    conn = create_connection()
+    if conn is None:
+        raise OperationalError("Datenbankverbindung fehlgeschlagen")
+    return conn
+
+
+def _scope_filter(user_id, event_id=None, task_id=None):
+    # Gleiche Logik wie bisher in chat_api: Task-Chat, Event-Chat (ohne Task) oder alle Chats
+    if task_id:
+        return "user_id = ? AND task_id = ?", [user_id, task_id]
+    if event_id:
+        return "user_id = ? AND event_id = ? AND task_id IS NULL", [user_id, event_id]
+    return "user_id = ?", [user_id]
+
+
+def save_message(user_id, event_id, task_id, role, content, timestamp):
+    """
+    Speichert eine Chatnachricht.
+    :return: ID der neuen Nachricht
+    """
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO chat_messages (user_id, event_id, task_id, role, content, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, event_id, task_id, role, content, timestamp))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def get_history(user_id, event_id=None, task_id=None, limit=None, before_id=None, after_id=None):
+    """
+    Lädt die Chat-Historie für einen Benutzer, Event und/oder Task (älteste zuerst).
+    Keyset-Pagination über die Nachrichten-ID: ohne after_id liefert limit die neuesten
+    Nachrichten (vor before_id), mit after_id die nächsten Nachrichten nach dieser ID.
+    :param limit: Maximale Anzahl Nachrichten, None = alle
+    :param before_id: Nur Nachrichten mit kleinerer ID (ältere Seite nachladen)
+    :param after_id: Nur Nachrichten mit größerer ID (neue Nachrichten abholen)
+    :return: Liste von Dictionaries mit den Spalten aus HISTORY_COLUMNS
+    """
+    where, params = _scope_filter(user_id, event_id, task_id)
+    if before_id is not None:
+        where += " AND id < ?"
+        params.append(before_id)
+    if after_id is not None:
+        where += " AND id > ?"
+        params.append(after_id)
+    # Für die letzte Seite rückwärts lesen, damit SQLite nach LIMIT Zeilen aufhört
+    tail = limit is not None and after_id is None
+    query = f"""
+        SELECT {", ".join(HISTORY_COLUMNS)}
+        FROM chat_messages
+        WHERE {where}
+        ORDER BY id {"DESC" if tail else "ASC"}
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    if tail:
+        rows.reverse()
+    return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+
+def clear_history(user_id, event_id=None, task_id=None):
+    """
+    Löscht die Chat-Historie für einen Benutzer, Event und/oder Task.
+    :return: Anzahl gelöschter Nachrichten
+    """
+    if task_id:
+        where, params = "user_id = ? AND task_id = ?", [user_id, task_id]
+    elif event_id:
+        where, params = "user_id = ? AND event_id = ?", [user_id, event_id]
+    else:
+        where, params = "user_id = ?", [user_id]
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM chat_messages WHERE {where}", params)
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def get_stats(user_id, event_id=None):
+    """
+    Statistiken über die Chat-Aktivität eines Benutzers (optional pro Event).
+    """
+    where, params = "user_id = ?", [user_id]
+    if event_id:
+        where, params = "user_id = ? AND event_id = ?", [user_id, event_id]
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                COUNT(*) as total_messages,
+                COUNT(CASE WHEN role = 'user' THEN 1 END) as user_messages,
+                COUNT(CASE WHEN role = 'assistant' THEN 1 END) as ai_messages,
+                MIN(timestamp) as first_message,
+                MAX(timestamp) as last_message
+            FROM chat_messages
+            WHERE {where}
+        """, params)
+        result = cursor.fetchone()
+    finally:
+        conn.close()
+    return {
+        "total_messages": result[0],
+        "user_messages": result[1],
+        "ai_messages": result[2],
+        "first_message": result[3],
+        "last_message": result[4]
+    }
@@ -0,0 +1,186 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+# Pragma-Profil für alle Verbindungen. Streamlit, chat_api und import_data schreiben
+# gleichzeitig in dieselbe Datei: WAL erlaubt Lesen während eines Schreibvorgangs,
+# busy_timeout lässt konkurrierende Schreiber warten statt "database is locked" zu werfen.
+# Jeder Wert kann über die Umgebungsvariable SQLITE_<NAME> überschrieben werden.
+# busy_timeout steht zuerst, damit schon der Wechsel auf WAL auf andere Schreiber wartet.
+DEFAULT_PRAGMAS = {
+    "busy_timeout": 5000,         # Millisekunden
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,         # negativ = KiB, also ca. 20 MB
+    "mmap_size": 134217728,       # 128 MB
+    "temp_store": "MEMORY",
+}
+PRAGMA_PROFILE = {
+    name: os.getenv(f"SQLITE_{name.upper()}", default) for name, default in DEFAULT_PRAGMAS.items()
+}
+
+
+def apply_pragmas(conn, pragmas=None):
+    """
+    Wendet ein Pragma-Profil auf eine Verbindung an.
+    :param conn: sqlite3-Verbindung
+    :param pragmas: Dictionary {pragma: wert}, Standard ist PRAGMA_PROFILE
+    """
+    for name, value in (PRAGMA_PROFILE if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+def open_connection(db_path, timeout=5.0, pragmas=None):
+    """
+    Öffnet eine eigene sqlite3-Verbindung mit Pragma-Profil, außerhalb des Pools.
+    Für lang laufende Lesevorgänge, die zwischen Threads wandern (z.B. Streaming-Antworten);
+    der Aufrufer muss sie selbst schließen.
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+    apply_pragmas(conn, pragmas)
+    return conn
+
+
+class PooledConnection:
+    """
+    Wrapper um eine wiederverwendbare sqlite3-Verbindung.
+    close() gibt die Verbindung an den Pool zurück, statt sie zu schließen,
+    damit der bestehende Code (conn.close() im finally-Block) unverändert bleibt.
+    Alle Hilfsfunktionen eines Threads teilen sich dieselbe Verbindung; release meldet,
+    ob dies die äußerste Ausleihe war. Nur dann werden offene Änderungen verworfen,
+    sonst würde ein verschachtelter Aufruf (z.B. load_tasks in share_event) die noch
+    nicht bestätigten Schreibzugriffe des Aufrufers zurückrollen.
+    """
+
+    def __init__(self, conn, release=None):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_release", release or (lambda: True))
+
+    def close(self):
+        release = self.__dict__.get("_release")
+        if release is None:
+            return  # bereits zurückgegeben
+        object.__setattr__(self, "_release", None)
+        # Nicht bestätigte Änderungen verwerfen – entspricht dem Verhalten von sqlite3.Connection.close()
+        if release() and self._conn.in_transaction:
+            self._conn.rollback()
+
+    def __del__(self):
+        # Nicht geschlossene Ausleihe freigeben, damit die Zählung des Threads stimmt
+        release = self.__dict__.get("_release")
+        if release is not None:
+            release()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+
+class ConnectionPool:
+    """
+    Verwaltet eine sqlite3-Verbindung pro Thread und Datenbankpfad, jede Verbindung wird
+    also nur von einem Thread genutzt.
+    Streamlit startet für jeden Rerun einen neuen Script-Thread: dort teilen sich alle
+    Abfragen eines Reruns eine Verbindung, der nächste Rerun öffnet eine neue, und die
+    alte wird beim nächsten Öffnen geschlossen (_prune_dead_threads). Die Einsparung ist
+    hier auf die Abfragen innerhalb eines Reruns begrenzt. Voll wirkt der Pool in
+    langlebigen Threads – FastAPI-Threadpool, DB-Executor (run_db) und Import-Worker –,
+    die ihre Verbindung für die Lebensdauer des Prozesses behalten.
+    """
+
+    def __init__(self, timeout=5.0, pragmas=None):
+        self.timeout = timeout
+        self.pragmas = PRAGMA_PROFILE if pragmas is None else pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []  # (weakref auf Thread, sqlite3.Connection)
+        self._pid = os.getpid()
+        self.opened = 0
+
+    def _connections_for_thread(self):
+        # Nach einem fork (z.B. uvicorn-Worker) dürfen geerbte Verbindungen nicht weiterverwendet werden
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            with self._lock:
+                self._connections = []
+            self._pid = os.getpid()
+        conns = getattr(self._local, "connections", None)
+        if conns is None:
+            conns = self._local.connections = {}
+            self._local.borrowed = {}
+        return conns
+
+    def _prune_dead_threads(self):
+        alive = []
+        for thread_ref, conn in self._connections:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                conn.close()
+            else:
+                alive.append((thread_ref, conn))
+        self._connections = alive
+
+    def acquire(self, db_path, row_factory=None):
+        """
+        Gibt die Verbindung des aktuellen Threads für db_path zurück und öffnet sie bei Bedarf.
+        :param db_path: Pfad zur SQLite-Datenbank
+        :param row_factory: Optionale row_factory (z.B. sqlite3.Row)
+        :return: PooledConnection
+        """
+        conns = self._connections_for_thread()
+        key = (os.path.abspath(db_path), row_factory)
+        conn = conns.get(key)
+        if conn is None:
+            conn = open_connection(db_path, self.timeout, self.pragmas)
+            if row_factory is not None:
+                conn.row_factory = row_factory
+            conns[key] = conn
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections.append((weakref.ref(threading.current_thread()), conn))
+                self.opened += 1
+        borrowed = self._local.borrowed
+        borrowed[key] = borrowed.get(key, 0) + 1
+
+        def release():
+            borrowed[key] -= 1
+            return borrowed[key] == 0
+
+        return PooledConnection(conn, release)
+
+    @contextmanager
+    def connection(self, db_path, row_factory=None):
+        """
+        Kontextmanager: bestätigt die Transaktion bei Erfolg, rollt sie bei einem Fehler zurück.
+        """
+        conn = self.acquire(db_path, row_factory)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Schließt alle vom Pool geöffneten Verbindungen (z.B. für Tests oder beim Herunterfahren)."""
+        with self._lock:
+            for _, conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+pool = ConnectionPool()
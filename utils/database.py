@@ -1,133 +1,52 @@
-import sqlite3
+import os
 from sqlite3 import Error
+from utils.connection_pool import open_connection, pool
+from utils.migrations import migrate
 
-def create_connection():
-    """Erstelle eine Verbindung zur SQLite-Datenbank."""
+# Pfad zur Datenbank, über EVENTMANAGER_DB_PATH konfigurierbar
+DB_PATH = os.getenv("EVENTMANAGER_DB_PATH", "data/eventmanager.db")
+
+def create_connection(db_path=None):
+    """
+    Liefert die wiederverwendbare Verbindung des aktuellen Threads zur SQLite-Datenbank.
+    conn.close() gibt die Verbindung an den Pool zurück.
+    """
     conn = None
     try:
-        conn = sqlite3.connect("data/eventmanager.db")  
+        conn = pool.acquire(db_path or DB_PATH)
         return conn
     except Error as e:
         print(e)
     return conn
 
-def add_is_imported_column():
-    """Füge die is_imported Spalte zur events Tabelle hinzu."""
-    conn = create_connection()
-    if conn is not None:
-        try:
-            cursor = conn.cursor()
-            # Prüfe, ob die Spalte bereits existiert
-            cursor.execute("PRAGMA table_info(events)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'is_imported' not in columns:
-                cursor.execute("ALTER TABLE events ADD COLUMN is_imported INTEGER DEFAULT NULL")
-                conn.commit()
-                print("Spalte 'is_imported' erfolgreich hinzugefügt.")
-            else:
-                print("Spalte 'is_imported' existiert bereits.")
-        except Error as e:
-            print(f"Fehler beim Hinzufügen der Spalte: {e}")
-        finally:
-            conn.close()
+def get_connection(db_path=None):
+    """
+    Kontextmanager für Datenbankzugriffe:
+        with get_connection() as conn:
+            conn.execute(...)
+    Bestätigt bei Erfolg und rollt bei einem Fehler zurück.
+    """
+    return pool.connection(db_path or DB_PATH)
+
+def create_dedicated_connection(db_path=None):
+    """
+    Eigene, nicht gepoolte Verbindung, z.B. für Export-Generatoren, deren Iteration in
+    wechselnden Threads fortgesetzt wird. Muss vom Aufrufer geschlossen werden.
+    """
+    return open_connection(db_path or DB_PATH)
 
 def create_tables():
-    """Erstelle die notwendigen Tabellen in der Datenbank."""
+    """
+    Erstelle bzw. aktualisiere das Datenbankschema über die versionierten Migrationen.
+    Bei einer aktuellen Datenbank wird nur PRAGMA user_version gelesen, daher ist der
+    Aufruf bei jedem Streamlit-Rerun unkritisch.
+    """
     conn = create_connection()
     if conn is not None:
         try:
-            cursor = conn.cursor()
-            # Tabelle für Benutzer
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL
-                )
-            """)
-            # Tabelle für Events (mit is_imported Spalte)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    is_imported INTEGER DEFAULT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            """)
-            # Tabelle für Tasks
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    status TEXT DEFAULT 'in Bearbeitung',
-                    FOREIGN KEY (event_id) REFERENCES events (id)
-                )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS shared_tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                shared_by_user_id INTEGER NOT NULL,
-                shared_with_user_id INTEGER NOT NULL,
-                FOREIGN KEY (task_id) REFERENCES tasks (id),
-                FOREIGN KEY (shared_by_user_id) REFERENCES users (id),
-                FOREIGN KEY (shared_with_user_id) REFERENCES users (id)
-            )
-        """)
-
-            # Tabelle für geteilte Events
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS shared_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id INTEGER NOT NULL,
-                    shared_by_user_id INTEGER NOT NULL,
-                    shared_with_user_id INTEGER NOT NULL,
-                    FOREIGN KEY (event_id) REFERENCES events (id),
-                    FOREIGN KEY (shared_by_user_id) REFERENCES users (id),
-                    FOREIGN KEY (shared_with_user_id) REFERENCES users (id)
-                )
-            """)
-            # Tabelle für Chatnachrichten
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    event_id INTEGER,
-                    task_id INTEGER,
-                    role TEXT NOT NULL,         -- 'user' oder 'assistant'
-                    content TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (event_id) REFERENCES events (id),
-                    FOREIGN KEY (task_id) REFERENCES tasks (id)
-                )
-            """)
-
-            # Tabelle für Statistiken
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                event_id INTEGER NOT NULL,
-                task_id INTEGER,
-                score INTEGER NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (event_id) REFERENCES events (id),
-                FOREIGN KEY (task_id) REFERENCES tasks (id)
-            )
-        """)
-            conn.commit()
-            print("Tabellen erfolgreich erstellt oder existieren bereits.")
-            add_is_imported_column()
-            add_is_premium_column()
-            add_quiz_limit_columns()
+            applied = migrate(conn)
+            if applied:
+                print(f"Datenbank-Migrationen angewendet: {', '.join(map(str, applied))}")
         except Error as e:
             print(e)
         finally:
@@ -192,53 +111,154 @@ def get_username_by_id(user_id):
             conn.close()
     return username
 
-def add_is_premium_column():
+def count_dashboard_events(user_id):
+    """
+    Zählt die Events eines Benutzers für Dashboard-Metriken und Pagination.
+    :param user_id: Die ID des Benutzers
+    :return: Tupel (alle Events, nicht importierte Events)
+    """
     conn = create_connection()
     if conn:
         try:
             cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(users)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if "is_premium" not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN is_premium INTEGER DEFAULT 0")
-                conn.commit()
-                print("Spalte 'is_premium' erfolgreich hinzugefügt.")
-            else:
-                print("Spalte 'is_premium' existiert bereits.")
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(is_imported IS NULL OR is_imported = 0), 0)
+                FROM events
+                WHERE user_id = ?
+            """, (user_id,))
+            return cursor.fetchone()
         except Error as e:
-            print(f"Fehler bei DB-Erweiterung: {e}")
+            print(f"Fehler beim Zählen der Events: {e}")
         finally:
             conn.close()
+    return 0, 0
 
+def load_dashboard_events(user_id, include_imported=True, limit=None, offset=0):
+    """
+    Lädt die Events eines Benutzers für das Dashboard in einer Abfrage
+    (Aufgaben über load_task_previews, letzte Bewertung über load_latest_scores).
+    :param user_id: Die ID des Benutzers
+    :param include_imported: False blendet importierte Events aus
+    :param limit: Maximale Anzahl Events (eine Dashboard-Seite), None für alle
+    :param offset: Startposition der Seite
+    :return: Liste von Dictionaries (id, title, description, is_imported)
+    """
+    conn = create_connection()
+    events = []
+    if conn:
+        try:
+            cursor = conn.cursor()
+            query = """
+                SELECT events.id, events.title, events.description, events.is_imported
+                FROM events
+                WHERE events.user_id = ?
+            """
+            params = [user_id]
+            if not include_imported:
+                query += " AND (events.is_imported IS NULL OR events.is_imported = 0)"
+            query += " ORDER BY events.created_at DESC"
+            if limit:
+                query += " LIMIT ? OFFSET ?"
+                params.extend([limit, offset])
+            cursor.execute(query, params)
+            for row in cursor.fetchall():
+                events.append({
+                    "id": row[0],
+                    "title": row[1],
+                    "description": row[2],
+                    "is_imported": row[3],
+                })
+        except Error as e:
+            print(f"Fehler beim Laden der Dashboard-Events: {e}")
+        finally:
+            conn.close()
+    return events
 
-def add_quiz_limit_columns():
-    """Fügt die Spalten daily_quiz_count und last_quiz_reset zur users Tabelle hinzu."""
+def load_shared_dashboard_events(user_id):
+    """
+    Lädt die mit dem Benutzer geteilten Events für das Dashboard in einer Abfrage.
+    :param user_id: Die ID des Benutzers
+    :return: Liste von Dictionaries (id, title, shared_by, description)
+    """
     conn = create_connection()
+    events = []
     if conn:
         try:
             cursor = conn.cursor()
-            
-            # Prüfe, ob 'daily_quiz_count' existiert
-            cursor.execute("PRAGMA table_info(users)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if "daily_quiz_count" not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN daily_quiz_count INTEGER DEFAULT 0")
-                print("Spalte 'daily_quiz_count' erfolgreich hinzugefügt.")
-            else:
-                print("Spalte 'daily_quiz_count' existiert bereits.")
+            cursor.execute("""
+                SELECT events.id, events.title, users.username, events.description
+                FROM shared_events
+                JOIN events ON shared_events.event_id = events.id
+                JOIN users ON shared_events.shared_by_user_id = users.id
+                WHERE shared_events.shared_with_user_id = ?
+            """, (user_id,))
+            for row in cursor.fetchall():
+                events.append({
+                    "id": row[0],
+                    "title": row[1],
+                    "shared_by": row[2],
+                    "description": row[3],
+                })
+        except Error as e:
+            print(f"Fehler beim Laden der geteilten Dashboard-Events: {e}")
+        finally:
+            conn.close()
+    return events
 
-            # Prüfe, ob 'last_quiz_reset' existiert
-            if "last_quiz_reset" not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN last_quiz_reset TEXT") # TEXT für ISO-Format Datum
-                print("Spalte 'last_quiz_reset' erfolgreich hinzugefügt.")
-            else:
-                print("Spalte 'last_quiz_reset' existiert bereits.")
-            
-            conn.commit()
+def load_task_previews(event_ids, shared_with_user_id=None):
+    """
+    Lädt die Aufgaben mehrerer Events (z.B. der aktuellen Dashboard-Seite) in einer Abfrage.
+    :param event_ids: Liste von Event-IDs
+    :param shared_with_user_id: Falls gesetzt, nur Aufgaben, die mit diesem Benutzer geteilt wurden
+    :return: Dictionary {event_id: [(task_id, title, content), ...]}
+    """
+    previews = {event_id: [] for event_id in event_ids}
+    if not event_ids:
+        return previews
+    conn = create_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" for _ in event_ids)
+            query = f"SELECT event_id, id, title, content FROM tasks WHERE event_id IN ({placeholders})"
+            params = list(event_ids)
+            if shared_with_user_id is not None:
+                query += " AND id IN (SELECT task_id FROM shared_tasks WHERE shared_with_user_id = ?)"
+                params.append(shared_with_user_id)
+            cursor.execute(query + " ORDER BY event_id, id", params)
+            for event_id, task_id, title, content in cursor.fetchall():
+                previews[event_id].append((task_id, title, content))
+        except Error as e:
+            print(f"Fehler beim Laden der Aufgaben: {e}")
+        finally:
+            conn.close()
+    return previews
+
+def load_latest_scores(user_id, event_ids):
+    """
+    Lädt die letzte Bewertung eines Benutzers für mehrere Events (z.B. die Karten der
+    aktuellen Dashboard-Seite) in einer Abfrage aus der Tabelle stats_latest.
+    :param event_ids: Liste von Event-IDs
+    :return: Dictionary {event_id: score}; Events ohne Bewertung fehlen
+    """
+    scores = {}
+    if not event_ids:
+        return scores
+    conn = create_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" for _ in event_ids)
+            cursor.execute(
+                f"SELECT event_id, score FROM stats_latest WHERE user_id = ? AND event_id IN ({placeholders})",
+                [user_id, *event_ids]
+            )
+            scores = dict(cursor.fetchall())
         except Error as e:
-            print(f"Fehler bei DB-Erweiterung (Quiz Limit): {e}")
+            print(f"Fehler beim Laden der letzten Bewertungen: {e}")
         finally:
             conn.close()
+    return scores
 
 if __name__ == "__main__":
     create_tables()
\ No newline at end of file
@@ -7,6 +7,7 @@ import streamlit as st
 import sqlite3
 from sqlite3 import Error
 from utils.database import create_connection
+from utils.cache import cached, invalidate, invalidate_all
 
 def create_event(user_id, title, description):
     """
@@ -25,6 +26,7 @@ def create_event(user_id, title, description):
                     (user_id, title, description),
                 )
                 conn.commit()
+                invalidate("user", user_id)
                 st.success("Event erfolgreich erstellt!")
             except Error as e:
                 st.error(f"Fehler beim Erstellen des Events: {e}")
@@ -50,6 +52,8 @@ def edit_event(event_id, new_title, new_description):
                 (new_title, new_description, event_id),
             )
             conn.commit()
+            # Titel erscheint auch in geteilten Events und Statistiken anderer Benutzer
+            invalidate_all()
             st.success("Event erfolgreich bearbeitet!")
         except Error as e:
             st.error(f"Fehler beim Bearbeiten des Events: {e}")
@@ -67,6 +71,7 @@ def delete_event(event_id):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
             conn.commit()
+            invalidate_all()
             st.success("Event erfolgreich gelöscht!")
         except Error as e:
             st.error(f"Fehler beim Löschen des Events: {e}")
@@ -90,6 +95,7 @@ def create_task(event_id, title, content):
                     (event_id, title, content),
                 )
                 conn.commit()
+                invalidate("event", event_id)
                 st.success("Aufgabe erfolgreich erstellt!")
             except Error as e:
                 st.error(f"Fehler beim Erstellen der Aufgabe: {e}")
@@ -114,6 +120,7 @@ def edit_task(task_id, new_title, new_content):
                 (new_title, new_content, task_id),
             )
             conn.commit()
+            invalidate_all()
             st.success("Aufgabe erfolgreich bearbeitet!")
         except Error as e:
             st.error(f"Fehler beim Bearbeiten der Aufgabe: {e}")
@@ -131,12 +138,14 @@ def delete_task(task_id):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
             conn.commit()
+            invalidate_all()
             st.success("Aufgabe erfolgreich gelöscht!")
         except Error as e:
             st.error(f"Fehler beim Löschen der Aufgabe: {e}")
         finally:
             conn.close()
 
+@cached("user")
 def load_events(user_id):
     """Lade alle Events eines Benutzers einschließlich is_imported Status."""
     conn = create_connection()
@@ -202,6 +211,7 @@ def load_events_with_import_status(user_id, include_imported=True):
             conn.close()
     return events
 
+@cached("event")
 def load_tasks(event_id):
     """
     Lädt alle Aufgaben (Tasks) für ein bestimmtes Event.
@@ -248,6 +258,10 @@ def share_event(event_id, shared_by_user_id, shared_with_username):
                 if cursor.fetchone():
                     st.warning(f"Event wurde bereits mit {shared_with_username} geteilt.")
                 else:
+                    # Tasks vor dem ersten Schreibzugriff laden, damit die Transaktion
+                    # ohne verschachtelte Datenbankaufrufe abläuft
+                    tasks = load_tasks(event_id)
+
                     # Teile das Event und alle zugehörigen Tasks
                     cursor.execute("""
                         INSERT INTO shared_events 
@@ -255,8 +269,6 @@ def share_event(event_id, shared_by_user_id, shared_with_username):
                         VALUES (?, ?, ?)
                     """, (event_id, shared_by_user_id, shared_with_user_id))
                     
-                    # Teile alle Tasks des Events
-                    tasks = load_tasks(event_id)
                     for task in tasks:
                         cursor.execute("""
                             INSERT INTO shared_tasks 
@@ -265,6 +277,7 @@ def share_event(event_id, shared_by_user_id, shared_with_username):
                         """, (task[0], shared_by_user_id, shared_with_user_id))
                     
                     conn.commit()
+                    invalidate("user", shared_with_user_id)
                     st.success(f"Event erfolgreich mit {shared_with_username} geteilt!")
             else:
                 st.error(f"Benutzer '{shared_with_username}' nicht gefunden.")
@@ -273,6 +286,7 @@ def share_event(event_id, shared_by_user_id, shared_with_username):
         finally:
             conn.close()
 
+@cached("user")
 def load_shared_events(user_id):
     """
     Lädt die mit dem Benutzer geteilten Events.
@@ -4,15 +4,18 @@ import json
 import logging
 import re
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
 import streamlit as st
 from utils.auth import get_user_premium_status_and_quiz_limits, update_user_quiz_count
 from utils.mascot_reactions import show_mascot_reaction
 from utils.chat_api import save_chat_message_direct
+from utils import chat_repository
 from utils.database import create_connection, get_event_by_id, get_task_by_id, get_tasks_by_event_id
 from utils.task_manager import load_tasks, load_shared_tasks
 from utils.event_stats_manager import save_stats
+from utils.llm_cache import get_cached_response, store_response
 from sqlite3 import Error
 
 # Configure logging
@@ -21,25 +24,38 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 # Load environment variables
 load_dotenv()
 
-# Configuration API
-api_key = os.getenv("DEEPSEEK_API_KEY")
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key,
-)
+# Configuration API – Client erst beim ersten API-Aufruf anlegen, damit der Import
+# (z.B. für get_user_event_stats oder Tests) keinen API-Key voraussetzt
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=os.getenv("DEEPSEEK_API_KEY"),
+        )
+    return _client
 
 # Verzeichnis für Fragen
 QUESTIONS_DIR = "data/questions"
 os.makedirs(QUESTIONS_DIR, exist_ok=True)
 API_URL = "http://localhost:8000"
+# Chatnachrichten standardmäßig in-process speichern; die Chat-API nur bei Bedarf (z.B. getrennte Hosts)
+CHAT_USE_HTTP_API = os.getenv("CHAT_USE_HTTP_API", "false").lower() == "true"
+QUIZ_MODEL = "deepseek/deepseek-chat"
 DAILY_QUIZ_LIMIT_FREE = 5
+# Maximale Anzahl gleichzeitiger Bewertungsanfragen an die API
+GRADING_MAX_WORKERS = int(os.getenv("GRADING_MAX_WORKERS", "5"))
 
 
-def generate_questions(event_title, tasks):
+def generate_questions(event_title, tasks, force_refresh=False):
     """
     Generiert Fragen basierend auf den Tasks eines Events mithilfe der DeepSeek-API.
     :param event_title: Titel des Events
     :param tasks: Liste der Tasks des Events (jeder Task ist ein Tupel: (id, title, content))
+    :param force_refresh: KI-Cache überspringen und den Eintrag mit der neuen Antwort überschreiben
     :return: Eine Liste von generierten Fragen
     """
     try:
@@ -60,18 +76,23 @@ def generate_questions(event_title, tasks):
         f"Gib nur das JSON zurück, nichts anderes."
     )
 
-        # Sende die Anfrage an die API
-        response = client.chat.completions.create(
-            extra_body={},
-            model="deepseek/deepseek-chat",
-            messages=[
-                {"role": "user", "content": prompt},
-            ],
-        )
+        # Identischer Aufgabeninhalt -> Antwort aus dem KI-Cache statt erneutem API-Aufruf
+        cached_text = None if force_refresh else get_cached_response(QUIZ_MODEL, prompt)
+        if cached_text is not None:
+            generated_text = cached_text
+        else:
+            # Sende die Anfrage an die API
+            response = get_client().chat.completions.create(
+                extra_body={},
+                model=QUIZ_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt},
+                ],
+            )
 
-        # Überprüfe die Antwort
-        logging.info("API-Antwort: %s", response)
-        generated_text = response.choices[0].message.content.strip()
+            # Überprüfe die Antwort
+            logging.info("API-Antwort: %s", response)
+            generated_text = response.choices[0].message.content.strip()
         if generated_text.startswith("```json") and generated_text.endswith("```"):
             generated_text = generated_text.strip("```json").strip("```")
         if not generated_text:
@@ -85,6 +106,8 @@ def generate_questions(event_title, tasks):
             logging.error("Fehler beim Parsen des JSON: %s", json_err)
             st.error("Die API-Antwort ist kein gültiges JSON.")
             return []
+        if cached_text is None:
+            store_response(QUIZ_MODEL, prompt, generated_text)
 
         # Speichere die Fragen in einer JSON-Datei
         json_file_path = os.path.join(QUESTIONS_DIR, f"{event_title}.json")
@@ -246,18 +269,22 @@ def evaluate_answer(question, user_answer, correct_answer):
             f"Gib NUR JSON zurück: {{\"score\": X, \"feedback\": \"kurzes konstruktives Feedback\"}}"
         )
 
-        response = client.chat.completions.create(
-            extra_body={},
-            model="deepseek/deepseek-chat",
-            messages=[{"role": "user", "content": prompt}],
-        )
+        # Identisches (Frage, Antwort)-Paar -> Bewertung aus dem KI-Cache
+        raw_content = get_cached_response(QUIZ_MODEL, prompt)
+        from_cache = raw_content is not None
+        if not from_cache:
+            response = get_client().chat.completions.create(
+                extra_body={},
+                model=QUIZ_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+            )
 
-        if not response or not response.choices:
-            raise ValueError("Die API hat keine gültige Antwort zurückgegeben.")
+            if not response or not response.choices:
+                raise ValueError("Die API hat keine gültige Antwort zurückgegeben.")
 
-        raw_content = response.choices[0].message.content
-        if not raw_content:
-            raise ValueError("Die API-Antwort ist leer.")
+            raw_content = response.choices[0].message.content
+            if not raw_content:
+                raise ValueError("Die API-Antwort ist leer.")
 
         # Bereinige das JSON
         cleaned_content = raw_content.strip().strip("```json").strip("```")
@@ -274,7 +301,8 @@ def evaluate_answer(question, user_answer, correct_answer):
 
         if "score" not in evaluation:
             raise ValueError("Das JSON enthält nicht den Schlüssel 'score'.")
-        
+        if not from_cache:
+            store_response(QUIZ_MODEL, prompt, raw_content)
 
         save_user_feedback(question, user_answer, evaluation["score"])
 
@@ -284,6 +312,17 @@ def evaluate_answer(question, user_answer, correct_answer):
         logging.exception("Fehler bei der Bewertung der Antwort: %s", e)
         return {"score": 0}
 
+def evaluate_answers(items):
+    """
+    Bewertet mehrere Antworten parallel, statt jede API-Anfrage nacheinander abzuwarten.
+    :param items: Liste von Tupeln (Frage, Antwort des Benutzers, Musterantwort)
+    :return: Liste der Bewertungen in derselben Reihenfolge wie items
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(GRADING_MAX_WORKERS, len(items))) as executor:
+        return list(executor.map(lambda item: evaluate_answer(*item), items))
+
 def quiz_mode(user_id, event_id):
     from utils.database import get_event_by_id
     st.header("\U0001F9E9 Rätsel-Modus")
@@ -317,17 +356,20 @@ def quiz_mode(user_id, event_id):
         st.session_state["skipped"] = set()
         st.session_state["current_index"] = 0
         st.session_state["quiz_finished"] = False
+        st.session_state["quiz_scores"] = None
         st.session_state["current_task"] = selected_task_title
 
     # Fragen generieren
     if st.button("\U0001F504 Neue Fragen generieren"):
-        questions = generate_questions(selected_task_title, [selected_task])
+        # Neue Fragen ausdrücklich angefordert -> nicht den gecachten Quiz liefern
+        questions = generate_questions(selected_task_title, [selected_task], force_refresh=True)
         if questions:
             st.session_state["questions"] = questions
             st.session_state["answers"] = {}
             st.session_state["skipped"] = set()
             st.session_state["current_index"] = 0
             st.session_state["quiz_finished"] = False
+            st.session_state["quiz_scores"] = None
             st.success("Fragen wurden neu generiert.")
 
     questions = st.session_state["questions"]
@@ -366,24 +408,28 @@ def quiz_mode(user_id, event_id):
             else:
                 if st.button("📝 prüfen"):
                     st.session_state["quiz_finished"] = True
+                    st.session_state["quiz_scores"] = None
 
     # Ergebnisanzeige
     if st.session_state["quiz_finished"]:
         st.markdown("---")
         st.subheader("📊 Ergebnis")
 
-        total_score = 0
-        answered = 0
-        for i, q in enumerate(questions):
-            if i in st.session_state["skipped"]:
-                continue
-            key = f"answer_{i}"
-            answer = st.session_state["answers"].get(key, "")
-            result = evaluate_answer(q["frage"], answer, q["antwort"])
-            score = result["score"]
-            save_stats(user_id, event_id, selected_task[0], score)
-            total_score += score
-            answered += 1
+        # Bewertung nur einmal pro Quizdurchgang: Reruns lesen das Ergebnis aus der Session
+        if st.session_state.get("quiz_scores") is None:
+            pending = [
+                (q["frage"], st.session_state["answers"].get(f"answer_{i}", ""), q["antwort"])
+                for i, q in enumerate(questions)
+                if i not in st.session_state["skipped"]
+            ]
+            with st.spinner("Antworten werden bewertet..."):
+                results = evaluate_answers(pending)
+            st.session_state["quiz_scores"] = [result["score"] for result in results]
+            for score in st.session_state["quiz_scores"]:
+                save_stats(user_id, event_id, selected_task[0], score)
+
+        total_score = sum(st.session_state["quiz_scores"])
+        answered = len(st.session_state["quiz_scores"])
 
         if answered > 0:
             avg = total_score / answered
@@ -414,6 +460,7 @@ def quiz_mode(user_id, event_id):
         with col1:
             if st.button("\U0001F504 Nochmal versuchen"):
                 st.session_state["quiz_finished"] = False
+                st.session_state["quiz_scores"] = None
                 st.session_state["current_index"] = 0
                 st.session_state["answers"] = {}
                 st.session_state["skipped"] = set()
@@ -423,70 +470,54 @@ def quiz_mode(user_id, event_id):
                 del st.session_state["questions"]
                 del st.session_state["current_task"]
                 st.session_state["quiz_finished"] = False
+                st.session_state["quiz_scores"] = None
                 st.rerun()
 
 
-def chat_with_deepseek(user_message, event_id=None, task_id=None, user_id=None):
+def _persist_chat_message(user_id, event_id, task_id, role, content):
     """
-    Optimierte Chatfunktion mit verbesserter Fehlerbehandlung
+    Speichert eine Chatnachricht direkt über das Chat-Repository (ohne HTTP-Umweg).
+    Mit CHAT_USE_HTTP_API=true wird wie früher die Chat-API verwendet, mit der DB als Fallback.
     """
-    if not user_message or not user_message.strip():
-        return "Bitte stellen Sie eine konkrete Frage."
-
-    try:
-        # 1. Nachricht senden
-        msg_data = {
-            "user_id": user_id,
-            "event_id": event_id,
-            "task_id": task_id,
-            "role": "user",
-            "content": user_message,
-            "timestamp": datetime.now().isoformat()
-        }
-        
+    timestamp = datetime.now().isoformat()
+    if CHAT_USE_HTTP_API:
         try:
             response = requests.post(
                 f"{API_URL}/chat/send",
-                json=msg_data,
+                json={
+                    "user_id": user_id,
+                    "event_id": event_id,
+                    "task_id": task_id,
+                    "role": role,
+                    "content": content,
+                    "timestamp": timestamp
+                },
                 timeout=10  # Timeout nach 10 Sekunden
             )
             response.raise_for_status()  # Wirft Exception für 4XX/5XX
+            return
         except requests.exceptions.RequestException as e:
             logging.error(f"API send error: {str(e)}")
-            # Fallback: Direkt in DB speichern
-            save_chat_message_direct(
-                user_id, event_id, task_id, 
-                "user", user_message, 
-                datetime.now().isoformat()
-            )
+    save_chat_message_direct(user_id, event_id, task_id, role, content, timestamp)
+
+
+def chat_with_deepseek(user_message, event_id=None, task_id=None, user_id=None):
+    """
+    Optimierte Chatfunktion mit verbesserter Fehlerbehandlung
+    """
+    if not user_message or not user_message.strip():
+        return "Bitte stellen Sie eine konkrete Frage."
+
+    try:
+        # 1. Nachricht senden
+        _persist_chat_message(user_id, event_id, task_id, "user", user_message)
 
         # 2. KI-Antwort generieren
         prompt = build_prompt(user_message, event_id, task_id)
         ai_response = generate_ai_response(prompt)
         
         # 3. KI-Antwort speichern
-        try:
-            response = requests.post(
-                f"{API_URL}/chat/send",
-                json={
-                    "user_id": user_id,
-                    "event_id": event_id,
-                    "task_id": task_id,
-                    "role": "assistant",
-                    "content": ai_response,
-                    "timestamp": datetime.now().isoformat()
-                },
-                timeout=10
-            )
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logging.error(f"API send error: {str(e)}")
-            # Fallback: Direkt in DB speichern
-            save_chat_message_direct(
-                user_id, event_id, task_id, 
-                "assistant", ai_response, 
-                datetime.now().isoformat()
-            )
+        _persist_chat_message(user_id, event_id, task_id, "assistant", ai_response)
 
         return ai_response
         
@@ -495,6 +526,29 @@ def chat_with_deepseek(user_message, event_id=None, task_id=None, user_id=None):
         return f"Bezogen auf Ihre Aufgabe: Bitte überprüfen Sie den aktuellen Status und identifizieren Sie die nächsten Schritte."
 
 
+def chat_with_deepseek_stream(user_message, event_id=None, task_id=None, user_id=None):
+    """
+    Streaming-Variante von chat_with_deepseek für st.write_stream: liefert die Antwort
+    Stück für Stück, sobald die ersten Tokens ankommen. Die vollständige Antwort wird
+    erst am Ende einmalig gespeichert.
+    """
+    if not user_message or not user_message.strip():
+        yield "Bitte stellen Sie eine konkrete Frage."
+        return
+
+    _persist_chat_message(user_id, event_id, task_id, "user", user_message)
+
+    prompt = build_prompt(user_message, event_id, task_id)
+    chunks = []
+    for chunk in generate_ai_response_stream(prompt):
+        chunks.append(chunk)
+        yield chunk
+
+    ai_response = "".join(chunks).strip()
+    if ai_response:
+        _persist_chat_message(user_id, event_id, task_id, "assistant", ai_response)
+
+
 def build_detailed_context(event_id=None, task_id=None, user_id=None):
     """
     Erstellt detaillierten Kontext für spezifische Antworten.
@@ -564,20 +618,11 @@ def get_recent_chat_history(user_id, event_id=None, task_id=None, limit=5):
         list: Liste der letzten Chat-Nachrichten
     """
     try:
-        response = requests.get(f"{API_URL}/chat/history", params={
-            "user_id": user_id,
-            "event_id": event_id,
-            "task_id": task_id
-        })
-        
-        if response.status_code == 200:
-            history = response.json()
-            # Nur die letzten N Nachrichten zurückgeben
-            return history[-limit*2:] if history else []
-        
-    except Exception as e:
+        # Nur die letzten N Frage-Antwort-Paare aus der Datenbank lesen
+        return chat_repository.get_history(user_id, event_id, task_id, limit=limit * 2)
+    except Error as e:
         logging.error(f"Fehler beim Laden der Chat-Historie: {str(e)}")
-    
+
     return []
 
 
@@ -654,7 +699,7 @@ def generate_ai_response(prompt):
         str: KI-generierte Antwort
     """
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="deepseek/deepseek-chat",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,  # Niedrigere Temperatur für fokussiertere Antworten
@@ -671,6 +716,32 @@ def generate_ai_response(prompt):
         return f"Es gab einen technischen Fehler. Bitte versuchen Sie es erneut."
 
 
+def generate_ai_response_stream(prompt):
+    """
+    Wie generate_ai_response, aber mit stream=True: liefert die Textteile,
+    sobald sie von der API ankommen.
+    """
+    try:
+        stream = get_client().chat.completions.create(
+            model="deepseek/deepseek-chat",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=500,
+            stream=True,
+        )
+        received = False
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                received = True
+                yield chunk.choices[0].delta.content
+        if not received:
+            yield "Entschuldigung, ich konnte keine Antwort generieren."
+
+    except Exception as e:
+        logging.error(f"Fehler bei der KI-Antwort-Generierung: {str(e)}")
+        yield f"Es gab einen technischen Fehler. Bitte versuchen Sie es erneut."
+
+
 def post_process_response(ai_response, context_info):
     """
     Nachbearbeitung der KI-Antwort für bessere Relevanz.
@@ -709,10 +780,10 @@ def get_user_event_stats(user_id, event_id):
         if conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT COUNT(*) as total_interactions,
-                       AVG(score) as avg_score,
-                       MAX(timestamp) as last_activity
-                FROM stats 
+                SELECT COALESCE(SUM(attempts), 0) as total_interactions,
+                       SUM(score_sum) * 1.0 / SUM(attempts) as avg_score,
+                       MAX(last_timestamp) as last_activity
+                FROM stats_rollup
                 WHERE user_id = ? AND event_id = ?
             """, (user_id, event_id))
             
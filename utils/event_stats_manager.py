@@ -1,15 +1,22 @@
 from sqlite3 import Error
 import streamlit as st
-from collections import defaultdict
 import pandas as pd
 import plotly.express as px
 from utils.database import (
     create_connection,
     get_event_by_id,
-    get_tasks_by_event_id,
-    get_task_by_id,
     get_username_by_id,
 )
+from utils.cache import cached, invalidate
+from utils.stats_engine import (
+    CHART_MAX_POINTS,
+    MOVING_AVERAGE_WINDOW,
+    add_moving_average,
+    count_stat_tasks,
+    load_score_history,
+    load_task_page,
+    lttb_indices,
+)
 
 # Konstanten für Pagination
 ITEMS_PER_PAGE = 5
@@ -23,12 +30,35 @@ def save_stats(user_id, event_id, task_id, score):
                 INSERT INTO stats (user_id, event_id, task_id, score, timestamp)
                 VALUES (?, ?, ?, ?, datetime('now'))
             """, (user_id, event_id, task_id, score))
+            stats_id = cursor.lastrowid
+            # Rollup und letzte Bewertung in derselben Transaktion fortschreiben
+            cursor.execute("""
+                INSERT INTO stats_rollup (user_id, event_id, task_id, attempts, score_sum, last_score, last_timestamp)
+                SELECT user_id, event_id, COALESCE(task_id, 0), 1, score, score, timestamp
+                FROM stats WHERE id = ?
+                ON CONFLICT (user_id, event_id, task_id) DO UPDATE SET
+                    attempts = attempts + 1,
+                    attempt_score_sum = attempt_score_sum + attempts * excluded.score_sum,
+                    score_sum = score_sum + excluded.score_sum,
+                    last_score = excluded.last_score,
+                    last_timestamp = excluded.last_timestamp
+            """, (stats_id,))
+            cursor.execute("""
+                INSERT INTO stats_latest (user_id, event_id, stats_id, score, timestamp)
+                SELECT user_id, event_id, id, score, timestamp FROM stats WHERE id = ?
+                ON CONFLICT (user_id, event_id) DO UPDATE SET
+                    stats_id = excluded.stats_id,
+                    score = excluded.score,
+                    timestamp = excluded.timestamp
+            """, (stats_id,))
             conn.commit()
+            invalidate("user", user_id)
         except Error as e:
             print(f"Fehler beim Speichern der Statistik: {e}")
         finally:
             conn.close()
 
+@cached("user")
 def load_stats(user_id, event_id=None, task_id=None, limit=None, offset=0):
     conn = create_connection()
     if conn is not None:
@@ -64,6 +94,45 @@ def load_stats(user_id, event_id=None, task_id=None, limit=None, offset=0):
             conn.close()
     return []
 
+@cached("user")
+def load_stats_summary(user_id, event_id=None):
+    """
+    Anzahl, Durchschnitt und letzte Bewertung aus der Tabelle stats_rollup
+    (eine Zeile je Event und Aufgabe statt aller einzelnen Bewertungen).
+    Wie load_stats nur für vorhandene Events.
+    :param event_id: Optional, nur Bewertungen dieses Events
+    :return: Dictionary mit attempts, avg_score, last_score und last_timestamp
+    """
+    summary = {"attempts": 0, "avg_score": 0, "last_score": None, "last_timestamp": None}
+    conn = create_connection()
+    if conn is not None:
+        try:
+            # last_score stammt aus der Zeile mit MAX(last_timestamp) (SQLite Bare Column)
+            query = """
+                SELECT SUM(stats_rollup.attempts), SUM(stats_rollup.score_sum),
+                       stats_rollup.last_score, MAX(stats_rollup.last_timestamp)
+                FROM stats_rollup
+                JOIN events ON stats_rollup.event_id = events.id
+                WHERE stats_rollup.user_id = ?
+            """
+            params = [user_id]
+            if event_id:
+                query += " AND stats_rollup.event_id = ?"
+                params.append(event_id)
+            attempts, score_sum, last_score, last_timestamp = conn.execute(query, params).fetchone()
+            if attempts:
+                summary.update(
+                    attempts=attempts,
+                    avg_score=score_sum / attempts,
+                    last_score=last_score,
+                    last_timestamp=last_timestamp,
+                )
+        except Error as e:
+            st.error(f"Fehler beim Laden der Statistiken: {e}")
+        finally:
+            conn.close()
+    return summary
+
 def calculate_progress_status(score):
     if score >= 80:
         return "Ausgezeichnet", "score-badge-excellent"
@@ -97,6 +166,9 @@ def display_progress_chart(task_stats):
     df = pd.DataFrame(task_stats, columns=['title', 'score', 'task_id', 'timestamp'])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df = df.sort_values('timestamp')
+    # Lange Verläufe auf CHART_MAX_POINTS formerhaltende Punkte reduzieren
+    if len(df) > CHART_MAX_POINTS:
+        df = df.iloc[lttb_indices(df['timestamp'], df['score'])]
     
     fig = px.line(
         df, 
@@ -179,18 +251,16 @@ def display_event_statistics(user_id, event_id=None):
         event = get_event_by_id(event_id)
         event_title = event[1]
         st.subheader(f"📅 Event: {event_title}")
-        tasks = get_tasks_by_event_id(event_id)
-        all_stats = load_stats(user_id, event_id=event_id)
     else:
         st.subheader("🌍 Gesamtübersicht aller Events")
-        all_stats = load_stats(user_id)
 
-    if not all_stats:
+    # 🔢 Anzahl und Durchschnitt aus dem Rollup
+    summary = load_stats_summary(user_id, event_id)
+    if not summary["attempts"]:
         st.info("Noch keine Statistiken vorhanden.")
         return
 
-    # 🔢 Durchschnitt berechnen
-    avg_score = calculate_average_score(all_stats)
+    avg_score = summary["avg_score"]
     status, badge_class = calculate_progress_status(avg_score)
 
     # 🧾 Anzeige Gesamtscore
@@ -210,42 +280,50 @@ def display_event_statistics(user_id, event_id=None):
         for tip in tips:
             st.markdown(f"<div class='tip-box'>{tip}</div>", unsafe_allow_html=True)
 
-    # 📈 Score-Verlauf
-    if len(all_stats) >= 2:
-        df = pd.DataFrame(all_stats, columns=['event_title', 'score', 'task_id', 'timestamp'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values("timestamp")
+    # 📈 Score-Verlauf mit gleitendem Durchschnitt, bei langer Historie als Zeitbuckets
+    history, bucket = load_score_history(user_id, event_id)
+    if len(history) >= 2:
+        df = add_moving_average(history)
         fig = px.line(
-            df, x="timestamp", y="score",
-            title="📈 Score-Verlauf",
+            df, x="timestamp", y=["score", "moving_average"],
+            title="📈 Score-Verlauf" + (f" (Durchschnitt pro {bucket[0]})" if bucket else ""),
             markers=True,
-            labels={"score": "Punktzahl", "timestamp": "Zeit"}
+            hover_data={"attempts": True, "min_score": True, "max_score": True} if bucket else None,
+            labels={"value": "Punktzahl", "timestamp": "Zeit", "variable": "",
+                    "attempts": "Versuche", "min_score": "Minimum", "max_score": "Maximum"}
         )
+        moving_average_label = f"Ø letzte {MOVING_AVERAGE_WINDOW}" + (f" {bucket[1]}" if bucket else "")
+        fig.for_each_trace(lambda trace: trace.update(
+            name="Punktzahl" if trace.name == "score" else moving_average_label
+        ))
         fig.update_layout(yaxis_range=[0, 100], height=400)
         st.plotly_chart(fig, use_container_width=True)
 
-    # 📋 Detailübersicht nach Aufgaben
+    # 📋 Detailübersicht nach Aufgaben, seitenweise aus stats_rollup
     st.markdown('<div class="section-header">📝 Aufgaben im Detail</div>', unsafe_allow_html=True)
-    task_scores = defaultdict(list)
-    for title, score, task_id, timestamp in all_stats:
-        task_scores[task_id].append((title, score, timestamp))
-
-    for task_id, results in task_scores.items():
-        task = get_task_by_id(task_id)
-        if task:
-            _, _, task_title, _, _ = task
-            with st.expander(f"📌 Aufgabe: {task_title}"):
-                for _, score, ts in results[:5]:
-                    label, badge_class = calculate_progress_status(score)
-                    st.markdown(
-                        f"<span class='score-badge {badge_class}'>{score}%</span> – {ts[:16].replace('T', ' um ')}",
-                        unsafe_allow_html=True
-                    )
-                st.markdown(" ")
-                if st.button("🧩 Quiz erneut starten", key=f"retry_{task_id}"):
-                    st.session_state.update({
-                        "selected_event_id": task[1],
-                        "selected_task_id": task_id,
-                        "main_navigation": "Rätsel"
-                    })
-                    st.rerun()
\ No newline at end of file
+    total_tasks = count_stat_tasks(user_id, event_id)
+    offset = display_pagination(total_tasks, ITEMS_PER_PAGE, f"stats_tasks_{event_id or 'all'}")
+
+    for task in load_task_page(user_id, event_id, limit=ITEMS_PER_PAGE, offset=offset).itertuples(index=False):
+        task_id = int(task.task_id)
+        with st.expander(f"📌 Aufgabe: {task.task_title}"):
+            trend = "📈" if task.trend > 0 else "📉" if task.trend < 0 else "➡️"
+            st.markdown(
+                f"Ø {task.avg_score:.1f}% aus {task.attempts} Versuchen · "
+                f"Ø letzte {MOVING_AVERAGE_WINDOW}: {task.moving_average:.1f}% · "
+                f"Trend {trend} {task.trend:+.1f} Punkte pro Versuch"
+            )
+            for score, ts in task.recent:
+                label, badge_class = calculate_progress_status(score)
+                st.markdown(
+                    f"<span class='score-badge {badge_class}'>{score:.0f}%</span> – {ts:%Y-%m-%d %H:%M}",
+                    unsafe_allow_html=True
+                )
+            st.markdown(" ")
+            if st.button("🧩 Quiz erneut starten", key=f"retry_{task.event_id}_{task_id}"):
+                st.session_state.update({
+                    "selected_event_id": int(task.event_id),
+                    "selected_task_id": task_id,
+                    "main_navigation": "Rätsel"
+                })
+                st.rerun()
\ No newline at end of file
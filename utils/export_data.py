@@ -0,0 +1,160 @@
+"""
+Export von Events und Aufgaben als CSV oder Excel direkt aus der Datenbank.
+
+Die Zeilen werden über einen Generator aus SQLite gelesen und sofort geschrieben:
+CSV blockweise als Streaming-Antwort, Excel mit xlsxwriter im constant_memory-Modus.
+So liegt der Export weder als Liste noch als DataFrame vollständig im Speicher.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+import xlsxwriter
+from utils.database import create_dedicated_connection
+
+EXPORT_COLUMNS = [
+    "Event ID", "Titel", "Typ", "Beschreibung",
+    "Aufgabe ID", "Aufgabe Titel", "Aufgabe Inhalt",
+]
+STATS_COLUMNS = ["Letzte Bewertung", "Datum"]
+# Zeilen pro CSV-Block der Streaming-Antwort
+CSV_BATCH_ROWS = 500
+# Zeilen pro Parquet-Row-Group
+PARQUET_BATCH_ROWS = 10000
+
+
+def export_columns(include_stats=True):
+    return EXPORT_COLUMNS + (STATS_COLUMNS if include_stats else [])
+
+
+def iter_export_rows(user_id, event_ids, include_tasks=True, include_stats=True):
+    """
+    Liefert die Exportzeilen (Tupel in der Reihenfolge von export_columns) für eigene
+    und mit dem Benutzer geteilte Events. Events ohne Aufgaben ergeben eine Zeile ohne Aufgabenspalten.
+    Eine einzige Abfrage verknüpft Events, Aufgaben und die letzte Bewertung je Aufgabe;
+    die Zeilen werden direkt aus dem Cursor gestreamt.
+    :param event_ids: Liste der zu exportierenden Event-IDs (bestimmt die Reihenfolge)
+    """
+    if include_tasks:
+        task_columns = "tasks.id, tasks.title, tasks.content"
+        task_join = "LEFT JOIN tasks ON tasks.event_id = events.id"
+    else:
+        task_columns = "NULL, NULL, NULL"
+        task_join = ""
+    stats_columns = stats_join = ""
+    if include_stats and include_tasks:
+        stats_columns = ", stats.score, stats.timestamp"
+        # Letzte Bewertung über idx_stats_user_event_task_timestamp, dann Zugriff per Primärschlüssel
+        stats_join = """LEFT JOIN stats ON stats.id = (
+                SELECT latest.id FROM stats AS latest
+                WHERE latest.user_id = :user_id AND latest.event_id = events.id AND latest.task_id = tasks.id
+                ORDER BY latest.timestamp DESC, latest.id DESC
+                LIMIT 1)"""
+    elif include_stats:
+        stats_columns = ", NULL, NULL"
+
+    query = f"""
+        WITH selected AS (
+            SELECT value AS event_id, MIN(key) AS position FROM json_each(:event_ids) GROUP BY value
+        )
+        SELECT events.id, events.title,
+               CASE WHEN events.user_id = :user_id THEN 'Persönlich'
+                    ELSE 'Geteilt von ' || (
+                        SELECT users.username FROM shared_events
+                        JOIN users ON users.id = shared_events.shared_by_user_id
+                        WHERE shared_events.event_id = events.id AND shared_events.shared_with_user_id = :user_id
+                        LIMIT 1) END,
+               events.description,
+               {task_columns}{stats_columns}
+        FROM selected
+        JOIN events ON events.id = selected.event_id
+        {task_join}
+        {stats_join}
+        WHERE events.user_id = :user_id OR EXISTS (
+            SELECT 1 FROM shared_events
+            WHERE shared_events.event_id = events.id AND shared_events.shared_with_user_id = :user_id)
+        ORDER BY selected.position{", tasks.id" if include_tasks else ""}
+    """
+    conn = create_dedicated_connection()
+    try:
+        yield from conn.execute(query, {"event_ids": json.dumps(list(event_ids)), "user_id": user_id})
+    finally:
+        conn.close()
+
+
+def stream_csv(rows, columns):
+    """
+    Schreibt Zeilen blockweise als CSV und liefert die Blöcke als Bytes (für StreamingResponse).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % CSV_BATCH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode("utf-8")
+
+
+def write_xlsx(path, rows, columns):
+    """
+    Schreibt Zeilen in eine Excel-Datei. constant_memory hält nur die aktuelle Zeile
+    im Speicher, daher müssen die Zeilen in Reihenfolge geschrieben werden.
+    """
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet("Events")
+        worksheet.write_row(0, 0, columns)
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, ["" if value is None else value for value in row])
+    finally:
+        workbook.close()
+
+
+def _parquet_schema(columns):
+    # pyarrow ist optional und wird erst beim Parquet-Export benötigt
+    import pyarrow as pa
+    types = {
+        "Event ID": pa.int64(),
+        "Aufgabe ID": pa.int64(),
+        "Letzte Bewertung": pa.int64(),
+        "Datum": pa.timestamp("s"),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+def _parse_timestamp(value):
+    # stats.timestamp ist Text (CURRENT_TIMESTAMP oder ISO-Format)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_parquet(path, rows, columns):
+    """
+    Schreibt Zeilen batchweise in eine Parquet-Datei mit festen Datentypen
+    (IDs und Bewertung als int64, Datum als Zeitstempel), je PARQUET_BATCH_ROWS eine Row-Group.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema(columns)
+    rows = iter(rows)
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            batch = list(islice(rows, PARQUET_BATCH_ROWS))
+            if not batch:
+                break
+            values = [list(column) for column in zip(*batch)]
+            if "Datum" in columns:
+                date_index = columns.index("Datum")
+                values[date_index] = [_parse_timestamp(value) for value in values[date_index]]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(values, schema)],
+                schema=schema
+            ))
@@ -1,23 +1,219 @@
 # Verbesserte import_data.py
+import asyncio
 import base64
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import List
 import pandas as pd
 import io
-from utils.chat_api import get_db
+import os
+import json
+import shutil
+import tempfile
+from sqlite3 import OperationalError
+from utils.database import create_connection
+from utils.async_db import run_db
+from utils.import_jobs import create_job, get_job, recover_jobs, submit_job
+from utils.export_data import export_columns, iter_export_rows, stream_csv, write_parquet, write_xlsx
+
+@asynccontextmanager
+async def lifespan(app):
+    # Jobs eines vorherigen Prozesses laufen nicht weiter
+    recovered = await run_db(recover_jobs)
+    if recovered:
+        print(f"{recovered} unterbrochene Import-Jobs als fehlgeschlagen markiert")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+REQUIRED_COLUMNS = {"Titel", "Beschreibung"}  # Minimale Anforderungen, optional: Aufgabe Titel/Inhalt, Event ID, Aufgabe ID
+# Zeilen pro Chunk beim CSV-Import; jeder Chunk wird in einer eigenen Transaktion bestätigt
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "10000"))
+# Ablage für Uploads von Import-Jobs bis zur Verarbeitung
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "eventmanager_imports"))
+
+def _clean_column(df, column):
+    # Entspricht str(wert).strip() je Zeile, fehlende Werte werden zu ""
+    if column not in df.columns:
+        return pd.Series("", index=df.index)
+    values = df[column]
+    return values.where(values.notna(), "").astype(str).str.strip()
+
+
+def import_dataframe(df, user_id):
+    """
+    Schreibt Events und Aufgaben aus dem DataFrame in einer Transaktion in die Datenbank.
+    Mengenbasiert: Duplikate werden in pandas entfernt, vorhandene Events und Aufgaben
+    mit je einer Abfrage aufgelöst und neue Zeilen per executemany eingefügt.
+    Blockierend – aus async-Handlern nur über run_db() aufrufen.
+    :return: (Anzahl neuer Events, Anzahl neuer Aufgaben)
+    """
+    rows = pd.DataFrame({
+        "title": _clean_column(df, "Titel"),
+        "description": _clean_column(df, "Beschreibung"),
+        "task_title": _clean_column(df, "Aufgabe Titel"),
+        "task_content": _clean_column(df, "Aufgabe Inhalt"),
+    })
+    rows = rows[rows["title"] != ""]
+    # Pro Titel zählt die erste Zeile (Beschreibung), pro Event und Aufgabentitel ebenso
+    events = rows.drop_duplicates("title")
+    tasks = rows[rows["task_title"] != ""].drop_duplicates(["title", "task_title"])
+
+    db = create_connection()
+    if db is None:
+        raise OperationalError("Datenbankverbindung fehlgeschlagen")
+    try:
+        # Vorhandene Events des Benutzers mit einer Abfrage auflösen (Titelliste als JSON-Parameter)
+        existing_events = dict(db.execute(
+            "SELECT title, MIN(id) FROM events "
+            "WHERE user_id = ? AND title IN (SELECT value FROM json_each(?)) GROUP BY title",
+            (user_id, json.dumps(events["title"].tolist()))
+        ).fetchall())
+
+        new_events = events[~events["title"].isin(existing_events.keys())]
+        db.executemany(
+            "INSERT INTO events (user_id, title, description, is_imported) VALUES (?, ?, ?, 1)",
+            [(user_id, title, description) for title, description in zip(new_events["title"], new_events["description"])]
+        )
+        if not new_events.empty:
+            existing_events.update(db.execute(
+                "SELECT title, MIN(id) FROM events "
+                "WHERE user_id = ? AND title IN (SELECT value FROM json_each(?)) GROUP BY title",
+                (user_id, json.dumps(new_events["title"].tolist()))
+            ).fetchall())
+
+        tasks = tasks.assign(event_id=tasks["title"].map(existing_events))
+        existing_tasks = {tuple(row) for row in db.execute(
+            "SELECT event_id, title FROM tasks WHERE event_id IN (SELECT value FROM json_each(?))",
+            (json.dumps([int(event_id) for event_id in tasks["event_id"].unique()]),)
+        )}
+
+        new_tasks = [
+            (int(event_id), task_title, task_content)
+            for event_id, task_title, task_content in zip(tasks["event_id"], tasks["task_title"], tasks["task_content"])
+            if (event_id, task_title) not in existing_tasks
+        ]
+        db.executemany("INSERT INTO tasks (event_id, title, content) VALUES (?, ?, ?)", new_tasks)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return len(new_events), len(new_tasks)
+
+
+def _import_chunks(chunks, user_id, progress=None):
+    result = {"imported_events": 0, "imported_tasks": 0, "total_rows_processed": 0, "chunks": 0}
+    for chunk in chunks:
+        imported_events, imported_tasks = import_dataframe(chunk, user_id)
+        result["imported_events"] += imported_events
+        result["imported_tasks"] += imported_tasks
+        result["total_rows_processed"] += len(chunk)
+        result["chunks"] += 1
+        if progress:
+            progress(dict(result))
+        else:
+            print(f"Import Chunk {result['chunks']}: {result['total_rows_processed']} Zeilen, "
+                  f"{result['imported_events']} Events, {result['imported_tasks']} Aufgaben")
+    return result
+
+
+def import_csv_stream(source, user_id, chunksize=None, progress=None):
+    """
+    Importiert eine CSV-Datei in Chunks: jeder Chunk wird mit import_dataframe verarbeitet
+    und sofort bestätigt, der Speicherbedarf hängt nur von der Chunkgröße ab.
+    Events und Aufgaben aus früheren Chunks werden über die Datenbank erkannt.
+    :param source: Dateiobjekt oder Pfad der CSV-Datei
+    :param chunksize: Zeilen pro Chunk, Standard IMPORT_CHUNK_SIZE
+    :param progress: Optionaler Callback, erhält nach jedem Chunk den Zwischenstand (dict)
+    :return: Dictionary mit imported_events, imported_tasks, total_rows_processed, chunks
+    """
+    # dtype=str: sonst könnte pandas je Chunk andere Typen ableiten (z.B. "1" vs. "1.0")
+    chunks = pd.read_csv(source, chunksize=chunksize or IMPORT_CHUNK_SIZE, dtype=str)
+    return _import_chunks(chunks, user_id, progress)
+
+
+def import_parquet_stream(source, user_id, chunksize=None, progress=None):
+    """
+    Importiert eine Parquet-Datei batchweise über pyarrow, sonst wie import_csv_stream.
+    Die Datentypen stehen in der Datei, eine Typableitung ist nicht nötig.
+    """
+    import pyarrow.parquet as pq
+    batches = pq.ParquetFile(source).iter_batches(batch_size=chunksize or IMPORT_CHUNK_SIZE)
+    return _import_chunks((batch.to_pandas() for batch in batches), user_id, progress)
+
+
+STREAM_IMPORTERS = {"csv": import_csv_stream, "parquet": import_parquet_stream}
+
+
+def _read_columns(fileobj, file_type):
+    # Nur den Kopf bzw. das Schema lesen, danach zurück an den Dateianfang
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        columns = pq.ParquetFile(fileobj).schema_arrow.names
+    else:
+        columns = list(pd.read_csv(fileobj, nrows=0).columns)
+    fileobj.seek(0)
+    return columns
+
+
+def _missing_pyarrow_response():
+    return JSONResponse(
+        status_code=400,
+        content={
+            "error": "Parquet nicht möglich: Das Paket 'pyarrow' ist nicht installiert.",
+            "solution": "Führe 'pip install pyarrow' aus oder verwende CSV-Format."
+        }
+    )
+
+
+def _import_dataframe_result(df, user_id):
+    imported_events, imported_tasks = import_dataframe(df, user_id)
+    return {
+        "imported_events": imported_events,
+        "imported_tasks": imported_tasks,
+        "total_rows_processed": len(df),
+        "chunks": 1
+    }
+
+
+def _missing_columns_response(columns):
+    missing = REQUIRED_COLUMNS - set(columns)
+    if not missing:
+        return None
+    return JSONResponse(
+        status_code=400, 
+        content={
+            "error": f"Fehlende Spalten: {', '.join(missing)}",
+            "required": list(REQUIRED_COLUMNS),
+            "found": list(columns)
+        }
+    )
 
-app = FastAPI()
 
 @app.post("/import/events")
 async def import_events(user_id: int, file_type: str = Query("csv"), file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        
-        if file_type == "csv":
-            df = pd.read_csv(io.BytesIO(content))
+        if file_type in STREAM_IMPORTERS:
+            # Der Upload liegt als SpooledTemporaryFile vor (ab 1 MB auf der Festplatte).
+            # Statt ihn komplett einzulesen, wird nur der Kopf geprüft und danach in Chunks importiert.
+            try:
+                columns = await asyncio.to_thread(_read_columns, file.file, file_type)
+            except ImportError:
+                return _missing_pyarrow_response()
+            error_response = _missing_columns_response(columns)
+            if error_response:
+                return error_response
+            job = (STREAM_IMPORTERS[file_type], file.file, user_id)
         else:  # Excel
+            content = await file.read()
             try:
-                df = pd.read_excel(io.BytesIO(content))
+                df = await asyncio.to_thread(pd.read_excel, io.BytesIO(content))
             except ImportError as e:
                 if "openpyxl" in str(e):
                     return JSONResponse(
@@ -27,105 +223,20 @@ async def import_events(user_id: int, file_type: str = Query("csv"), file: Uploa
                             "solution": "Führe 'pip install openpyxl' aus oder verwende CSV-Format."
                         }
                     )
+                raise
 
-        # Validierung
-        if df.empty:
-            return JSONResponse(status_code=400, content={"error": "Die Datei enthält keine Daten."})
+            # Validierung
+            if df.empty:
+                return JSONResponse(status_code=400, content={"error": "Die Datei enthält keine Daten."})
+            error_response = _missing_columns_response(df.columns)
+            if error_response:
+                return error_response
+            job = (_import_dataframe_result, df, user_id)
 
-        required = {"Titel", "Beschreibung"}  # Minimale Anforderungen
-        optional = {"Aufgabe Titel", "Aufgabe Inhalt", "Event ID", "Aufgabe ID"}
-        
-        if not required.issubset(df.columns):
-            return JSONResponse(
-                status_code=400, 
-                content={
-                    "error": f"Fehlende Spalten: {', '.join(required - set(df.columns))}",
-                    "required": list(required),
-                    "found": list(df.columns)
-                }
-            )
-
-        db = get_db()
-        imported_events = 0
-        imported_tasks = 0
-        
         try:
-            # Gruppiere nach Event-Titel um Duplikate zu vermeiden
-            events_processed = set()
-            
-            for index, row in df.iterrows():
-                try:
-                    title = str(row["Titel"]).strip() if pd.notna(row["Titel"]) else ""
-                    description = str(row["Beschreibung"]).strip() if pd.notna(row["Beschreibung"]) else ""
-                    
-                    if not title:
-                        continue
-
-                    # Event erstellen
-                    event_id = None
-                    if title not in events_processed:
-                        # Prüfe ob Event bereits existiert
-                        existing_event = db.execute(
-                            "SELECT id FROM events WHERE title=? AND user_id=?", 
-                            (title, user_id)
-                        ).fetchone()
-                        
-                        if existing_event:
-                            event_id = existing_event["id"]
-                        else:
-                            # Neues Event erstellen
-                            cursor = db.execute(
-                                    "INSERT INTO events (user_id, title, description, is_imported) VALUES (?, ?, ?, 1)",
-                                    (user_id, title, description)
-                                )
-                            event_id = cursor.lastrowid
-                            imported_events += 1
-                        
-                        events_processed.add(title)
-                    else:
-                        # Event-ID für bereits verarbeitetes Event finden
-                        event_result = db.execute(
-                            "SELECT id FROM events WHERE title=? AND user_id=?", 
-                            (title, user_id)
-                        ).fetchone()
-                        if event_result:
-                            event_id = event_result["id"]
-
-                    # Aufgabe hinzufügen
-                    if event_id and "Aufgabe Titel" in row and pd.notna(row["Aufgabe Titel"]):
-                        task_title = str(row["Aufgabe Titel"]).strip()
-                        task_content = str(row["Aufgabe Inhalt"]).strip() if "Aufgabe Inhalt" in row and pd.notna(row["Aufgabe Inhalt"]) else ""
-                        
-                        if task_title:
-                            # Prüfe ob Aufgabe bereits existiert
-                            existing_task = db.execute(
-                                "SELECT id FROM tasks WHERE event_id=? AND title=?", 
-                                (event_id, task_title)
-                            ).fetchone()
-                            
-                            if not existing_task:
-                                db.execute(
-                                    "INSERT INTO tasks (event_id, title, content) VALUES (?, ?, ?)",
-                                    (event_id, task_title, task_content)
-                                )
-                                imported_tasks += 1
-
-                except Exception as row_error:
-                    print(f"Fehler in Zeile {index + 1}: {str(row_error)}")
-                    continue
-
-            db.commit()
-            
-            return {
-                "message": "Import erfolgreich abgeschlossen!",
-                "imported_events": imported_events,
-                "imported_tasks": imported_tasks,
-                "total_rows_processed": len(df),
-                "success": True
-            }
-            
+            # Datenbankarbeit im DB-Executor, damit die Event-Loop weiter Chat-Anfragen bedient
+            result = await run_db(*job)
         except Exception as db_error:
-            db.rollback()
             return JSONResponse(
                 status_code=500,
                 content={
@@ -133,6 +244,15 @@ async def import_events(user_id: int, file_type: str = Query("csv"), file: Uploa
                     "success": False
                 }
             )
+
+        if result["total_rows_processed"] == 0:
+            return JSONResponse(status_code=400, content={"error": "Die Datei enthält keine Daten."})
+
+        return {
+            "message": "Import erfolgreich abgeschlossen!",
+            **result,
+            "success": True
+        }
             
     except Exception as e:
         return JSONResponse(
@@ -143,6 +263,117 @@ async def import_events(user_id: int, file_type: str = Query("csv"), file: Uploa
             }
         )
 
+def import_file(path, user_id, file_type="csv", progress=None):
+    """
+    Importiert eine gespeicherte Upload-Datei und löscht sie anschließend (für Import-Jobs).
+    :return: Dictionary wie import_csv_stream
+    """
+    try:
+        if file_type in STREAM_IMPORTERS:
+            return STREAM_IMPORTERS[file_type](path, user_id, progress=progress)
+        df = pd.read_excel(path)
+        missing = REQUIRED_COLUMNS - set(df.columns)
+        if missing:
+            raise ValueError(f"Fehlende Spalten: {', '.join(missing)}")
+        return _import_dataframe_result(df, user_id)
+    finally:
+        os.remove(path)
+
+
+@app.post("/import/jobs", status_code=202)
+async def create_import_job(user_id: int, file_type: str = Query("csv"), file: UploadFile = File(...)):
+    """
+    Stellt einen Import in die Warteschlange und gibt sofort die Job-ID zurück.
+    Den Fortschritt liefert GET /import/jobs/{job_id}.
+    """
+    try:
+        if file_type in STREAM_IMPORTERS:
+            try:
+                columns = await asyncio.to_thread(_read_columns, file.file, file_type)
+            except ImportError:
+                return _missing_pyarrow_response()
+            error_response = _missing_columns_response(columns)
+            if error_response:
+                return error_response
+
+        # Upload in eine eigene Datei kopieren – die UploadFile wird nach der Antwort geschlossen
+        os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=f".{file_type}", dir=IMPORT_UPLOAD_DIR)
+        with os.fdopen(fd, "wb") as target:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, target)
+
+        try:
+            job_id = await run_db(create_job, user_id, file.filename, path)
+        except Exception:
+            os.remove(path)
+            raise
+        submit_job(job_id, import_file, path, user_id, file_type)
+        return {"job_id": job_id, "status": "queued"}
+
+    except Exception as e:
+        return JSONResponse(
+            status_code=500, 
+            content={
+                "error": f"Unerwarteter Fehler: {str(e)}",
+                "success": False
+            }
+        )
+
+
+@app.get("/import/jobs/{job_id}")
+async def get_import_job(job_id: str, user_id: int):
+    """
+    Status eines Import-Jobs: queued, running, completed oder failed, dazu verarbeitete
+    Zeilen, angelegte Events/Aufgaben und ggf. die Fehlermeldung.
+    """
+    job = await run_db(get_job, job_id, user_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Import-Job nicht gefunden."})
+    return job
+
+@app.get("/export/events")
+async def export_events(
+    user_id: int,
+    event_ids: List[int] = Query(...),
+    file_type: str = Query("csv"),
+    include_tasks: bool = True,
+    include_stats: bool = True
+):
+    """
+    Exportiert die ausgewählten Events (eigene und geteilte) als CSV-Stream, Excel- oder Parquet-Datei.
+    """
+    columns = export_columns(include_stats)
+    rows = iter_export_rows(user_id, event_ids, include_tasks, include_stats)
+    if file_type == "csv":
+        return StreamingResponse(
+            stream_csv(rows, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="events_export.csv"'}
+        )
+
+    # xlsxwriter (constant_memory) und pyarrow schreiben in eine Datei, die nach dem Senden gelöscht wird
+    if file_type == "parquet":
+        writer, media_type = write_parquet, "application/vnd.apache.parquet"
+    else:
+        file_type = "xlsx"
+        writer, media_type = write_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    fd, path = tempfile.mkstemp(suffix=f".{file_type}")
+    os.close(fd)
+    try:
+        await run_db(writer, path, rows, columns)
+    except ImportError:
+        os.remove(path)
+        return _missing_pyarrow_response()
+    except Exception as e:
+        os.remove(path)
+        return JSONResponse(status_code=500, content={"error": f"Exportfehler: {str(e)}", "success": False})
+    return FileResponse(
+        path,
+        filename=f"events_export.{file_type}",
+        media_type=media_type,
+        background=BackgroundTask(os.remove, path)
+    )
+
 def create_download_link(df, filename, label="Download-Datei"):
     """
     Erstellt einen Download-Link für eine DataFrame-Datei (CSV) als HTML-Button.
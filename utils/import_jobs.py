@@ -0,0 +1,139 @@
+"""
+Hintergrund-Jobs für den Import.
+
+Der Upload wird gespeichert, ein Job in der Tabelle import_jobs angelegt und sofort
+dessen ID zurückgegeben. Ein Worker-Pool führt den Import aus und schreibt nach jedem
+Chunk den Zwischenstand in die Tabelle, sodass GET /import/jobs/{id} ihn aus jedem
+Prozess abfragen kann.
+
+Die Jobs laufen nur im Speicher des Import-Dienstes. Nach einem Neustart markiert
+recover_jobs() unterbrochene Jobs als fehlgeschlagen und löscht ihre Upload-Dateien.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlite3 import OperationalError
+from utils.database import create_connection
+
+# Gleichzeitig laufende Importe; weitere Jobs warten mit Status "queued"
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+
+JOB_COLUMNS = (
+    "id", "user_id", "file_name", "status", "total_rows_processed",
+    "imported_events", "imported_tasks", "chunks", "error", "created_at", "updated_at"
+)
+PROGRESS_FIELDS = ("total_rows_processed", "imported_events", "imported_tasks", "chunks")
+UNFINISHED_STATUSES = ("queued", "running")
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_JOB_WORKERS, thread_name_prefix="import-job")
+
+
+def _connect():
+    conn = create_connection()
+    if conn is None:
+        raise OperationalError("Datenbankverbindung fehlgeschlagen")
+    return conn
+
+
+def create_job(user_id, file_name=None, upload_path=None):
+    """
+    Legt einen neuen Job mit Status "queued" an.
+    :param upload_path: Gespeicherte Upload-Datei, die der Job verarbeitet
+    :return: ID des Jobs
+    """
+    job_id = uuid.uuid4().hex
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO import_jobs (id, user_id, file_name, upload_path) VALUES (?, ?, ?, ?)",
+            (job_id, user_id, file_name, upload_path)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return job_id
+
+
+def update_job(job_id, **fields):
+    """
+    Aktualisiert Status und Zähler eines Jobs.
+    :param fields: Spalten aus JOB_COLUMNS, z.B. status="running" oder imported_events=3
+    """
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = _connect()
+    try:
+        conn.execute(
+            f"UPDATE import_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (*fields.values(), job_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_job(job_id, user_id=None):
+    """
+    Lädt einen Job; mit user_id nur, wenn er diesem Benutzer gehört.
+    :return: Dictionary mit den Spalten aus JOB_COLUMNS oder None
+    """
+    query = f"SELECT {', '.join(JOB_COLUMNS)} FROM import_jobs WHERE id = ?"
+    params = [job_id]
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params.append(user_id)
+    conn = _connect()
+    try:
+        row = conn.execute(query, params).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+def recover_jobs():
+    """
+    Beim Start des Import-Dienstes aufrufen: Jobs mit Status "queued" oder "running"
+    gehören zu einem beendeten Prozess und werden nie fertig. Sie werden als "failed"
+    markiert (die Oberfläche beendet dann das Polling), ihre Upload-Dateien gelöscht.
+    :return: Anzahl der markierten Jobs
+    """
+    placeholders = ", ".join("?" for _ in UNFINISHED_STATUSES)
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT id, upload_path FROM import_jobs WHERE status IN ({placeholders})",
+            UNFINISHED_STATUSES
+        ).fetchall()
+        conn.executemany(
+            "UPDATE import_jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [("Import abgebrochen: Der Import-Dienst wurde neu gestartet.", job_id) for job_id, _ in rows]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    for _, upload_path in rows:
+        if upload_path:
+            try:
+                os.remove(upload_path)
+            except FileNotFoundError:
+                pass
+    return len(rows)
+
+
+def _run_job(job_id, func, args):
+    try:
+        update_job(job_id, status="running")
+        result = func(*args, progress=lambda progress: update_job(
+            job_id, **{field: progress[field] for field in PROGRESS_FIELDS}
+        ))
+        update_job(job_id, status="completed", **{field: result[field] for field in PROGRESS_FIELDS})
+    except Exception as e:
+        print(f"Import-Job {job_id} fehlgeschlagen: {e}")
+        update_job(job_id, status="failed", error=str(e))
+
+
+def submit_job(job_id, func, *args):
+    """
+    Führt func(*args, progress=callback) im Worker-Pool aus und protokolliert Fortschritt,
+    Ergebnis oder Fehler im Job. func muss ein Dictionary mit PROGRESS_FIELDS zurückgeben.
+    """
+    return _executor.submit(_run_job, job_id, func, args)
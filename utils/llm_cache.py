@@ -0,0 +1,106 @@
+"""
+Inhaltsadressierter Cache für KI-Anfragen.
+
+Der Schlüssel ist ein sha256-Hash über Modell und Prompt, d.h. identische Aufgabeninhalte
+bzw. identische (Frage, Antwort)-Paare werden lokal beantwortet statt erneut die API aufzurufen.
+Einträge laufen nach LLM_CACHE_TTL_SECONDS ab; bei mehr als LLM_CACHE_MAX_ENTRIES Einträgen
+werden die am längsten nicht genutzten entfernt (LRU).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from sqlite3 import Error
+from utils.database import create_connection
+
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+_counters = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def make_cache_key(model, prompt):
+    payload = json.dumps({"model": model, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_cached_response(model, prompt):
+    """
+    Liefert die gespeicherte Antwort für Modell + Prompt oder None.
+    """
+    key = make_cache_key(model, prompt)
+    conn = create_connection()
+    if conn:
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE cache_key = ? AND created_at > ?",
+                (key, now - LLM_CACHE_TTL_SECONDS),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                    (now, key),
+                )
+                conn.commit()
+                _count("hits")
+                return row[0]
+        except Error as e:
+            print(f"Fehler beim Lesen des KI-Caches: {e}")
+        finally:
+            conn.close()
+    _count("misses")
+    return None
+
+
+def store_response(model, prompt, response):
+    """
+    Speichert eine Antwort und entfernt abgelaufene bzw. überzählige Einträge.
+    """
+    key = make_cache_key(model, prompt)
+    conn = create_connection()
+    if conn:
+        try:
+            now = time.time()
+            conn.execute("""
+                INSERT OR REPLACE INTO llm_cache (cache_key, model, response, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+            """, (key, model, response, now, now))
+            conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - LLM_CACHE_TTL_SECONDS,))
+            conn.execute("""
+                DELETE FROM llm_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (LLM_CACHE_MAX_ENTRIES,))
+            conn.commit()
+        except Error as e:
+            print(f"Fehler beim Schreiben des KI-Caches: {e}")
+        finally:
+            conn.close()
+
+
+def get_cache_stats():
+    """
+    Trefferstatistik des aktuellen Prozesses und Anzahl gespeicherter Einträge.
+    """
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["entries"] = 0
+    conn = create_connection()
+    if conn:
+        try:
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except Error as e:
+            print(f"Fehler beim Lesen des KI-Caches: {e}")
+        finally:
+            conn.close()
+    return stats
@@ -0,0 +1,348 @@
+"""
+Versionierte Schema-Migrationen für die SQLite-Datenbank.
+
+Die aktuelle Schema-Version steht in PRAGMA user_version. migrate() wendet alle
+Migrationen mit höherer Nummer genau einmal und gemeinsam in einer Transaktion an.
+Ist die Datenbank bereits aktuell, kostet ein Aufruf nur das Lesen von user_version.
+
+Neue Schemaänderungen werden als neue Funktion unten an MIGRATIONS angehängt –
+bestehende Migrationen dürfen nachträglich nicht verändert werden.
+"""
+
+
+def _add_column_if_missing(cursor, table, column, definition):
+    # Ältere Datenbanken (vor user_version) können die Spalte bereits besitzen
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_indexes(cursor, indexes):
+    for name, table, columns in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def migration_001_base_tables(cursor):
+    """Basistabellen: Benutzer, Events, Aufgaben, Freigaben, Chat und Statistiken."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            is_imported INTEGER DEFAULT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT,
+            status TEXT DEFAULT 'in Bearbeitung',
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shared_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            shared_by_user_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            FOREIGN KEY (task_id) REFERENCES tasks (id),
+            FOREIGN KEY (shared_by_user_id) REFERENCES users (id),
+            FOREIGN KEY (shared_with_user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shared_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            shared_by_user_id INTEGER NOT NULL,
+            shared_with_user_id INTEGER NOT NULL,
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (shared_by_user_id) REFERENCES users (id),
+            FOREIGN KEY (shared_with_user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            event_id INTEGER,
+            task_id INTEGER,
+            role TEXT NOT NULL,         -- 'user' oder 'assistant'
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (task_id) REFERENCES tasks (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            task_id INTEGER,
+            score INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (task_id) REFERENCES tasks (id)
+        )
+    """)
+
+
+def migration_002_event_import_flag(cursor):
+    """Spalte is_imported für importierte Events (fehlt in Datenbanken vor dem Import-Feature)."""
+    _add_column_if_missing(cursor, "events", "is_imported", "INTEGER DEFAULT NULL")
+
+
+def migration_003_premium_flag(cursor):
+    """Spalte is_premium für Premium-Benutzer."""
+    _add_column_if_missing(cursor, "users", "is_premium", "INTEGER DEFAULT 0")
+
+
+def migration_004_quiz_limits(cursor):
+    """Spalten für das tägliche Quiz-Limit (last_quiz_reset als ISO-Datum)."""
+    _add_column_if_missing(cursor, "users", "daily_quiz_count", "INTEGER DEFAULT 0")
+    _add_column_if_missing(cursor, "users", "last_quiz_reset", "TEXT")
+
+
+def migration_005_hot_query_indexes(cursor):
+    """Sekundärindizes für die häufigsten Abfragen der Datenzugriffsschicht."""
+    _create_indexes(cursor, [
+        # load_events / load_events_with_import_status: WHERE user_id = ? ORDER BY created_at DESC
+        ("idx_events_user_created", "events", "user_id, created_at"),
+        # import_data: Event-Suche über Titel
+        ("idx_events_user_title", "events", "user_id, title"),
+        # load_tasks / get_tasks_by_event_id, import_data: Aufgabe über Titel
+        ("idx_tasks_event_title", "tasks", "event_id, title"),
+        # load_stats ohne Event: WHERE user_id = ? ORDER BY timestamp DESC
+        ("idx_stats_user_timestamp", "stats", "user_id, timestamp"),
+        # load_stats mit Event (und Aufgabe), get_user_event_stats
+        ("idx_stats_user_event_timestamp", "stats", "user_id, event_id, timestamp"),
+        # chat_api: Chatverlauf pro Aufgabe bzw. pro Event, sortiert nach Zeit
+        ("idx_chat_user_task_timestamp", "chat_messages", "user_id, task_id, timestamp"),
+        ("idx_chat_user_event_timestamp", "chat_messages", "user_id, event_id, timestamp"),
+        # load_shared_events / load_shared_tasks und Duplikatprüfung in share_event
+        ("idx_shared_events_with_event", "shared_events", "shared_with_user_id, event_id"),
+        ("idx_shared_tasks_with_task", "shared_tasks", "shared_with_user_id, task_id"),
+    ])
+
+
+def migration_006_llm_cache(cursor):
+    """Persistenter Cache für KI-Antworten (Quizfragen und Bewertungen), siehe utils/llm_cache.py."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,     -- sha256 über Modell + Prompt
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,       -- Unix-Zeitstempel
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+
+
+def migration_007_chat_keyset_indexes(cursor):
+    """Indizes für die Keyset-Pagination des Chatverlaufs (Sortierung nach id statt timestamp)."""
+    # Die rowid (= id) steht implizit am Ende jedes Index, daher genügen die Filterspalten
+    cursor.execute("DROP INDEX IF EXISTS idx_chat_user_task_timestamp")
+    cursor.execute("DROP INDEX IF EXISTS idx_chat_user_event_timestamp")
+    _create_indexes(cursor, [
+        ("idx_chat_user_task", "chat_messages", "user_id, task_id"),
+        ("idx_chat_user_event_task", "chat_messages", "user_id, event_id, task_id"),
+    ])
+
+
+def migration_008_import_jobs(cursor):
+    """Tabelle für Hintergrund-Importe, siehe utils/import_jobs.py."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,            -- UUID, wird dem Client zurückgegeben
+            user_id INTEGER NOT NULL,
+            file_name TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed
+            total_rows_processed INTEGER NOT NULL DEFAULT 0,
+            imported_events INTEGER NOT NULL DEFAULT 0,
+            imported_tasks INTEGER NOT NULL DEFAULT 0,
+            chunks INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+
+
+def migration_009_stats_task_index(cursor):
+    """Index für die letzte Bewertung je Aufgabe (Export, ORDER BY timestamp DESC, id DESC LIMIT 1)."""
+    _create_indexes(cursor, [
+        ("idx_stats_user_event_task_timestamp", "stats", "user_id, event_id, task_id, timestamp"),
+    ])
+
+
+def migration_010_stats_rollup(cursor):
+    """Vorberechnete Bewertungen je Benutzer, Event und Aufgabe, gepflegt von save_stats."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_rollup (
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL DEFAULT 0,     -- 0 = Bewertung ohne Aufgabe
+            attempts INTEGER NOT NULL DEFAULT 0,
+            score_sum INTEGER NOT NULL DEFAULT 0,
+            last_score INTEGER,
+            last_timestamp DATETIME,
+            PRIMARY KEY (user_id, event_id, task_id)
+        )
+    """)
+    # Bestehende Bewertungen übernehmen; letzte Bewertung wie im Export nach timestamp, dann id
+    cursor.execute("""
+        INSERT OR REPLACE INTO stats_rollup
+            (user_id, event_id, task_id, attempts, score_sum, last_score, last_timestamp)
+        SELECT user_id, event_id, rollup_task_id, attempts, score_sum, score, timestamp
+        FROM (
+            SELECT user_id, event_id, COALESCE(task_id, 0) AS rollup_task_id, score, timestamp,
+                   COUNT(*) OVER rollup AS attempts,
+                   SUM(score) OVER rollup AS score_sum,
+                   ROW_NUMBER() OVER (rollup ORDER BY timestamp DESC, id DESC) AS position
+            FROM stats
+            WHERE user_id IS NOT NULL AND event_id IS NOT NULL
+            WINDOW rollup AS (PARTITION BY user_id, event_id, COALESCE(task_id, 0))
+        )
+        WHERE position = 1
+    """)
+
+
+def migration_011_stats_rollup_pages(cursor):
+    """Trendsumme und Indizes für die seitenweise Aufgabenliste der Statistikseite."""
+    # Summe aus Versuchsnummer (ab 0, chronologisch) mal Bewertung; zusammen mit attempts und
+    # score_sum ergibt sie die Steigung der Regressionsgeraden ohne die einzelnen Bewertungen
+    _add_column_if_missing(cursor, "stats_rollup", "attempt_score_sum", "INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""
+        UPDATE stats_rollup SET attempt_score_sum = totals.attempt_score_sum
+        FROM (
+            SELECT user_id, event_id, rollup_task_id, SUM(attempt * score) AS attempt_score_sum
+            FROM (
+                SELECT user_id, event_id, COALESCE(task_id, 0) AS rollup_task_id, score,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY user_id, event_id, COALESCE(task_id, 0) ORDER BY timestamp, id
+                       ) - 1 AS attempt
+                FROM stats
+                WHERE user_id IS NOT NULL AND event_id IS NOT NULL
+            )
+            GROUP BY user_id, event_id, rollup_task_id
+        ) AS totals
+        WHERE stats_rollup.user_id = totals.user_id AND stats_rollup.event_id = totals.event_id
+          AND stats_rollup.task_id = totals.rollup_task_id
+    """)
+    _create_indexes(cursor, [
+        # Aufgabenliste: zuletzt bearbeitete Aufgabe zuerst, gesamt bzw. pro Event
+        ("idx_stats_rollup_user_last", "stats_rollup", "user_id, last_timestamp, task_id"),
+        ("idx_stats_rollup_user_event_last", "stats_rollup", "user_id, event_id, last_timestamp, task_id"),
+    ])
+
+
+def migration_012_stats_latest(cursor):
+    """Letzte Bewertung je Benutzer und Event für die Dashboard-Karten, gepflegt von save_stats."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_latest (
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            stats_id INTEGER NOT NULL,      -- Zeile in stats, aus der die Bewertung stammt
+            score INTEGER,
+            timestamp DATETIME,
+            PRIMARY KEY (user_id, event_id)
+        )
+    """)
+    # Bestehende Bewertungen übernehmen; letzte Bewertung nach timestamp, dann id
+    cursor.execute("""
+        INSERT OR REPLACE INTO stats_latest (user_id, event_id, stats_id, score, timestamp)
+        SELECT user_id, event_id, id, score, timestamp
+        FROM (
+            SELECT user_id, event_id, id, score, timestamp,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY user_id, event_id ORDER BY timestamp DESC, id DESC
+                   ) AS position
+            FROM stats
+            WHERE user_id IS NOT NULL AND event_id IS NOT NULL
+        )
+        WHERE position = 1
+    """)
+
+
+def migration_013_hash_passwords(cursor):
+    """
+    Keine Schemaänderung: Klartext-Passwörter ersetzt authenticate_user beim nächsten Login,
+    übrige Einträge auth.rehash_plaintext_passwords() außerhalb der Migrationssperre.
+    Eine KDF-Rechnung je Benutzer unter BEGIN IMMEDIATE würde alle Schreiber blockieren.
+    """
+
+
+def migration_014_import_job_uploads(cursor):
+    """Pfad der Upload-Datei je Import-Job, damit recover_jobs() sie nach einem Neustart löschen kann."""
+    _add_column_if_missing(cursor, "import_jobs", "upload_path", "TEXT")
+
+
+# Reihenfolge = Versionsnummer (Position 1 entspricht user_version 1)
+MIGRATIONS = [
+    migration_001_base_tables,
+    migration_002_event_import_flag,
+    migration_003_premium_flag,
+    migration_004_quiz_limits,
+    migration_005_hot_query_indexes,
+    migration_006_llm_cache,
+    migration_007_chat_keyset_indexes,
+    migration_008_import_jobs,
+    migration_009_stats_task_index,
+    migration_010_stats_rollup,
+    migration_011_stats_rollup_pages,
+    migration_012_stats_latest,
+    migration_013_hash_passwords,
+    migration_014_import_job_uploads,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Bringt die Datenbank auf LATEST_VERSION.
+    :param conn: sqlite3-Verbindung
+    :return: Liste der angewendeten Versionsnummern (leer, wenn bereits aktuell)
+    """
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return []
+
+    # BEGIN IMMEDIATE sperrt konkurrierende Prozesse (Streamlit, chat_api, import_data),
+    # danach wird die Version erneut gelesen, falls ein anderer Prozess schneller war.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = get_schema_version(conn)
+        applied = []
+        cursor = conn.cursor()
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            if version > current:
+                migration(cursor)
+                applied.append(version)
+        cursor.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+        conn.commit()
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
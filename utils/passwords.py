@@ -0,0 +1,95 @@
+"""
+Passwort-Hashing mit scrypt aus hashlib.
+
+In users.password steht ein selbstbeschreibender String "scrypt$n$r$p$salt$hash"
+(Salt und Hash base64), die Kostenparameter sind also je Benutzer gespeichert.
+Werden PASSWORD_SCRYPT_N/R/P erhöht, bleiben alte Hashes gültig; needs_rehash()
+meldet sie, und der Login ersetzt sie mit dem gerade eingegebenen Passwort.
+
+Kosten: scrypt belegt 128 * n * r Bytes je Prüfung und rechnet ungefähr proportional
+zu n * r * p. benchmarks/bench_login.py misst Latenz und Durchsatz für die Einstellung.
+"""
+import base64
+import hashlib
+import hmac
+import os
+
+SCHEME = "scrypt"
+# Standard: n=2^15, r=8, p=1 (32 MiB je Prüfung)
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 15)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+_dummy_hash = None
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem: OpenSSL begrenzt sonst auf 32 MiB, was für n=2^15 nicht ganz reicht
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=128 * r * (n + p) + 1024 * 1024, dklen=HASH_BYTES
+    )
+
+
+def _parse(stored):
+    # (n, r, p, salt, hash) oder None für Klartext aus der Zeit vor dem Hashing
+    parts = stored.split("$") if stored else []
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        return (int(parts[1]), int(parts[2]), int(parts[3]),
+                base64.b64decode(parts[4]), base64.b64decode(parts[5]))
+    except ValueError:
+        return None
+
+
+def is_password_hash(stored):
+    return _parse(stored) is not None
+
+
+def hash_password(password):
+    """
+    Hasht ein Passwort mit neuem Salt und den aktuellen Kostenparametern.
+    :return: String für users.password
+    """
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{SCHEME}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password, stored):
+    """
+    Prüft ein Passwort gegen den gespeicherten Wert mit dessen eigenen Parametern.
+    Klartext-Einträge werden zeitkonstant verglichen, damit sie beim Login ersetzt werden können.
+    :return: True, wenn das Passwort passt
+    """
+    parsed = _parse(stored)
+    if parsed is None:
+        return stored is not None and hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    n, r, p, salt, digest = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), digest)
+
+
+def needs_rehash(stored):
+    """
+    :return: True für Klartext oder Hashes mit anderen als den aktuellen Parametern
+    """
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def verify_dummy(password):
+    """
+    Prüft gegen einen festen Hash, wenn der Benutzername unbekannt ist –
+    so dauert ein Fehlversuch gleich lang und verrät nicht, ob es den Benutzer gibt.
+    """
+    global _dummy_hash
+    if _dummy_hash is None or needs_rehash(_dummy_hash):
+        _dummy_hash = hash_password("")
+    verify_password(password, _dummy_hash)
@@ -0,0 +1,262 @@
+"""
+Vektorisierte Auswertung der Bewertungen für die Statistikseite.
+
+Die Aufgabenliste wird seitenweise aus stats_rollup gelesen; die letzten Bewertungen je
+Aufgabe wählt eine Fensterfunktion nur für die Aufgaben der Seite aus. Gleitender
+Durchschnitt und Trend (Steigung der Regressionsgeraden über die Versuche) werden
+vektorisiert auf dem DataFrame der Seite berechnet statt in Python-Schleifen.
+
+Für den Score-Verlauf werden höchstens CHART_MAX_POINTS Punkte an Plotly übergeben: bei
+langer Historie als Tages-, Wochen- oder Monatsdurchschnitt aus SQL, für bereits geladene
+Bewertungen per Largest-Triangle-Three-Buckets (LTTB).
+"""
+import os
+from sqlite3 import Error
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.cache import cached
+from utils.database import create_connection
+
+# Anzahl der Versuche im gleitenden Durchschnitt
+MOVING_AVERAGE_WINDOW = 5
+# Angezeigte letzte Bewertungen je Aufgabe
+RECENT_RESULTS_PER_TASK = 5
+# Obergrenze für die Punkte eines Score-Verlaufs, darüber wird zusammengefasst
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+# Zeitbuckets für den Score-Verlauf, feinste zuerst: (Name, Mehrzahl, Tage, SQL-Ausdruck)
+CHART_BUCKETS = [
+    ("Tag", "Tage", 1, "date(stats.timestamp)"),
+    ("Woche", "Wochen", 7, "date(stats.timestamp, 'weekday 0', '-6 days')"),
+    ("Monat", "Monate", 31, "date(stats.timestamp, 'start of month')"),
+]
+HISTORY_COLUMNS = ["timestamp", "score", "min_score", "max_score", "attempts"]
+
+
+def add_moving_average(df, window=MOVING_AVERAGE_WINDOW):
+    """
+    Ergänzt die Spalte moving_average für den Score-Verlauf: Durchschnitt der letzten
+    window Bewertungen (über alle Aufgaben).
+    :param df: Chronologisch sortierter DataFrame aus load_score_history
+    """
+    df = df.copy()
+    df["moving_average"] = df["score"].rolling(window, min_periods=1).mean()
+    return df
+
+
+def trend_slope(attempts, score_sum, attempt_score_sum):
+    """
+    Steigung der Regressionsgeraden durch (Versuchsnummer, Bewertung) aus Summen,
+    vektorisiert über alle Aufgaben. Die Versuchsnummern laufen von 0 bis n-1, daher
+    folgen Summe und Quadratsumme der x-Werte direkt aus n.
+    :return: numpy-Array, 0 bei weniger als zwei Versuchen
+    """
+    n = np.asarray(attempts, dtype=float)
+    sum_y = np.asarray(score_sum, dtype=float)
+    sum_xy = np.asarray(attempt_score_sum, dtype=float)
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+
+
+def _rollup_filter(user_id, event_id=None):
+    where, params = "stats_rollup.user_id = :user_id", {"user_id": user_id}
+    if event_id:
+        where += " AND stats_rollup.event_id = :event_id"
+        params["event_id"] = event_id
+    return where, params
+
+
+@cached("user")
+def count_stat_tasks(user_id, event_id=None):
+    """
+    Anzahl der Aufgaben mit Bewertungen (für display_pagination).
+    """
+    where, params = _rollup_filter(user_id, event_id)
+    conn = create_connection()
+    if conn is not None:
+        try:
+            return conn.execute(f"""
+                SELECT COUNT(*) FROM stats_rollup
+                JOIN tasks ON tasks.id = stats_rollup.task_id
+                JOIN events ON events.id = stats_rollup.event_id
+                WHERE {where}
+            """, params).fetchone()[0]
+        except Error as e:
+            st.error(f"Fehler beim Laden der Statistiken: {e}")
+        finally:
+            conn.close()
+    return 0
+
+
+@cached("user")
+def load_task_page(user_id, event_id=None, limit=5, offset=0, per_task=RECENT_RESULTS_PER_TASK):
+    """
+    Lädt eine Seite der Aufgabenliste (eine Zeile je Event und Aufgabe), zuletzt bearbeitete
+    Aufgabe zuerst.
+    Kennzahlen stammen aus stats_rollup, die letzten per_task Bewertungen je Aufgabe nummeriert
+    ROW_NUMBER() nur für die Aufgaben der Seite; der Aufwand hängt weder von der Anzahl der
+    Aufgaben noch von der Anzahl der Bewertungen ab.
+    :param limit: Aufgaben je Seite, -1 für alle Aufgaben (vollständige Auswertung)
+    :return: DataFrame mit task_id, event_id, task_title, attempts, avg_score, last_score,
+             last_timestamp, moving_average, trend und recent (Liste von (score, timestamp))
+    """
+    where, params = _rollup_filter(user_id, event_id)
+    params.update(limit=limit, offset=offset, recent=max(per_task, MOVING_AVERAGE_WINDOW))
+    query = f"""
+        WITH page AS (
+            SELECT stats_rollup.task_id, stats_rollup.event_id, tasks.title AS task_title,
+                   stats_rollup.attempts, stats_rollup.score_sum, stats_rollup.attempt_score_sum,
+                   stats_rollup.last_score, stats_rollup.last_timestamp
+            FROM stats_rollup
+            JOIN tasks ON tasks.id = stats_rollup.task_id
+            JOIN events ON events.id = stats_rollup.event_id
+            WHERE {where}
+            ORDER BY stats_rollup.last_timestamp DESC, stats_rollup.task_id DESC, stats_rollup.event_id DESC
+            LIMIT :limit OFFSET :offset
+        ),
+        ranked AS (
+            SELECT stats.event_id, stats.task_id, stats.score, stats.timestamp,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY stats.event_id, stats.task_id ORDER BY stats.timestamp DESC, stats.id DESC
+                   ) AS position
+            FROM page
+            -- Von den Aufgaben der Seite ausgehen (CROSS JOIN legt die Reihenfolge fest) und je
+            -- Aufgabe nur die neuesten Zeilen über idx_stats_user_event_task_timestamp lesen
+            CROSS JOIN stats ON stats.id IN (
+                SELECT latest.id FROM stats AS latest
+                WHERE latest.user_id = :user_id AND latest.event_id = page.event_id
+                  AND latest.task_id = page.task_id
+                ORDER BY latest.timestamp DESC, latest.id DESC
+                LIMIT :recent)
+        )
+        SELECT page.*, ranked.position, ranked.score, ranked.timestamp
+        FROM page
+        JOIN ranked ON ranked.event_id = page.event_id AND ranked.task_id = page.task_id
+        WHERE ranked.position <= :recent
+        ORDER BY page.last_timestamp DESC, page.task_id DESC, page.event_id DESC, ranked.position
+    """
+    rows = []
+    conn = create_connection()
+    if conn is not None:
+        try:
+            rows = conn.execute(query, params).fetchall()
+        except Error as e:
+            st.error(f"Fehler beim Laden der Statistiken: {e}")
+        finally:
+            conn.close()
+    columns = ["task_id", "event_id", "task_title", "attempts", "score_sum", "attempt_score_sum",
+               "last_score", "last_timestamp", "position", "score", "timestamp"]
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+    # Eine Aufgabe kann unter mehreren Events bewertet sein (z.B. geteilte Events): Zeilen je Paar
+    key = ["event_id", "task_id"]
+    page = df.groupby(key, sort=False).first()
+    page["moving_average"] = df[df["position"] <= MOVING_AVERAGE_WINDOW].groupby(key)["score"].mean()
+    recent = {}
+    for event_id, task_id, position, score, timestamp in zip(
+            df["event_id"], df["task_id"], df["position"], df["score"], df["timestamp"]):
+        if position <= per_task:
+            recent.setdefault((event_id, task_id), []).append((score, timestamp))
+    page["recent"] = [recent.get(pair, []) for pair in page.index]
+    page["avg_score"] = page["score_sum"] / page["attempts"]
+    page["trend"] = trend_slope(page["attempts"], page["score_sum"], page["attempt_score_sum"])
+    page["last_timestamp"] = pd.to_datetime(page["last_timestamp"])
+    return page.reset_index()[[
+        "task_id", "event_id", "task_title", "attempts", "avg_score", "last_score",
+        "last_timestamp", "moving_average", "trend", "recent",
+    ]]
+
+
+@cached("user")
+def load_score_history(user_id, event_id=None, max_points=CHART_MAX_POINTS):
+    """
+    Daten für den Score-Verlauf mit höchstens max_points Punkten (bei sehr langer Historie
+    bis zu einem Punkt pro Monat). Bis max_points Bewertungen werden einzeln geliefert,
+    darüber wählt die Funktion den feinsten Bucket aus CHART_BUCKETS, dessen Anzahl über
+    die Zeitspanne max_points nicht übersteigt, und aggregiert in SQL.
+    :return: Tupel (DataFrame mit HISTORY_COLUMNS, chronologisch; Eintrag aus CHART_BUCKETS
+             oder None für Einzelwerte)
+    """
+    where, params = "stats.user_id = ?", [user_id]
+    if event_id:
+        where += " AND stats.event_id = ?"
+        params.append(event_id)
+    source = f"FROM stats JOIN events ON stats.event_id = events.id WHERE {where}"
+    rollup_where, rollup_params = _rollup_filter(user_id, event_id)
+    rows, bucket = [], None
+    conn = create_connection()
+    if conn is not None:
+        try:
+            # Anzahl aus stats_rollup, Zeitspanne über getrennte MIN/MAX-Abfragen auf dem Index,
+            # damit die Auswahl des Buckets nicht selbst alle Bewertungen liest
+            count = conn.execute(f"""
+                SELECT COALESCE(SUM(stats_rollup.attempts), 0) FROM stats_rollup
+                JOIN events ON events.id = stats_rollup.event_id
+                WHERE {rollup_where}
+            """, rollup_params).fetchone()[0]
+            if count <= max_points:
+                rows = conn.execute(
+                    f"SELECT stats.timestamp, stats.score, stats.score, stats.score, 1 {source} "
+                    "ORDER BY stats.timestamp, stats.id",
+                    params
+                ).fetchall()
+            else:
+                span_days = conn.execute(
+                    f"SELECT julianday((SELECT MAX(timestamp) FROM stats WHERE {where})) "
+                    f"- julianday((SELECT MIN(timestamp) FROM stats WHERE {where}))",
+                    params * 2
+                ).fetchone()[0] or 0
+                bucket = next(
+                    (entry for entry in CHART_BUCKETS if span_days / entry[2] + 1 <= max_points),
+                    CHART_BUCKETS[-1]
+                )
+                rows = conn.execute(
+                    f"SELECT {bucket[3]} AS bucket, AVG(stats.score), MIN(stats.score), MAX(stats.score), "
+                    f"COUNT(*) {source} GROUP BY bucket ORDER BY bucket",
+                    params
+                ).fetchall()
+        except Error as e:
+            st.error(f"Fehler beim Laden der Statistiken: {e}")
+        finally:
+            conn.close()
+    df = pd.DataFrame.from_records(rows, columns=HISTORY_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df, bucket
+
+
+def lttb_indices(x, y, threshold=CHART_MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets: wählt threshold Punkte, die die Form der Kurve
+    erhalten (erster und letzter Punkt, dazwischen je Bucket der Punkt mit der größten
+    Dreiecksfläche zum zuvor gewählten Punkt und zum Mittel des nächsten Buckets).
+    :param x: Aufsteigend sortierte x-Werte (Zahlen oder datetime64)
+    :return: numpy-Array der Indizes der gewählten Punkte
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    if x.dtype.kind == "M":
+        x = x.astype("int64")
+    x = x.astype(float)
+    y = np.asarray(y, dtype=float)
+    # threshold - 2 Buckets zwischen erstem und letztem Punkt
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
+    return indices
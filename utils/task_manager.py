@@ -2,6 +2,7 @@ import streamlit as st
 import sqlite3
 from sqlite3 import Error
 from utils.database import create_connection
+from utils.cache import cached, invalidate, invalidate_all
 
 def save_task(event_id, title, content):
     """
@@ -20,6 +21,7 @@ def save_task(event_id, title, content):
                     (event_id, title, content),
                 )
                 conn.commit()
+                invalidate("event", event_id)
                 st.success("Aufgabe gespeichert!")
             except Error as e:
                 st.error(f"Fehler beim Speichern der Aufgabe: {e}")
@@ -44,6 +46,8 @@ def edit_task(task_id, new_title, new_content):
                 (new_title, new_content, task_id),
             )
             conn.commit()
+            # Aufgabe kann in load_tasks des Events und in load_shared_tasks anderer Benutzer stehen
+            invalidate_all()
             st.success("Aufgabe erfolgreich bearbeitet!")
         except Error as e:
             st.error(f"Fehler beim Bearbeiten der Aufgabe: {e}")
@@ -72,6 +76,7 @@ def share_task(task_id, shared_by_user_id, shared_with_username):
                     (task_id, shared_by_user_id, shared_with_user_id),
                 )
                 conn.commit()
+                invalidate("user", shared_with_user_id)
                 st.success(f"Aufgabe erfolgreich mit {shared_with_username} geteilt!")
             else:
                 st.error(f"Benutzer '{shared_with_username}' nicht gefunden.")
@@ -80,6 +85,7 @@ def share_task(task_id, shared_by_user_id, shared_with_username):
         finally:
             conn.close()
 
+@cached("user")
 def load_shared_tasks(user_id):
     """
     Lädt die mit dem Benutzer geteilten Aufgaben.
@@ -105,6 +111,7 @@ def load_shared_tasks(user_id):
             conn.close()
     return []
 
+@cached("event")
 def load_tasks(event_id):
     """
     Lädt alle Aufgaben für ein bestimmtes Event.
@@ -135,6 +142,7 @@ def delete_task(task_id):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
             conn.commit()
+            invalidate_all()
             st.success("Aufgabe gelöscht!")
         except Error as e:
             st.error(f"Fehler beim Löschen der Aufgabe: {e}")
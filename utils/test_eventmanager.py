@@ -3,15 +3,33 @@ import utils.database
 import sqlite3
 import pytest
 import os
+import re
 
 TEST_DB_PATH = "data/test_eventmanager.db"
 utils.database.DB_PATH = TEST_DB_PATH  
 
-from utils.database import create_connection, create_tables
-from utils.auth import register, login, get_user_premium_status_and_quiz_limits
+from utils.database import (
+    create_connection,
+    create_tables,
+    get_connection,
+    count_dashboard_events,
+    load_dashboard_events,
+    load_latest_scores,
+    load_task_previews,
+    get_event_by_id,
+    get_task_by_id,
+    load_shared_dashboard_events,
+)
+from utils.connection_pool import pool
+from utils.migrations import LATEST_VERSION, get_schema_version, migrate
+from utils.auth import register, login, authenticate_user, get_user_premium_status_and_quiz_limits, rehash_plaintext_passwords
+from utils.passwords import hash_password, needs_rehash, verify_password
+import utils.passwords
 from utils.event_manager import create_event, load_events, share_event
 from utils.task_manager import save_task, load_tasks
-from utils.event_stats_manager import save_stats, load_stats
+from utils.event_stats_manager import save_stats, load_stats, load_stats_summary
+from utils.stats_engine import count_stat_tasks, load_score_history, load_task_page
+from utils import chat_repository, event_manager, task_manager
 
 @pytest.fixture(scope="module")
 def test_db():
@@ -23,6 +41,7 @@ def test_db():
     conn = sqlite3.connect(TEST_DB_PATH)
     yield conn
     conn.close()
+    pool.close_all()
     try:
         os.remove(TEST_DB_PATH)
     except:
@@ -69,12 +88,13 @@ def test_user_authentication():
     mock_st = MagicMock()
     mock_cookies = MagicMock()
     mock_st.session_state = {}
+    mock_st.text_input.side_effect = ["testuser", "testpass"]
     with patch('utils.auth.st', mock_st), \
          patch('utils.auth.create_connection') as mock_conn:
         mock_conn.return_value = MagicMock()
         cursor = MagicMock()
         mock_conn.return_value.cursor.return_value = cursor
-        cursor.fetchone.return_value = (1, 0)  # user_id, is_premium
+        cursor.fetchone.return_value = (1, 0, "testpass")  # user_id, is_premium, password
         login(mock_cookies)
         assert mock_st.session_state["logged_in"] is True
         assert mock_st.session_state["user_id"] == "1"
@@ -114,8 +134,545 @@ def test_event_sharing(test_db, test_user):
     cursor.execute("DELETE FROM users WHERE id = ?", (share_user_id,))
     test_db.commit()
 
+def test_event_sharing_with_cold_cache(test_db, test_user):
+    """Testet, dass share_event Event und Aufgaben vollständig teilt, auch wenn load_tasks nicht im Cache liegt"""
+    from utils.cache import invalidate_all
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('coldshare', 'x')")
+    share_user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Cold Share', '')", (test_user,))
+    event_id = cursor.lastrowid
+    cursor.execute("INSERT INTO tasks (event_id, title, content) VALUES (?, 'Aufgabe', '')", (event_id,))
+    test_db.commit()
+    invalidate_all()
+
+    share_event(event_id, test_user, "coldshare")
+    assert cursor.execute("SELECT COUNT(*) FROM shared_events WHERE event_id = ? AND shared_with_user_id = ?",
+                          (event_id, share_user_id)).fetchone()[0] == 1
+    assert cursor.execute("SELECT COUNT(*) FROM shared_tasks WHERE shared_with_user_id = ?",
+                          (share_user_id,)).fetchone()[0] == 1
+
+def test_nested_close_keeps_outer_transaction(test_db):
+    """Testet, dass nur das äußerste close() offene Änderungen der gemeinsamen Verbindung verwirft"""
+    outer = create_connection()
+    outer.execute("INSERT INTO users (username, password) VALUES ('nested', 'x')")
+    inner = create_connection()
+    inner.execute("SELECT COUNT(*) FROM users").fetchone()
+    inner.close()
+    inner.close()  # doppeltes close zählt nur einmal
+    assert outer.in_transaction
+    outer.commit()
+    outer.close()
+    assert test_db.execute("SELECT COUNT(*) FROM users WHERE username = 'nested'").fetchone()[0] == 1
+
+    rolled_back = create_connection()
+    rolled_back.execute("INSERT INTO users (username, password) VALUES ('verworfen', 'x')")
+    rolled_back.close()
+    assert test_db.execute("SELECT COUNT(*) FROM users WHERE username = 'verworfen'").fetchone()[0] == 0
+    test_db.execute("DELETE FROM users WHERE username = 'nested'")
+    test_db.commit()
+
 def test_database_connection():
     """Testet die Datenbankverbindung"""
     conn = create_connection() 
     assert conn is not None
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+def test_dashboard_loader(test_db, test_user):
+    """Testet, dass das Dashboard Events, Aufgaben und letzte Bewertung gebündelt lädt"""
+    from utils.migrations import migration_012_stats_latest
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Dashboard Event', '')", (test_user,))
+    event_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')",
+                       [(event_id, "A"), (event_id, "B")])
+    cursor.execute("INSERT INTO stats (user_id, event_id, score, timestamp) VALUES (?, ?, 40, '2024-01-01 10:00:00')",
+                   (test_user, event_id))
+    cursor.execute("INSERT INTO stats (user_id, event_id, score, timestamp) VALUES (?, ?, 90, '2024-01-02 10:00:00')",
+                   (test_user, event_id))
+    # Direkt eingefügte Bewertungen wie bei der Migration übernehmen
+    migration_012_stats_latest(cursor)
+    test_db.commit()
+
+    total, _ = count_dashboard_events(test_user)
+    events = {e["id"]: e for e in load_dashboard_events(test_user)}
+    assert total == len(events)
+    assert events[event_id]["title"] == "Dashboard Event"
+    assert load_latest_scores(test_user, [event_id]) == {event_id: 90}
+    # save_stats schreibt die letzte Bewertung fort
+    save_stats(test_user, event_id, None, 70)
+    assert load_latest_scores(test_user, [event_id, event_id + 1]) == {event_id: 70}
+    assert load_latest_scores(test_user, []) == {}
+    previews = load_task_previews([event_id])
+    assert [task[1] for task in previews[event_id]] == ["A", "B"]
+
+def test_read_cache_invalidated_on_write(test_db, test_user):
+    """Testet, dass gecachte Lesefunktionen nach Schreibzugriffen aktuelle Daten liefern"""
+    before = load_events(test_user)
+    assert load_events(test_user) == before  # aus dem Cache
+    create_event(test_user, "Cache Event", "")
+    assert len(load_events(test_user)) == len(before) + 1
+    event_id = load_events(test_user)[0][0]
+    assert load_stats(test_user, event_id) == []
+    save_stats(test_user, event_id, None, 70)
+    assert load_stats(test_user, event_id)[0][1] == 70
+
+def test_connection_pool_reuses_connection(test_db):
+    """Testet, dass create_connection() pro Thread dieselbe Verbindung wiederverwendet"""
+    conn1 = create_connection()
+    conn1.close()
+    conn2 = create_connection()
+    assert conn1._conn is conn2._conn
+    with get_connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+def test_pragma_profile_applied(test_db):
+    """Testet, dass die Datenbank im WAL-Modus mit busy_timeout betrieben wird"""
+    conn = create_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    conn.close()
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    """Testet, dass eine Datenbank ohne user_version einmalig auf den aktuellen Stand gebracht wird"""
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL)")
+    conn.execute("INSERT INTO users (username, password) VALUES ('alt', 'pw')")
+    conn.commit()
+    assert migrate(conn) == list(range(1, LATEST_VERSION + 1))
+    assert get_schema_version(conn) == LATEST_VERSION
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(users)")]
+    assert {"is_premium", "daily_quiz_count", "last_quiz_reset"} <= set(columns)
+    assert conn.execute("SELECT username FROM users").fetchone()[0] == "alt"
+    # Passwörter hasht erst der Login, nicht die Migration unter der Schreibsperre
+    assert conn.execute("SELECT password FROM users").fetchone()[0] == "pw"
+    # Zweiter Aufruf ist ein No-Op
+    assert migrate(conn) == []
+    conn.close()
+
+# Hot Paths der Datenzugriffsschicht – ihre Abfragen dürfen nie auf einen Full Table Scan zurückfallen.
+# Geprüft wird das SQL, das die Funktionen tatsächlich absetzen (per Trace-Callback aufgezeichnet).
+HOT_CALLS = [
+    (event_manager.load_events, (1,)),
+    (event_manager.load_events_with_import_status, (1, False)),
+    (event_manager.load_tasks, (1,)),
+    (event_manager.load_shared_events, (1,)),
+    (task_manager.load_tasks, (1,)),
+    (task_manager.load_shared_tasks, (1,)),
+    (get_event_by_id, (1,)),
+    (get_task_by_id, (1,)),
+    (count_dashboard_events, (1,)),
+    (load_dashboard_events, (1, True, 5, 0)),
+    (load_shared_dashboard_events, (1,)),
+    (load_task_previews, ([1, 2],)),
+    (load_latest_scores, (1, [1, 2])),
+    (load_stats, (1,)),
+    (load_stats, (1, 1)),
+    (load_stats, (1, 1, 1)),
+    (load_stats_summary, (1,)),
+    (load_stats_summary, (1, 1)),
+    (count_stat_tasks, (1,)),
+    (count_stat_tasks, (1, 1)),
+    (load_task_page, (1, None, 5, 0)),
+    (load_task_page, (1, 1, 5, 5)),
+    (load_score_history, (1,)),
+    (load_score_history, (1, 1)),
+    (chat_repository.get_history, (1, 1, 1, 10, 100)),
+    (chat_repository.get_history, (1, 1, None, 10, None, 0)),
+]
+
+def _cte_names(query):
+    return {name.lower() for name in re.findall(r"(\w+)\s+AS\s*\(", query, flags=re.IGNORECASE)}
+
+@pytest.mark.parametrize("func,args", HOT_CALLS, ids=[f"{func.__name__}{args}" for func, args in HOT_CALLS])
+def test_hot_queries_use_indexes(test_db, func, args):
+    """EXPLAIN QUERY PLAN: jede Tabelle muss über einen Index oder Primärschlüssel gesucht werden"""
+    statements = []
+    conn = create_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        getattr(func, "uncached", func)(*args)
+    finally:
+        conn.set_trace_callback(None)
+    queries = [q for q in statements if q.lstrip().upper().startswith(("SELECT", "WITH"))]
+    assert queries, f"{func.__name__} hat keine Abfrage abgesetzt"
+    for query in queries:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query).fetchall()]
+        # Erlaubt sind nur Scans über CTEs, Zwischenergebnisse von Unterabfragen und
+        # virtuelle Tabellen (json_each)
+        scans = [
+            step for step in plan
+            if step.startswith("SCAN") and "VIRTUAL TABLE" not in step
+            and not step.split()[1].startswith("(") and step.split()[1].lower() not in _cte_names(query)
+        ]
+        assert not scans, (func.__name__, query, plan)
+    conn.close()
+
+def test_evaluate_answers_runs_in_parallel():
+    """Testet, dass mehrere Antworten gleichzeitig bewertet werden und die Reihenfolge erhalten bleibt"""
+    import time
+    from utils import event_question_generator
+
+    def slow_evaluate(question, user_answer, correct_answer):
+        time.sleep(0.2)
+        return {"score": int(user_answer)}
+
+    items = [("Frage", str(score), "Muster") for score in range(1, 6)]
+    with patch.object(event_question_generator, "evaluate_answer", side_effect=slow_evaluate):
+        start = time.perf_counter()
+        results = event_question_generator.evaluate_answers(items)
+        elapsed = time.perf_counter() - start
+    assert [r["score"] for r in results] == [1, 2, 3, 4, 5]
+    assert elapsed < 0.2 * len(items)
+
+def test_llm_cache_hit_miss_and_eviction(test_db):
+    """Testet den KI-Cache: Treffer für identische Prompts und LRU-Begrenzung"""
+    from utils import llm_cache
+    before = llm_cache.get_cache_stats()
+    assert llm_cache.get_cached_response("test-model", "Prompt A") is None
+    llm_cache.store_response("test-model", "Prompt A", '{"score": 4}')
+    assert llm_cache.get_cached_response("test-model", "Prompt A") == '{"score": 4}'
+    assert llm_cache.get_cached_response("anderes-model", "Prompt A") is None
+    after = llm_cache.get_cache_stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
+
+    with patch.object(llm_cache, "LLM_CACHE_MAX_ENTRIES", 2):
+        for i in range(4):
+            llm_cache.store_response("test-model", f"Prompt {i}", "x")
+        assert llm_cache.get_cache_stats()["entries"] == 2
+
+def test_chat_repository_roundtrip(test_db, test_user):
+    """Testet Speichern, Laden und Löschen von Chatnachrichten ohne HTTP-Aufruf"""
+    from utils import chat_repository
+    event_id = 4242
+    chat_repository.save_message(test_user, event_id, None, "user", "Hallo", "2024-01-01T10:00:00")
+    chat_repository.save_message(test_user, event_id, None, "assistant", "Hi!", "2024-01-01T10:00:01")
+    history = chat_repository.get_history(test_user, event_id)
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert chat_repository.get_stats(test_user, event_id)["total_messages"] == 2
+    assert chat_repository.clear_history(test_user, event_id) == 2
+    assert chat_repository.get_history(test_user, event_id) == []
+
+def test_chat_history_keyset_pagination(test_db, test_user):
+    """Testet die Keyset-Pagination: letzte Seite, ältere Seite und neue Nachrichten"""
+    from utils import chat_repository
+    for i in range(10):
+        chat_repository.save_message(test_user, None, 777, "user", f"Nachricht {i}", f"2024-01-01T10:00:{i:02d}")
+    tail = chat_repository.get_history(test_user, task_id=777, limit=3)
+    assert [m["content"] for m in tail] == ["Nachricht 7", "Nachricht 8", "Nachricht 9"]
+    older = chat_repository.get_history(test_user, task_id=777, limit=3, before_id=tail[0]["id"])
+    assert [m["content"] for m in older] == ["Nachricht 4", "Nachricht 5", "Nachricht 6"]
+    assert chat_repository.get_history(test_user, task_id=777, after_id=tail[-1]["id"]) == []
+    newer = chat_repository.get_history(test_user, task_id=777, after_id=older[-1]["id"], limit=2)
+    assert [m["content"] for m in newer] == ["Nachricht 7", "Nachricht 8"]
+    chat_repository.clear_history(test_user, task_id=777)
+
+def test_run_db_executes_in_db_executor():
+    """Testet, dass run_db blockierende Aufrufe außerhalb der Event-Loop ausführt"""
+    import asyncio
+    import threading
+    from utils.async_db import run_db
+    thread_name = asyncio.run(run_db(lambda: threading.current_thread().name))
+    assert thread_name.startswith("sqlite")
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(run_db(lambda: sqlite3.connect(":memory:").execute("SELECT * FROM fehlt")))
+
+def test_import_dataframe_set_based(test_db, test_user):
+    """Testet den mengenbasierten Import: Duplikate, vorhandene Events und Aufgaben"""
+    import pandas as pd
+    from utils.import_data import import_dataframe
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Vorhanden', '')", (test_user,))
+    cursor.execute("INSERT INTO tasks (event_id, title, content) VALUES (?, 'Alt', '')", (cursor.lastrowid,))
+    test_db.commit()
+    df = pd.DataFrame({
+        "Titel": ["Neu", " Neu ", "Vorhanden", "Vorhanden", None, "Neu"],
+        "Beschreibung": ["Erste", "Zweite", "", "", "", ""],
+        "Aufgabe Titel": ["A", "A", "Alt", "B", "C", None],
+        "Aufgabe Inhalt": ["a", "a2", "", "b", "", ""],
+    })
+    assert import_dataframe(df, test_user) == (1, 2)
+    # Erneuter Import legt nichts doppelt an
+    assert import_dataframe(df, test_user) == (0, 0)
+    rows = test_db.execute(
+        "SELECT events.title, events.description, events.is_imported, tasks.title, tasks.content FROM events "
+        "JOIN tasks ON tasks.event_id = events.id WHERE events.user_id = ? ORDER BY tasks.id", (test_user,)
+    ).fetchall()
+    assert rows == [("Vorhanden", "", None, "Alt", ""), ("Neu", "Erste", 1, "A", "a"), ("Vorhanden", "", None, "B", "b")]
+
+def test_import_csv_stream_commits_per_chunk(test_db, test_user):
+    """Testet den Chunk-Import: Fortschritt pro Chunk und Duplikaterkennung über Chunks hinweg"""
+    import io
+    from utils.import_data import import_csv_stream
+    csv = "Titel,Beschreibung,Aufgabe Titel,Aufgabe Inhalt\n" + "".join(
+        f"Stream {i % 2},Beschreibung,Aufgabe {i % 3},Inhalt\n" for i in range(7)
+    )
+    progress = []
+    result = import_csv_stream(io.StringIO(csv), test_user, chunksize=3, progress=progress.append)
+    assert result == {"imported_events": 2, "imported_tasks": 6, "total_rows_processed": 7, "chunks": 3}
+    assert [p["total_rows_processed"] for p in progress] == [3, 6, 7]
+
+def test_import_job_progress_and_failure(test_db, test_user):
+    """Testet Import-Jobs: Fortschritt pro Chunk, Abschluss und Fehlerstatus"""
+    from utils import import_jobs
+
+    def fake_import(rows, progress=None):
+        for done in range(1, rows + 1):
+            progress({"total_rows_processed": done, "imported_events": done, "imported_tasks": 0, "chunks": done})
+        return {"total_rows_processed": rows, "imported_events": rows, "imported_tasks": 0, "chunks": rows}
+
+    def broken_import(progress=None):
+        raise ValueError("Fehlende Spalten: Titel")
+
+    job_id = import_jobs.create_job(test_user, "daten.csv")
+    assert import_jobs.get_job(job_id)["status"] == "queued"
+    import_jobs.submit_job(job_id, fake_import, 3).result()
+    job = import_jobs.get_job(job_id, test_user)
+    assert (job["status"], job["total_rows_processed"], job["chunks"]) == ("completed", 3, 3)
+    assert import_jobs.get_job(job_id, test_user + 1) is None
+
+    failed_id = import_jobs.create_job(test_user)
+    import_jobs.submit_job(failed_id, broken_import).result()
+    assert import_jobs.get_job(failed_id)["status"] == "failed"
+    assert "Titel" in import_jobs.get_job(failed_id)["error"]
+
+def test_import_jobs_recovered_after_restart(test_db, test_user, tmp_path):
+    """Testet, dass nach einem Neustart unterbrochene Jobs fehlschlagen und ihre Uploads gelöscht werden"""
+    from utils import import_jobs
+    upload = tmp_path / "upload.csv"
+    upload.write_text("Titel,Beschreibung\n")
+    running_id = import_jobs.create_job(test_user, "upload.csv", str(upload))
+    import_jobs.update_job(running_id, status="running")
+    queued_id = import_jobs.create_job(test_user, "weg.csv", str(tmp_path / "weg.csv"))
+    done_id = import_jobs.create_job(test_user)
+    import_jobs.update_job(done_id, status="completed")
+
+    assert import_jobs.recover_jobs() == 2
+    for job_id in (running_id, queued_id):
+        job = import_jobs.get_job(job_id)
+        assert job["status"] == "failed" and "neu gestartet" in job["error"]
+    assert import_jobs.get_job(done_id)["status"] == "completed"
+    assert not upload.exists()
+    assert import_jobs.recover_jobs() == 0
+
+def test_export_rows_stream_as_csv(test_db, test_user):
+    """Testet den Export: eigene und geteilte Events, letzte Bewertung, CSV in Blöcken"""
+    import csv
+    from utils import export_data
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO users (username, password) VALUES ('exportpartner', 'x')")
+    partner = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Eigen', 'd')", (test_user,))
+    own_event = cursor.lastrowid
+    cursor.execute("INSERT INTO tasks (event_id, title, content) VALUES (?, 'Aufgabe', 'c')", (own_event,))
+    task_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) VALUES (?, ?, ?, ?, ?)",
+        [(test_user, own_event, task_id, 2, "2024-01-01"), (test_user, own_event, task_id, 4, "2024-02-01")]
+    )
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Geteilt', '')", (partner,))
+    shared_event = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Fremd', '')", (partner,))
+    foreign_event = cursor.lastrowid
+    cursor.execute("INSERT INTO shared_events (event_id, shared_by_user_id, shared_with_user_id) VALUES (?, ?, ?)",
+                   (shared_event, partner, test_user))
+    test_db.commit()
+
+    rows = list(export_data.iter_export_rows(test_user, [own_event, shared_event, foreign_event]))
+    assert rows == [
+        (own_event, "Eigen", "Persönlich", "d", task_id, "Aufgabe", "c", 4, "2024-02-01"),
+        (shared_event, "Geteilt", "Geteilt von exportpartner", "", None, None, None, None, None),
+    ]
+    with patch.object(export_data, "CSV_BATCH_ROWS", 1):
+        blocks = list(export_data.stream_csv(rows, export_data.export_columns()))
+    assert len(blocks) == 3
+    parsed = list(csv.reader(b"".join(blocks).decode("utf-8").splitlines()))
+    assert parsed[0] == export_data.export_columns() and parsed[2][2] == "Geteilt von exportpartner"
+
+def test_parquet_export_roundtrip(test_db, test_user, tmp_path):
+    """Testet den Parquet-Export: Datentypen bleiben erhalten, Re-Import über pyarrow-Batches"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    from utils.export_data import export_columns, write_parquet
+    from utils.import_data import import_parquet_stream
+    rows = [
+        (1, "Parquet-Event", "Persönlich", "d", 7, "Aufgabe", "c", 4, "2024-02-01 10:00:00"),
+        (2, "Ohne Aufgaben", "Persönlich", "", None, None, None, None, None),
+    ]
+    path = str(tmp_path / "export.parquet")
+    write_parquet(path, rows, export_columns())
+    schema = pq.read_schema(path)
+    assert str(schema.field("Event ID").type) == "int64"
+    assert str(schema.field("Aufgabe ID").type) == "int64"
+    assert str(schema.field("Letzte Bewertung").type) == "int64"
+    assert str(schema.field("Datum").type).startswith("timestamp")
+    result = import_parquet_stream(path, test_user, progress=lambda _: None)
+    assert (result["imported_events"], result["imported_tasks"]) == (2, 1)
+
+def test_stats_rollup_maintained_by_save_stats(test_db, test_user, monkeypatch):
+    """Testet, dass save_stats die Rollup-Tabelle fortschreibt und die Migration Altdaten übernimmt"""
+    # Die Rollup-Prüfung darf keinen LLM-API-Key voraussetzen
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    from utils.event_question_generator import get_user_event_stats
+    from utils.migrations import migration_010_stats_rollup
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Rollup Event', '')", (test_user,))
+    event_id = cursor.lastrowid
+    test_db.commit()
+    for score in (40, 80, 90):
+        save_stats(test_user, event_id, 7, score)
+    save_stats(test_user, event_id, None, 60)
+
+    summary = load_stats_summary.uncached(test_user, event_id)
+    assert summary["attempts"] == 4
+    assert summary["avg_score"] == pytest.approx(67.5)
+    assert get_user_event_stats(test_user, event_id)["avg_score"] == pytest.approx(67.5)
+    rollup = cursor.execute(
+        "SELECT task_id, attempts, score_sum, last_score FROM stats_rollup WHERE user_id = ? AND event_id = ? "
+        "ORDER BY task_id", (test_user, event_id)).fetchall()
+    assert rollup == [(0, 1, 60, 60), (7, 3, 210, 90)]
+
+    # Neuaufbau aus der Tabelle stats liefert dasselbe Ergebnis
+    cursor.execute("DELETE FROM stats_rollup WHERE user_id = ?", (test_user,))
+    migration_010_stats_rollup(cursor)
+    test_db.commit()
+    assert cursor.execute(
+        "SELECT task_id, attempts, score_sum, last_score FROM stats_rollup WHERE user_id = ? AND event_id = ? "
+        "ORDER BY task_id", (test_user, event_id)).fetchall() == rollup
+
+def test_stats_task_page_from_rollup(test_db, test_user):
+    """Testet die seitenweise Aufgabenliste: Kennzahlen aus stats_rollup, letzte Bewertungen per Fensterfunktion"""
+    from utils.stats_engine import count_stat_tasks, load_task_page
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Seiten Event', '')", (test_user,))
+    event_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO tasks (event_id, title, content) VALUES (?, ?, '')",
+                       [(event_id, "Erste"), (event_id, "Zweite"), (event_id, "Dritte")])
+    test_db.commit()
+    task_ids = [row[0] for row in cursor.execute("SELECT id FROM tasks WHERE event_id = ? ORDER BY id", (event_id,))]
+    for task_id, scores in zip(task_ids, ([10, 20, 60, 70, 80, 90], [50], [30, 40])):
+        for score in scores:
+            save_stats(test_user, event_id, task_id, score)
+    save_stats(test_user, event_id, None, 30)
+
+    # Bewertung ohne Aufgabe erscheint nicht in der Aufgabenliste
+    assert count_stat_tasks.uncached(test_user, event_id) == 3
+    first = load_task_page.uncached(test_user, event_id, limit=2, offset=0, per_task=2)
+    second = load_task_page.uncached(test_user, event_id, limit=2, offset=2, per_task=2)
+    assert len(first) == 2 and len(second) == 1
+    assert set(first["task_id"]) | set(second["task_id"]) == set(task_ids)
+
+    page = load_task_page.uncached(test_user, event_id, limit=3).set_index("task_id")
+    rising = page.loc[task_ids[0]]
+    assert rising["task_title"] == "Erste"
+    assert rising["attempts"] == 6 and rising["avg_score"] == pytest.approx(55)
+    assert [score for score, _ in rising["recent"]] == [90, 80, 70, 60, 20]
+    assert rising["moving_average"] == pytest.approx(64)
+    # Trend aus den Rollup-Summen = Steigung der Regressionsgeraden über alle Einzelbewertungen
+    assert rising["trend"] == pytest.approx(295 / 17.5)
+    assert page.loc[task_ids[1], "trend"] == 0
+    assert page.loc[task_ids[2], "trend"] == pytest.approx(10)
+
+def test_stats_task_page_keeps_events_apart(test_db, test_user):
+    """Testet, dass eine unter zwei Events bewertete Aufgabe zwei Zeilen der Aufgabenliste ergibt"""
+    from utils.stats_engine import count_stat_tasks, load_task_page
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Eigenes Event', '')", (test_user,))
+    own_event = cursor.lastrowid
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Geteiltes Event', '')", (test_user,))
+    shared_event = cursor.lastrowid
+    cursor.execute("INSERT INTO tasks (event_id, title, content) VALUES (?, 'Gemeinsam', '')", (own_event,))
+    task_id = cursor.lastrowid
+    test_db.commit()
+    for event_id, scores in ((own_event, [10, 20]), (shared_event, [90])):
+        for score in scores:
+            save_stats(test_user, event_id, task_id, score)
+
+    assert count_stat_tasks.uncached(test_user) == 2
+    page = load_task_page.uncached(test_user, limit=10).set_index("event_id")
+    assert len(page) == 2 and set(page["task_id"]) == {task_id}
+    assert page.loc[own_event, "attempts"] == 2 and page.loc[own_event, "avg_score"] == pytest.approx(15)
+    assert [score for score, _ in page.loc[own_event, "recent"]] == [20, 10]
+    assert page.loc[shared_event, "attempts"] == 1 and page.loc[shared_event, "moving_average"] == 90
+    assert [score for score, _ in page.loc[shared_event, "recent"]] == [90]
+
+def test_score_history_downsampling(test_db, test_user):
+    """Testet, dass der Score-Verlauf ab max_points in Zeitbuckets bzw. per LTTB zusammengefasst wird"""
+    import numpy as np
+    import pandas as pd
+    from utils.migrations import migration_010_stats_rollup, migration_011_stats_rollup_pages
+    from utils.stats_engine import load_score_history, lttb_indices
+    cursor = test_db.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, description) VALUES (?, 'Verlauf Event', '')", (test_user,))
+    event_id = cursor.lastrowid
+    # 30 Tage mit je vier Bewertungen
+    cursor.executemany(
+        "INSERT INTO stats (user_id, event_id, task_id, score, timestamp) VALUES (?, ?, NULL, ?, datetime('2024-01-01', ?))",
+        [(test_user, event_id, 40 + hour, f"+{hour * 6} hours") for hour in range(120)]
+    )
+    # Direkt eingefügte Bewertungen wie bei der Migration in stats_rollup übernehmen
+    migration_010_stats_rollup(cursor)
+    migration_011_stats_rollup_pages(cursor)
+    test_db.commit()
+
+    raw, bucket = load_score_history.uncached(test_user, event_id, max_points=120)
+    assert bucket is None and len(raw) == 120
+    daily, bucket = load_score_history.uncached(test_user, event_id, max_points=40)
+    assert bucket[0] == "Tag" and len(daily) == 30
+    assert daily["attempts"].sum() == 120
+    assert daily.iloc[0][["score", "min_score", "max_score"]].tolist() == [41.5, 40, 43]
+    weekly, bucket = load_score_history.uncached(test_user, event_id, max_points=10)
+    assert bucket[0] == "Woche" and len(weekly) <= 10
+    # 2024-01-01 ist ein Montag
+    assert weekly["timestamp"].iloc[1] == pd.Timestamp("2024-01-08")
+
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100
+    indices = lttb_indices(x, y, 20)
+    assert len(indices) == 20 and indices[0] == 0 and indices[-1] == 999
+    assert 500 in indices  # Ausreißer bleibt erhalten
+    assert list(lttb_indices(x[:10], y[:10], 20)) == list(range(10))
+
+def test_password_hashing_and_upgrade_on_login(test_db, test_user, monkeypatch):
+    """Testet scrypt-Hashes mit Parametern je Benutzer und das Neuhashen beim Login"""
+    monkeypatch.setattr(utils.passwords, "SCRYPT_N", 2 ** 10)
+    stored = hash_password("geheim")
+    assert stored.startswith("scrypt$1024$8$1$") and stored != hash_password("geheim")
+    assert verify_password("geheim", stored) and not verify_password("falsch", stored)
+    assert not needs_rehash(stored)
+
+    def stored_password():
+        cursor.execute("SELECT password FROM users WHERE id = ?", (test_user,))
+        return cursor.fetchone()[0]
+
+    # Klartext aus der Zeit vor dem Hashing wird beim ersten Login ersetzt
+    cursor = test_db.cursor()
+    assert authenticate_user("testuser", "falsch") is None
+    assert stored_password() == "testpass"
+    assert authenticate_user("testuser", "testpass") == (test_user, 0)
+    assert stored_password().startswith("scrypt$1024$")
+    # Höhere Kosten: alter Hash bleibt gültig und wird beim Login aktualisiert
+    monkeypatch.setattr(utils.passwords, "SCRYPT_N", 2 ** 11)
+    assert authenticate_user("testuser", "testpass") == (test_user, 0)
+    assert stored_password().startswith("scrypt$2048$")
+    assert authenticate_user("unbekannt", "testpass") is None
+
+def test_rehash_plaintext_passwords_in_batches(test_db, test_user, monkeypatch):
+    """Testet das nachträgliche Hashen von Klartext-Passwörtern in kleinen Batches"""
+    monkeypatch.setattr(utils.passwords, "SCRYPT_N", 2 ** 10)
+    cursor = test_db.cursor()
+    cursor.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                       [(f"backfill{i}", f"pw{i}") for i in range(5)])
+    test_db.commit()
+    assert rehash_plaintext_passwords(batch_size=2) >= 6  # 5 + test_user (+ Reste anderer Tests)
+    cursor.execute("SELECT COUNT(*) FROM users WHERE password NOT LIKE 'scrypt$%'")
+    assert cursor.fetchone()[0] == 0
+    cursor.execute("SELECT username, password FROM users WHERE username LIKE 'backfill%' ORDER BY username")
+    rows = cursor.fetchall()
+    assert all(verify_password(f"pw{i}", stored) for i, (_, stored) in enumerate(rows))
+    assert authenticate_user("testuser", "testpass") == (test_user, 0)
+    assert rehash_plaintext_passwords() == 0
+    cursor.execute("DELETE FROM users WHERE username LIKE 'backfill%'")
+    test_db.commit()